@@ -1,8 +1,10 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
-import sys
-import traceback
+import asyncio
+import json
+import logging
+import time
 from datetime import datetime
 
 from aiohttp import web
@@ -14,9 +16,36 @@ from botbuilder.core import (
 )
 from botbuilder.core.integration import aiohttp_error_middleware
 from botbuilder.schema import Activity, ActivityTypes
+from dotenv import load_dotenv
 
-from bot import MyBot
+# The only place the bot reads .env; every module below reads os.environ at import
+load_dotenv()
+
+from log_config import configure_logging
+
+# Before anything logs, so every module goes through the queue listener
+configure_logging()
+logger = logging.getLogger(__name__)
+
+from bot import MyBot, close_http_clients, warm_http_clients
+from session_state import create_conversation_state
+from card_builder import warm_card_cache
+from catalog_index import get_catalog_index
+from db_connector import (
+    CATALOG_POLL_INTERVAL,
+    fetch_all_software,
+    popular_software_names,
+    refresh_catalog,
+    warm_connection_pool,
+)
+from llm import warm_up as warm_up_groq
+from llm_usage import flush_loop as llm_usage_flush_loop
+from metrics import render_metrics, stage_timer
+from tracing import CORRELATION_HEADER, start_trace
 from config import DefaultConfig
+from notifications import NotificationDispatcher
+from request_log_schema import maintenance_loop
+from status_updates import StatusUpdateBatcher, status_from_event, verify_signature
 
 CONFIG = DefaultConfig()
 
@@ -31,8 +60,7 @@ async def on_error(context: TurnContext, error: Exception):
     # This check writes out errors to console log .vs. app insights.
     # NOTE: In production environment, you should consider logging this to Azure
     #       application insights.
-    print(f"\n [on_turn_error] unhandled error: {error}", file=sys.stderr)
-    traceback.print_exc()
+    logger.error("[on_turn_error] unhandled error: %s", error, exc_info=error)
 
     # Send a message to the user
     await context.send_activity("The bot encountered an error or bug.")
@@ -56,8 +84,27 @@ async def on_error(context: TurnContext, error: Exception):
 
 ADAPTER.on_turn_error = on_error
 
+# Per-conversation session state (SESSION_STORAGE selects the backend)
+CONVERSATION_STATE = create_conversation_state()
+
 # Create the Bot
-BOT = MyBot()
+BOT = MyBot(CONVERSATION_STATE)
+
+# Coalesces ServiceNow state changes into batched request_logging writes
+STATUS_UPDATES = StatusUpdateBatcher(CONFIG.STATUS_FLUSH_INTERVAL, CONFIG.STATUS_MAX_BATCH,
+                                     CONFIG.STATUS_MAX_PENDING)
+
+# Tells requesters proactively when their tickets change state
+NOTIFIER = NotificationDispatcher(
+    ADAPTER,
+    CONFIG.APP_ID,
+    concurrency=CONFIG.NOTIFY_CONCURRENCY,
+    rate_per_channel=CONFIG.NOTIFY_RATE_PER_CHANNEL,
+    burst_per_channel=CONFIG.NOTIFY_BURST_PER_CHANNEL,
+    max_retries=CONFIG.NOTIFY_MAX_RETRIES,
+    queue_size=CONFIG.NOTIFY_QUEUE_SIZE,
+)
+STATUS_UPDATES.listeners.append(NOTIFIER.notify_status_changes)
 
 
 # Listen for incoming requests on /api/messages
@@ -71,14 +118,185 @@ async def messages(req: Request) -> Response:
     activity = Activity().deserialize(body)
     auth_header = req.headers["Authorization"] if "Authorization" in req.headers else ""
 
-    response = await ADAPTER.process_activity(activity, auth_header, BOT.on_turn)
+    # One trace per activity; every instrumented stage below becomes a child span
+    tracer = start_trace("POST /api/messages", req.headers.get(CORRELATION_HEADER))
+    with tracer as root:
+        if root is not None:
+            root.set_attribute("activity.type", activity.type)
+            root.set_attribute("channel_id", activity.channel_id)
+            root.set_attribute("conversation_id", activity.conversation.id if activity.conversation else "")
+        response = await ADAPTER.process_activity(activity, auth_header, BOT.on_turn)
+
+    headers = {CORRELATION_HEADER: tracer.correlation_id}
     if response:
-        return json_response(data=response.body, status=response.status)
-    return Response(status=201)
+        return json_response(data=response.body, status=response.status, headers=headers)
+    return Response(status=201, headers=headers)
+
+
+# Listen for ServiceNow business-rule webhooks on /api/servicenow/webhook
+async def servicenow_webhook(req: Request) -> Response:
+    # Body is signed with HMAC-SHA256 using the shared SN_WEBHOOK_SECRET
+    body = await req.read()
+    if not verify_signature(CONFIG.SN_WEBHOOK_SECRET, body, req.headers.get("X-SN-Signature", "")):
+        return Response(status=401)
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return Response(status=400)
+
+    # Accept a single event, a list of events, or {"events": [...]}
+    if isinstance(payload, list):
+        events = payload
+    elif isinstance(payload, dict):
+        events = payload.get("events", [payload])
+    else:
+        return Response(status=400)
+    if not isinstance(events, list):
+        return Response(status=400)
+
+    accepted = dropped = 0
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        incident_number = event.get("number") or event.get("incident_id")
+        status = status_from_event(event)
+        if incident_number and status:
+            if STATUS_UPDATES.submit(incident_number, status):
+                accepted += 1
+            else:
+                dropped += 1
+
+    if dropped:
+        # Status writes are backed up; ServiceNow retries the delivery later
+        logger.warning("Status update buffer full, dropped %s of %s events (%s dropped in total)",
+                       dropped, accepted + dropped, STATUS_UPDATES.dropped)
+        return json_response(data={"accepted": accepted, "dropped": dropped}, status=503,
+                             headers={"Retry-After": "30"})
+    return json_response(data={"accepted": accepted}, status=202)
+
+
+# Prometheus scrape endpoint
+async def metrics(req: Request) -> Response:
+    return Response(
+        body=render_metrics().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+# Startup warm-up: the first turns after a deploy would otherwise pay for the DB
+# connections, the first catalog read, card building and TLS handshakes.
+# /readyz fails until it has finished. A failed step leaves the instance ready
+# but "degraded" instead of crashing it; the step then happens on first use.
+WARMUP = {"status": "starting", "steps": {}}
+
+
+async def _warm_step(name: str, func):
+    start = time.perf_counter()
+    try:
+        with stage_timer(f"warmup.{name}"):
+            result = await asyncio.wait_for(func(), timeout=CONFIG.WARMUP_TIMEOUT)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        logger.warning("Warm-up step %s failed: %s", name, error)
+        WARMUP["steps"][name] = {"ok": False, "error": error, "seconds": round(time.perf_counter() - start, 3)}
+        return None
+    WARMUP["steps"][name] = {"ok": True, "seconds": round(time.perf_counter() - start, 3)}
+    return result
+
+
+def _load_catalog() -> dict:
+    catalog = fetch_all_software()
+    if not catalog:
+        raise RuntimeError("catalog is empty or unavailable")
+    return catalog
+
+
+async def _warm_data():
+    await _warm_step("db_pool", lambda: asyncio.to_thread(warm_connection_pool))
+    catalog = await _warm_step("catalog", lambda: asyncio.to_thread(_load_catalog))
+    if catalog:
+        popular = await _warm_step("popularity", lambda: asyncio.to_thread(popular_software_names))
+        await _warm_step("card_cache", lambda: asyncio.to_thread(warm_card_cache, catalog, popular or ()))
+
+
+async def warm_up():
+    start = time.perf_counter()
+    await asyncio.gather(
+        _warm_data(),
+        _warm_step("servicenow", warm_http_clients),
+        _warm_step("groq", lambda: asyncio.to_thread(warm_up_groq)),
+    )
+    failed = [name for name, step in WARMUP["steps"].items() if not step["ok"]]
+    WARMUP["status"] = "degraded" if failed else "ready"
+    logger.info("Warm-up finished in %.2fs: %s", time.perf_counter() - start, WARMUP["status"],
+                extra={"failed_steps": failed})
+
+
+def _refresh_catalog_caches(previous: dict) -> dict:
+    catalog = refresh_catalog()
+    if catalog and catalog is not previous:
+        # Build the new index and cards here, so turns find them ready
+        get_catalog_index()
+        warm_card_cache(catalog, popular_software_names())
+    return catalog
+
+
+async def watch_catalog(interval: float):
+    """Poll the catalog version every `interval` seconds; rebuild the catalog caches only after a change"""
+    catalog = None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            catalog = await asyncio.to_thread(_refresh_catalog_caches, catalog)
+        except Exception as e:
+            logger.error("Catalog refresh failed: %s", e)
+
+
+# Liveness: the process is up and serving requests
+async def healthz(req: Request) -> Response:
+    return json_response(data={"status": "ok"})
+
+
+# Readiness: only once warm-up has finished, successfully or not
+async def readyz(req: Request) -> Response:
+    return json_response(data=WARMUP, status=503 if WARMUP["status"] == "starting" else 200)
+
+
+async def on_startup(app: web.Application):
+    NOTIFIER.start()
+    STATUS_UPDATES.start()
+    # In the background, so /healthz answers while warm-up runs
+    app["warmup"] = asyncio.create_task(warm_up())
+    app["maintenance"] = (
+        asyncio.create_task(maintenance_loop(CONFIG.REQUEST_LOG_MAINTENANCE_INTERVAL))
+        if CONFIG.REQUEST_LOG_MAINTENANCE_INTERVAL > 0 else None
+    )
+    app["catalog_watch"] = asyncio.create_task(watch_catalog(CATALOG_POLL_INTERVAL))
+    app["llm_usage"] = asyncio.create_task(llm_usage_flush_loop(CONFIG.LLM_USAGE_FLUSH_INTERVAL))
+
+
+async def on_cleanup(app: web.Application):
+    app["warmup"].cancel()
+    if app["maintenance"]:
+        app["maintenance"].cancel()
+    app["catalog_watch"].cancel()
+    # Awaited: it writes the last totals on the way out
+    app["llm_usage"].cancel()
+    await asyncio.gather(app["llm_usage"], return_exceptions=True)
+    await STATUS_UPDATES.stop()
+    await NOTIFIER.stop()
+    await close_http_clients()
 
 
 APP = web.Application(middlewares=[aiohttp_error_middleware])
 APP.router.add_post("/api/messages", messages)
+APP.router.add_post("/api/servicenow/webhook", servicenow_webhook)
+APP.router.add_get("/metrics", metrics)
+APP.router.add_get("/healthz", healthz)
+APP.router.add_get("/readyz", readyz)
+APP.on_startup.append(on_startup)
+APP.on_cleanup.append(on_cleanup)
 
 if __name__ == "__main__":
     try:
@@ -308,76 +308,254 @@
 
 
 
-from botbuilder.core import ActivityHandler, TurnContext, MessageFactory
+from botbuilder.core import ActivityHandler, ConversationState, TurnContext, MessageFactory
 from botbuilder.schema import ChannelAccount, ActivityTypes
-from intent_parser import parse_intent
-from llm import get_llm_response, get_cs_it_response
+from intent_parser import (
+    COMBINED_INTENT_ANSWER,
+    fallback_intent_detection,
+    match_install_request,
+    parse_intent,
+    parse_intent_and_answer,
+)
+from llm import get_llm_response, get_cs_it_response, get_api_key, get_http_client, groq_chat
+from llm_usage import TurnUsage
 from db_connector import (
     fetch_all_software,
     fetch_software_by_names,
+    get_cached_catalog,
+    popular_software_names,
+    resolve_software_alias,
     get_software_info,
     search_software_fuzzy
     ,
-    log_software_request
+    log_software_request,
+    find_open_request,
+    save_conversation_reference
 )
 from card_builder import (
     build_software_card,
     build_software_selection_card,
  
 )
+from llm_scheduler import BUSY_REPLY, LLM_SCHEDULER, LLMOverloaded, Priority
+from metrics import timed, stage_timer, TURNS, TURN_LATENCY
+from single_flight import SingleFlight
+from session_state import (
+    create_conversation_state,
+    has_version,
+    new_session,
+    refresh,
+    remember_catalog,
+    resolve_from_session,
+    resolve_pending,
+)
+from tracing import correlation_headers
 import os
 import asyncio
 import sys
 import json
-import httpx
-from groq import Groq
-from dotenv import load_dotenv
-from typing import Optional, Dict, Any, List
+import time
+import logging
+from typing import TYPE_CHECKING, Optional, Dict, Any, List
+
+if TYPE_CHECKING:
+    import httpx
  
-load_dotenv()
 SN_INSTANCE = os.getenv("SN_INSTANCE", "").rstrip("/")
 SN_USER = os.getenv("SN_USER")
 SN_PASS = os.getenv("SN_PASS")
+logger = logging.getLogger(__name__)
+# Ask ServiceNow whether a duplicate's incident is still open before reusing it
+DUPLICATE_CHECK_VERIFY_STATE = os.getenv("DUPLICATE_CHECK_VERIFY_STATE", "false").lower() == "true"
+
+_servicenow_client: Optional["httpx.AsyncClient"] = None
+
+# Turns classifying the same message at the same time share one LLM call. Waiting
+# turns await the leader's result on the event loop instead of holding a worker thread.
+# Identical catalog queries are shared inside db_connector (CATALOG_FLIGHT).
+INTENT_FLIGHT = SingleFlight("intent")
+# (user, app, version) of install cards being turned into tickets right now
+_INSTALLS_IN_FLIGHT: set = set()
+
+
+async def fetch_catalog() -> Dict[str, List[str]]:
+    catalog = get_cached_catalog()
+    if catalog is not None:
+        return catalog
+    return await asyncio.to_thread(fetch_all_software)
+
+
+async def fetch_catalog_by_names(names: List[str]) -> Dict[str, List[str]]:
+    return await asyncio.to_thread(fetch_software_by_names, names)
+
+
+async def search_catalog(term: str) -> Dict[str, List[str]]:
+    return await asyncio.to_thread(search_software_fuzzy, term)
+
+
+async def resolve_app_names(names: List[str]) -> List[str]:
+    """Canonical catalog names for what the user typed, through the alias map. Unknown names pass through."""
+    if not names:
+        return []
+    await fetch_catalog()  # the alias map is refreshed with the catalog, off the event loop
+    return list(dict.fromkeys(resolve_software_alias(name) or name.lower() for name in names))
+
+
+def servicenow_client() -> "httpx.AsyncClient":
+    """
+    Shared ServiceNow client, so connections and TLS sessions are reused across
+    turns. httpx is imported on first use to keep `import bot` cheap.
+    """
+    global _servicenow_client
+    if _servicenow_client is None or _servicenow_client.is_closed:
+        import httpx
+        _servicenow_client = httpx.AsyncClient()
+    return _servicenow_client
+
+
+async def warm_http_clients() -> int:
+    """Connect to ServiceNow ahead of the first turn with a one-row read. Returns the HTTP status."""
+    if not SN_INSTANCE:
+        raise RuntimeError("SN_INSTANCE is not set")
+    response = await servicenow_client().get(
+        f"{SN_INSTANCE}/api/now/table/incident",
+        params={"sysparm_limit": 1, "sysparm_fields": "sys_id"},
+        auth=(SN_USER, SN_PASS),
+    )
+    response.raise_for_status()
+    return response.status_code
+
+
+async def close_http_clients():
+    global _servicenow_client
+    if _servicenow_client is not None:
+        await _servicenow_client.aclose()
+        _servicenow_client = None
  
  
  
  
  
 class MyBot(ActivityHandler):
+    def __init__(self, conversation_state: Optional[ConversationState] = None):
+        # Per-conversation session: the catalog slice last shown and pending version choices
+        self.conversation_state = conversation_state or create_conversation_state()
+        self.session_accessor = self.conversation_state.create_property("session")
+
+    async def on_turn(self, turn_context: TurnContext):
+        turn_context.on_send_activities(self._time_send_activities)
+        await super().on_turn(turn_context)
+        await self.conversation_state.save_changes(turn_context)
+
+    @staticmethod
+    def _user_id(turn_context: TurnContext) -> str:
+        return turn_context.activity.from_property.id if turn_context.activity.from_property else ""
+
+    async def _session(self, turn_context: TurnContext) -> dict:
+        return refresh(await self.session_accessor.get(turn_context, new_session))
+
+    @staticmethod
+    async def _resolve_catalog(session: dict, names: List[str]) -> Dict[str, List[str]]:
+        """
+        Catalog entries for `names`: from the session first, then the in-memory
+        catalog, and only the rest from the database
+        """
+        catalog, missing = resolve_from_session(session, names)
+        if missing:
+            cached = get_cached_catalog() or {}
+            unresolved = []
+            for name in missing:
+                versions = cached.get(name.lower())
+                if versions is None:
+                    unresolved.append(name)
+                else:
+                    catalog[name.lower()] = versions
+            if unresolved:
+                catalog.update(await fetch_catalog_by_names(unresolved))
+        return catalog
+
+    @staticmethod
+    async def _time_send_activities(turn_context: TurnContext, activities, next_send):
+        with stage_timer("send_activity"):
+            return await next_send()
+
     async def on_message_activity(self, turn_context: TurnContext):
+        # Count every turn by intent and outcome, and time it end to end
+        state = {"intent": "unknown"}
+        outcome = "ok"
+        start = time.perf_counter()
+        # LLM tokens are charged to the intent once the turn has one
+        usage = TurnUsage()
+        try:
+            with usage:
+                await self._route_message(turn_context, state)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            TURNS.inc(state["intent"], outcome)
+            TURN_LATENCY.observe(time.perf_counter() - start, state["intent"])
+            usage.charge(state["intent"])
+
+    async def _route_message(self, turn_context: TurnContext, state: dict):
         # Handle card submissions
         if turn_context.activity.value:
+            state["intent"] = "card_submission"
             await self._handle_card_submission(turn_context)
             return
            
         user_msg = turn_context.activity.text or ""
-        parsed = parse_intent(user_msg)
+        # Classification gates every install, so it runs at install priority;
+        # under overload the keyword classifier answers instead. Identical
+        # messages in flight at the same time (a team all typing "install teams")
+        # share one classification. In combined mode the same completion also
+        # answers short CS/IT and general questions, saving the second round trip.
+        # Its reply is capped (COMBINED_ANSWER_MAX_TOKENS) so it doesn't hold the
+        # install slot; longer answers are given at their own priority.
+        user_id = self._user_id(turn_context)
+        # Plain install requests ("install vscode and slack") are answered from the
+        # in-memory alias map without queueing for the LLM. The classifiers don't
+        # repeat this check, so the catalog is never loaded on a scheduler thread;
+        # until it is cached, the LLM classifies everything.
+        parsed = match_install_request(user_msg) if get_cached_catalog() is not None else None
+        if parsed is None:
+            classify = parse_intent_and_answer if COMBINED_INTENT_ANSWER else parse_intent
+            try:
+                parsed = await INTENT_FLIGHT.run(
+                    " ".join(user_msg.lower().split()),
+                    lambda: LLM_SCHEDULER.run(Priority.INSTALL, user_id, classify, user_msg),
+                )
+            except LLMOverloaded:
+                parsed = fallback_intent_detection(user_msg)
+        state["intent"] = parsed["intent"]
  
         if parsed["intent"] == "install":
             await self._handle_install_intent(turn_context, parsed, user_msg)
         elif parsed["intent"] == "cs_it":
-            await self._handle_cs_it_intent(turn_context, user_msg)
+            await self._handle_cs_it_intent(turn_context, user_msg, parsed.get("answer"))
         else:
-            await self._handle_general_intent(turn_context, user_msg)
+            await self._handle_general_intent(turn_context, user_msg, parsed.get("answer"))
  
+    @timed("bot.handle_install_intent")
     async def _handle_install_intent(self, turn_context: TurnContext, parsed: dict, user_msg: str):
         """Handle software installation requests"""
-        apps = parsed["apps"]
+        apps = await resolve_app_names(parsed["apps"])
  
         if not apps:  
-            catalog = fetch_all_software()
+            catalog = await fetch_catalog()
             if not catalog:
                 await turn_context.send_activity("⚠️ Sorry, no software available in the catalog.")
                 return
            
             await turn_context.send_activity("I can help you install software! Here's what's available:")
-            selection_card = build_software_selection_card(catalog)
+            popular = await asyncio.to_thread(popular_software_names)
+            selection_card = build_software_selection_card(catalog, popular)
             await turn_context.send_activity(MessageFactory.attachment(selection_card))
            
         elif len(apps) == 1:
-            catalog = fetch_software_by_names(apps)
+            catalog = await fetch_catalog_by_names(apps)
             if not catalog:
-                catalog = search_software_fuzzy(apps[0])
+                catalog = await search_catalog(apps[0])
             if not catalog:
                 await turn_context.send_activity(
                     f"⚠️ Sorry, I couldn't find '{apps[0]}' in our software catalog. "
@@ -385,13 +563,14 @@ class MyBot(ActivityHandler):
                 )
                 return
  
+            remember_catalog(await self._session(turn_context), catalog, pending=True)
             for app, versions in catalog.items():
                 await turn_context.send_activity(f"Great! I found {app.title()} for you:")
                 card = build_software_card(app, versions)
                 await turn_context.send_activity(MessageFactory.attachment(card))
                
         else:
-            catalog = fetch_software_by_names(apps)
+            catalog = await fetch_catalog_by_names(apps)
             if not catalog:
                 await turn_context.send_activity(
                     "⚠️ Sorry, I couldn't find any of the requested software in the catalog."
@@ -408,25 +587,41 @@ class MyBot(ActivityHandler):
                 )
             else:
                 await turn_context.send_activity("Great! I found all the software you requested:")
- 
+
+            remember_catalog(await self._session(turn_context), catalog, pending=True)
             for app, versions in catalog.items():
                 card = build_software_card(app, versions)
                 await turn_context.send_activity(MessageFactory.attachment(card))
  
-    async def _handle_cs_it_intent(self, turn_context: TurnContext, user_msg: str):
-        """Handle CS/IT related queries"""
+    @timed("bot.handle_cs_it_intent")
+    async def _handle_cs_it_intent(self, turn_context: TurnContext, user_msg: str, answer: Optional[str] = None):
+        """Handle CS/IT related queries; `answer` is the reply if the classifier already gave one"""
+        if answer:
+            await turn_context.send_activity(answer)
+            return
         await turn_context.send_activity("🤖 Let me help you with that technical question...")
-        reply = get_cs_it_response(user_msg)
+        try:
+            reply = await LLM_SCHEDULER.run(Priority.CS_IT, self._user_id(turn_context), get_cs_it_response, user_msg)
+        except LLMOverloaded:
+            reply = BUSY_REPLY
         await turn_context.send_activity(reply)
  
-    async def _handle_general_intent(self, turn_context: TurnContext, user_msg: str):
-        """Handle general conversation"""
-        reply = get_llm_response(user_msg)
+    @timed("bot.handle_general_intent")
+    async def _handle_general_intent(self, turn_context: TurnContext, user_msg: str, answer: Optional[str] = None):
+        """Handle general conversation; `answer` is the reply if the classifier already gave one"""
+        if answer:
+            await turn_context.send_activity(answer)
+            return
+        try:
+            reply = await LLM_SCHEDULER.run(Priority.GENERAL, self._user_id(turn_context), get_llm_response, user_msg)
+        except LLMOverloaded:
+            reply = BUSY_REPLY
         await turn_context.send_activity(reply)
  
     # ----------------- FIXED METHODS -----------------
     @staticmethod
-    async def extract_incident_data(user_input: str) -> Dict[str, Any]:
+    @timed("extract_incident_data")
+    async def extract_incident_data(user_input: str, user_id: str = "") -> Dict[str, Any]:
         """Extract structured JSON incident data from user input safely."""
         def create_messages(system_msg: str, user_msg: str) -> List[Dict[str, str]]:
             return [
@@ -434,161 +629,231 @@ class MyBot(ActivityHandler):
                 {"role": "user", "content": user_msg}
             ]
        
+        # All instructions in the system message; the user message is only the input
         incident_extraction_system_msg = """You are a ServiceNow incident creation assistant.
-        Return ONLY a JSON object with the following fields:
-        {
-        "short_description": "...",
-        "description": "...",
-        "category": "...",
-        "caller": "Guest"
-        }"""
+Analyze the user input and extract the incident information.
+Return ONLY a JSON object with the following fields:
+{"short_description": "...", "description": "...", "category": "...", "caller": "Guest"}"""
        
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        from groq import Groq
+
+        client = Groq(
+            api_key=get_api_key(),
+            default_headers=correlation_headers(),
+            http_client=get_http_client(),
+        )
         model = os.getenv("GROQ_MODEL", "llama3-8b-8192")
        
-        prompt = f"Analyze this user input and extract incident information in JSON format: \"{user_input}\""
-        messages = create_messages(incident_extraction_system_msg, prompt)
+        messages = create_messages(incident_extraction_system_msg, user_input)
        
-        completion = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.1,
-            max_tokens=500
-        )
+        fallback = {
+            "short_description": user_input,
+            "description": user_input,
+            "category": "Software",
+            "caller": "Guest"
+        }
+
+        try:
+            completion = await LLM_SCHEDULER.run(
+                Priority.INSTALL,
+                user_id,
+                groq_chat,
+                "incident_extraction",
+                client,
+                model=model,
+                messages=messages,
+                temperature=0.1,
+                max_tokens=500
+            )
+        except LLMOverloaded:
+            logger.warning("LLM overloaded, using default incident data")
+            return fallback
        
         response_content = completion.choices[0].message.content.strip()
-        print(f"DEBUG - Raw LLM response: {response_content}")  # 👈 log raw response
+        logger.debug("Raw incident extraction response", extra={"llm_response": response_content})
        
         # Try parsing JSON safely
         try:
             return json.loads(response_content)
         except json.JSONDecodeError:
-            print("⚠️ LLM response was not valid JSON, falling back to default incident data.")
-            return {
-                "short_description": user_input,
-                "description": user_input,
-                "category": "Software",
-                "caller": "Guest"
-            }
+            logger.warning("LLM response was not valid JSON, falling back to default incident data")
+            return fallback
  
     @staticmethod
+    @timed("create_incident_direct")
     async def create_incident_direct(incident_data: Dict[str, Any]) -> Optional[Dict]:
         """Create an incident directly in ServiceNow via REST API."""
         try:
-            print("🔄 Creating incident via ServiceNow API...")
+            logger.debug("Creating incident via ServiceNow API")
             url = f"{SN_INSTANCE}/api/now/table/incident"
-            headers = {"Content-Type": "application/json", "Accept": "application/json"}
+            headers = {"Content-Type": "application/json", "Accept": "application/json", **correlation_headers()}
  
             if not incident_data.get("caller"):
                 incident_data["caller"] = "Guest"
  
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=incident_data, auth=(SN_USER, SN_PASS))
+            response = await servicenow_client().post(url, headers=headers, json=incident_data, auth=(SN_USER, SN_PASS))
             response.raise_for_status()
-            print("✅ Incident created successfully!")
             return response.json()
         except Exception as e:
-            print(f"❌ Error creating incident: {e}")
+            logger.error("Error creating incident: %s", e)
             return None
+
+    @staticmethod
+    @timed("servicenow.incident_is_open")
+    async def incident_is_open(incident_number: str) -> bool:
+        """Check in ServiceNow that an incident is still active. Errs on the side of open."""
+        try:
+            url = f"{SN_INSTANCE}/api/now/table/incident"
+            params = {"sysparm_query": f"number={incident_number}", "sysparm_fields": "active"}
+            response = await servicenow_client().get(
+                url, params=params, headers=correlation_headers(), auth=(SN_USER, SN_PASS)
+            )
+            response.raise_for_status()
+            results = response.json().get("result", [])
+            return bool(results) and results[0].get("active") == "true"
+        except Exception as e:
+            logger.warning("Could not verify state of %s: %s", incident_number, e)
+            return True
     # -------------------------------------------------
  
+    async def _submit_install(self, turn_context: TurnContext, session: dict, card_data: dict,
+                              app: str, version: str, requested_by: str):
+        """Create the install ticket for a submitted card unless the user already has an open one"""
+        existing_incident = await asyncio.to_thread(find_open_request, requested_by, app, version)
+        if existing_incident and DUPLICATE_CHECK_VERIFY_STATE:
+            if not await self.incident_is_open(existing_incident):
+                existing_incident = None
+        if existing_incident:
+            await turn_context.send_activity(
+                f"ℹ️ You already have an open request for {app.title()} version {version}: "
+                f"Incident Number: {existing_incident}. No new ticket was created."
+            )
+            return
+
+        await turn_context.send_activity(
+            f"🚀 Creating ServiceNow Ticket for Installation of {app.title()} version {version}..."
+        )
+
+        # The card came from this conversation's session, so the pair is already known to exist
+        if has_version(session, app, version):
+            software_info = {"name": app, "version": version}
+        else:
+            software_info = await asyncio.to_thread(get_software_info, app, version)
+        incident_description = f"Installation of {software_info['name']} v{software_info['version']}"
+
+        if incident_description:
+            incident_data = await self.extract_incident_data(incident_description, requested_by)
+            result = await self.create_incident_direct(incident_data)
+            if result:
+                logger.debug("Full ServiceNow response", extra={"servicenow_response": result})
+
+                # Try to extract incident number safely
+                incident_number = (
+                    result.get("result", {}).get("number")
+                    or result.get("number")
+                    or "Unknown"
+                )
+
+                logger.info(
+                    "Incident created",
+                    extra={"incident": incident_number, "software": app, "version": version}
+                )
+                await turn_context.send_activity(
+                    f"✅ Incident created successfully! Incident Number: {incident_number}"
+                )
+                resolve_pending(session, app)
+                # 📝 LOG THE REQUEST - Add this section
+
+                if incident_number != "Unknown":
+                    # Define log fields
+                    software_name = app
+                    version_name = version
+                    status = "Created"
+                    timestamp = card_data.get("timestamp", "")
+
+                    # Call updated log function
+                    # log_success = log_software_request(
+                    #     incident_number,
+                    #     software_name,
+                    #     version_name,
+                    #     status,
+                    #     timestamp
+                    # )
+                    log_success = await asyncio.to_thread(
+                        log_software_request,
+                        incident_number,
+                        software_name,
+                        version_name,
+                        status,
+                        requested_by
+                    )
+
+
+                    # Remember where to reach the user when the ticket changes state
+                    reference = TurnContext.get_conversation_reference(turn_context.activity)
+                    await asyncio.to_thread(save_conversation_reference, incident_number, reference.serialize())
+
+                    if not log_success:
+                        logger.warning("Failed to log request", extra={"incident": incident_number})
+                else:
+                    logger.warning("Cannot log request - incident number is unknown")
+            # ----------------------
+            #     if incident_number != "Unknown":
+            #         log_success = log_software_request(incident_number, app)
+            #         if log_success:
+            #             print(f"📝 Request logged successfully for incident {incident_number}")
+            #         else:
+            #             print(f"⚠️ Failed to log request for incident {incident_number}")
+            #     else:
+            #         print("⚠️ Cannot log request - incident number is unknown")
+            #     # END LOGGING SECTION
+
+            else:
+                logger.error("Failed to create incident", extra={"software": app, "version": version})
+                await turn_context.send_activity("❌ Failed to create incident.")
+                # CREATING INCIDENT END
+
+    @timed("bot.handle_card_submission")
     async def _handle_card_submission(self, turn_context: TurnContext):
         """Handle adaptive card submissions"""
         try:
             card_data = turn_context.activity.value
             action = card_data.get("action", "")
+            session = await self._session(turn_context)
            
             if action == "install":
                 app = card_data.get("app", "")
                 version = card_data.get("version", "")
                
                 if app and version:
-                    await turn_context.send_activity(
-                        f"🚀 Creating ServiceNow Ticket for Installation of {app.title()} version {version}..."
-                    )
-                   
-                    software_info = get_software_info(app, version)
-                    incident_description = f"Installation of {software_info['name']} v{software_info['version']}"
- 
-                    if incident_description:
-                        incident_data = await self.extract_incident_data(incident_description)
-                        result = await self.create_incident_direct(incident_data)
-                        if result:
-                            print(f"DEBUG - Full ServiceNow response: {result}")  # 👈 log full response
- 
-                            # Try to extract incident number safely
-                            incident_number = (
-                                result.get("result", {}).get("number")
-                                or result.get("number")
-                                or "Unknown"
-                            )
- 
-                            print(f"✅ Incident created successfully! Incident Number: {incident_number}")
-                            await turn_context.send_activity(
-                                f"✅ Incident created successfully! Incident Number: {incident_number}"
-                            )
-                                                # 📝 LOG THE REQUEST - Add this section
-
-                            if incident_number != "Unknown":
-    # Define log fields
-                                software_name = app
-                                version_name = version
-                                status = "Created"
-                                timestamp = card_data.get("timestamp", "")
-
-                                # Call updated log function
-                                # log_success = log_software_request(
-                                #     incident_number,
-                                #     software_name,
-                                #     version_name,
-                                #     status,
-                                #     timestamp
-                                # )
-                                log_success = log_software_request(
-                                    incident_number,
-                                    software_name,
-                                    version_name,
-                                    status
-                                )
-
-
-                                if log_success:
-                                    print(f"📝 Request logged successfully for incident {incident_number}")
-                                else:
-                                    print(f"⚠️ Failed to log request for incident {incident_number}")
-                            else:
-                                print("⚠️ Cannot log request - incident number is unknown")
-                        # ----------------------
-                        #     if incident_number != "Unknown":
-                        #         log_success = log_software_request(incident_number, app)
-                        #         if log_success:
-                        #             print(f"📝 Request logged successfully for incident {incident_number}")
-                        #         else:
-                        #             print(f"⚠️ Failed to log request for incident {incident_number}")
-                        #     else:
-                        #         print("⚠️ Cannot log request - incident number is unknown")
-                        #     # END LOGGING SECTION
- 
-                        else:
-                            print("❌ Failed to create incident.")
-                            await turn_context.send_activity("❌ Failed to create incident.")
-                            # CREATING INCIDENT END
- 
- 
-                           
- 
-                       
-                       
- 
-                       
+                    requested_by = turn_context.activity.from_property.id if turn_context.activity.from_property else ""
+                    # Two quick clicks on the same card must not both pass the duplicate
+                    # check before either ticket exists
+                    key = (requested_by, app.lower(), version)
+                    if key in _INSTALLS_IN_FLIGHT:
+                        await turn_context.send_activity(
+                            f"⏳ Your request for {app.title()} version {version} is already being created."
+                        )
+                        return
+                    _INSTALLS_IN_FLIGHT.add(key)
+                    try:
+                        await self._submit_install(turn_context, session, card_data, app, version, requested_by)
+                    finally:
+                        _INSTALLS_IN_FLIGHT.discard(key)
+
                 else:
                     await turn_context.send_activity("⚠️ Please select a version to install.")
                    
             elif action == "show_versions":
                 selected_software = card_data.get("selected_software", [])
-                print(f"DEBUG - Received card_data: {card_data}")
-                print(f"DEBUG - Selected software: {selected_software}")
-                print(f"DEBUG - Type: {type(selected_software)}")
+                logger.debug(
+                    "Card submission received",
+                    extra={
+                        "card_data": card_data,
+                        "selected_software": selected_software,
+                        "selected_type": type(selected_software).__name__,
+                    }
+                )
                
                 if not selected_software:
                     await turn_context.send_activity("⚠️ Please select at least one software to install.")
@@ -605,14 +870,16 @@ class MyBot(ActivityHandler):
                 else:
                     software_list = [str(selected_software)]
                
-                print(f"DEBUG - Processed software_list: {software_list}")
+                logger.debug("Processed software list", extra={"software_list": software_list})
                
                 if not software_list:
                     await turn_context.send_activity("⚠️ Please select at least one software to install.")
                     return
                
-                catalog = fetch_software_by_names(software_list)
-                print(f"DEBUG - Catalog found: {catalog}")
+                catalog = await self._resolve_catalog(session, software_list)
+                remember_catalog(session, catalog, pending=True)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Catalog found", extra={"catalog": catalog, "catalog_size": len(catalog)})
                
                 if catalog:
                     found_count = len(catalog)
@@ -637,7 +904,7 @@ class MyBot(ActivityHandler):
                     )
                    
         except Exception as e:
-            print(f"Error handling card submission: {e}")
+            logger.exception("Error handling card submission: %s", e)
             await turn_context.send_activity(
                 "⚠️ Sorry, there was an error processing your request. Please try again."
             )
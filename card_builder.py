@@ -1,11 +1,27 @@
 # card_builder.py
 from botbuilder.schema import Attachment
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
 import json
+import os
+from metrics import timed
 
+# Cards only depend on catalog data, so built cards are reused across turns.
+# Callers must not mutate the returned attachments.
+CARD_CACHE_SIZE = int(os.getenv("CARD_CACHE_SIZE", 1024))
+# Most requested apps listed first on the selection card
+SELECTION_CARD_POPULAR = int(os.getenv("SELECTION_CARD_POPULAR", 5))
+
+@timed("card.build_software_card")
 def build_software_card(app_name: str, versions: list[str]) -> Attachment:
     """
     Returns an adaptive card attachment for a given app with version choices.
     """
+    return _software_card(app_name, tuple(versions))
+
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def _software_card(app_name: str, versions: Tuple[str, ...]) -> Attachment:
     card_json = {
         "type": "AdaptiveCard",
         "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
@@ -48,11 +64,25 @@ def build_software_card(app_name: str, versions: list[str]) -> Attachment:
     return Attachment(content_type="application/vnd.microsoft.card.adaptive", content=card_json)
 
 
-def build_software_selection_card(catalog: dict) -> Attachment:
+# Last selection card, with the catalog and popular apps it was built from.
+# fetch_all_software returns the same dict object until the catalog version
+# changes, so an identity check is enough for the catalog.
+_selection_card: Optional[Tuple[dict, Tuple[str, ...], Attachment]] = None
+
+
+@timed("card.build_software_selection_card")
+def build_software_selection_card(catalog: dict, popular: Sequence[str] = ()) -> Attachment:
     """
     Returns an adaptive card for software selection when user wants to install software 
-    but didn't specify which ones.
+    but didn't specify which ones. The first SELECTION_CARD_POPULAR apps of
+    `popular` (most requested first) lead the list.
     """
+    global _selection_card
+    top = tuple(app for app in popular if app in catalog)[:SELECTION_CARD_POPULAR]
+    cached = _selection_card
+    if cached and cached[0] is catalog and cached[1] == top:
+        return cached[2]
+
     # Create choices from catalog
     choices = []
     for app_name, versions in catalog.items():
@@ -62,8 +92,11 @@ def build_software_selection_card(catalog: dict) -> Attachment:
             "value": app_name
         })
     
-    # Sort choices alphabetically
-    choices.sort(key=lambda x: x["title"])
+    # Most requested apps first, the rest alphabetically
+    rank = {app_name: i for i, app_name in enumerate(top)}
+    choices.sort(key=lambda x: (rank.get(x["value"], len(rank)), x["title"]))
+    for choice in choices[:len(top)]:
+        choice["title"] = f"🔥 {choice['title']}"
     
     card_json = {
         "type": "AdaptiveCard",
@@ -105,6 +138,16 @@ def build_software_selection_card(catalog: dict) -> Attachment:
         ]
     }
 
-    return Attachment(content_type="application/vnd.microsoft.card.adaptive", content=card_json)
+    attachment = Attachment(content_type="application/vnd.microsoft.card.adaptive", content=card_json)
+    _selection_card = (catalog, top, attachment)
+    return attachment
+
+
 
 
+def warm_card_cache(catalog: dict, popular: Sequence[str] = ()) -> int:
+    """Pre-build the selection card and the per-app cards for `catalog`. Returns the number of cards built."""
+    build_software_selection_card(catalog, popular)
+    for app_name, versions in list(catalog.items())[:CARD_CACHE_SIZE]:
+        build_software_card(app_name, versions)
+    return 1 + min(len(catalog), CARD_CACHE_SIZE)
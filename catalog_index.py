@@ -0,0 +1,214 @@
+# catalog_index.py
+"""
+Candidate shortlisting for software-name extraction.
+
+CatalogIndex keeps the catalog names in a token index and a character-trigram
+index, so the few apps a message most likely refers to are found locally and
+only those go into the LLM prompt, not the whole catalog. A message token
+matches a name token exactly, or approximately when their trigram sets are
+similar enough ("chrom", "postgre", "photshop"). Each match is weighted by how
+rare the name token is in the catalog, so "visual" counts for more than
+"microsoft". Aliases from the software_alias table are indexed as extra
+spellings of their app.
+
+find_software_mentions is the dictionary-only path used when the LLM is not
+called at all: it resolves the words of a message through the alias map.
+
+    python catalog_index.py [names]     # build and query time on a synthetic catalog
+"""
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from db_connector import get_catalog_snapshot, get_software_aliases, normalize_software_name
+
+# Candidates kept for the extraction prompt
+EXTRACTION_TOP_K = int(os.getenv("EXTRACTION_TOP_K", 20))
+# Minimum trigram similarity (Dice coefficient) for an approximate token match
+FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", 0.5))
+# Longest software name or alias, in words, that find_software_mentions looks for
+MAX_NAME_WORDS = 4
+
+# Request words that say nothing about which app is meant
+STOPWORDS = frozenset("""
+    a also an and app apps can could do for get give hello hey hi i install installed installing is it
+    kindly latest me my need new on please pls set setup software some thanks the to tool tools up us
+    want we with would you
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.rstrip(".") for token in _TOKEN.findall(text.lower())]
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"[^a-z0-9+#]", "", text.lower())
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CatalogIndex:
+    def __init__(self, names: Iterable[str], aliases: Optional[Dict[str, str]] = None):
+        self.names = list(dict.fromkeys(name.lower() for name in names))
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        # Each spelling with the id of the app it stands for
+        spellings = [(name, i) for i, name in enumerate(self.names)]
+        for alias, name in (aliases or {}).items():
+            if name in self._ids and alias != normalize_software_name(name):
+                spellings.append((alias, self._ids[name]))
+
+        # name token -> ids of the names containing it. Multi-word names are
+        # also indexed squashed together, so "nodejs" finds "node.js"; those
+        # only match exactly.
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        words: Set[str] = set()
+        for name, i in spellings:
+            tokens = set(tokenize(name))
+            words |= tokens
+            if len(tokens) > 1 or "." in name:
+                tokens.add(_compact(name))
+            for token in tokens:
+                self._postings[token].add(i)
+
+        # trigram -> name words containing it
+        self._token_grams: Dict[str, Set[str]] = {}
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+        for token in words:
+            grams = self._token_grams[token] = trigrams(token)
+            for gram in grams:
+                self._grams[gram].add(token)
+
+        total = len(self.names)
+        self._idf = {token: math.log(1 + total / len(ids)) for token, ids in self._postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._ids
+
+    def _similar_tokens(self, token: str, fuzzy: bool = True) -> Dict[str, float]:
+        """Name tokens matching `token`, with their similarity in (0, 1]"""
+        if token in self._postings:
+            return {token: 1.0}
+        if not fuzzy or len(token) < 3:
+            return {}
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        matches = {}
+        for candidate, count in shared.items():
+            similarity = 2 * count / (len(grams) + len(self._token_grams[candidate]))
+            if similarity >= FUZZY_MATCH_THRESHOLD:
+                matches[candidate] = similarity
+        return matches
+
+    def shortlist(self, message: str, k: int = EXTRACTION_TOP_K) -> List[str]:
+        """Up to `k` catalog names the message most likely refers to, best first"""
+        tokens = [token for token in tokenize(message) if token not in STOPWORDS]
+        # Adjacent words squashed together too, exact matches only: "node js" -> "nodejs"
+        query = [(token, True) for token in tokens] + [(a + b, False) for a, b in zip(tokens, tokens[1:])]
+
+        best: Dict[str, float] = {}
+        for token, fuzzy in dict.fromkeys(query):
+            for name_token, similarity in self._similar_tokens(token, fuzzy).items():
+                if similarity > best.get(name_token, 0.0):
+                    best[name_token] = similarity
+
+        scores: Dict[int, float] = defaultdict(float)
+        for name_token, similarity in best.items():
+            weight = similarity * self._idf[name_token]
+            for i in self._postings[name_token]:
+                scores[i] += weight
+
+        # Equal scores: the shorter name is the closer match ("zoom" before "zoom rooms")
+        ranked = sorted(scores, key=lambda i: (-scores[i], len(self.names[i]), self.names[i]))
+        return [self.names[i] for i in ranked[:k]]
+
+
+# Index over the catalog it was built from. fetch_all_software returns the same
+# dict object until the catalog version changes, so an identity check is enough.
+# The index is fully built before it replaces the old one.
+_index: Optional[Tuple[dict, CatalogIndex]] = None
+
+
+def get_catalog_index() -> CatalogIndex:
+    """Index over the current catalog, rebuilt only when the cached catalog changes"""
+    global _index
+    catalog, aliases = get_catalog_snapshot()
+    cached = _index
+    if cached and cached[0] is catalog:
+        return cached[1]
+    index = CatalogIndex(catalog, aliases)
+    _index = (catalog, index)
+    return index
+
+
+def split_software_mentions(message: str) -> Tuple[List[str], List[str]]:
+    """
+    Catalog apps the message names, by name or alias, and the words left over.
+    Longest match first, so "visual studio code" is one app rather than
+    "visual studio" and "code"; "vs code" also matches the alias "vscode".
+    """
+    aliases = get_software_aliases()
+    words = normalize_software_name(message).split()
+    found, rest = [], []
+    i = 0
+    while i < len(words):
+        for n in range(min(MAX_NAME_WORDS, len(words) - i), 0, -1):
+            span = words[i:i + n]
+            name = aliases.get(" ".join(span)) or (n > 1 and aliases.get("".join(span)))
+            if name:
+                found.append(name)
+                i += n
+                break
+        else:
+            rest.append(words[i])
+            i += 1
+    return list(dict.fromkeys(found)), rest
+
+
+def find_software_mentions(message: str) -> List[str]:
+    """Catalog apps the message names, by name or alias, in the order mentioned"""
+    return split_software_mentions(message)[0]
+
+
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(7)
+    vendors = ["microsoft", "adobe", "google", "jetbrains", "oracle", "autodesk", "apache", "mozilla", ""]
+    words = ["studio", "code", "reader", "chrome", "teams", "office", "cloud", "desktop", "server", "client",
+             "analytics", "designer", "manager", "toolkit", "runtime", "sdk", "viewer", "editor", "sync", "vpn"]
+    names = {"google chrome", "visual studio code", "node.js", "slack", "zoom", "zoom rooms", "postgresql"}
+    aliases = {"vscode": "visual studio code", "chrome": "google chrome", "postgres": "postgresql"}
+    while len(names) < count:
+        parts = [rng.choice(vendors)] + rng.sample(words, 2) + [f"x{rng.randrange(10 ** 4)}"]
+        names.add(" ".join(p for p in parts if p))
+
+    start = time.perf_counter()
+    index = CatalogIndex(names, aliases)
+    print(f"built index over {len(index)} names in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    messages = ["please install chrome and slack", "I need vscode", "can you set up node js",
+                "install postgre", "get me zoom", "install chrom"]
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            index.shortlist(message)
+    per_query = (time.perf_counter() - start) / (rounds * len(messages)) * 1000
+    print(f"shortlist: {per_query:.2f} ms per message")
+    for message in messages:
+        print(f"  {message!r:<36} -> {index.shortlist(message, 5)}")
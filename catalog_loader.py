@@ -0,0 +1,360 @@
+# catalog_loader.py
+"""
+Bulk import and sync of the software table from the packaging system's export.
+
+    python catalog_loader.py load catalog.csv            # or .jsonl
+    python catalog_loader.py load catalog.jsonl --batch-size 10000 --no-delete
+    python catalog_loader.py generate sample.csv 1000000 # synthetic export for load testing
+
+The file is streamed: each record has `name` and `version` and optionally
+`description` and `download_url` (CSV header or JSON keys). Rows are upserted
+on (name, version) in batches, one transaction per batch. Every row the
+source contains is stamped with this run's id in `last_synced`. When the whole
+file has loaded, rows that were not stamped are gone from the source and are
+deleted, also in batches. Nothing is kept per row in memory, so memory use does
+not grow with the input.
+
+If the load fails part-way, nothing is deleted and the next run repairs it. A
+run that would delete more than --max-delete-fraction of the catalog stops
+before deleting, unless --force is given, so a truncated export cannot wipe
+the catalog.
+
+Triggers on software and software_alias bump catalog_version whenever catalog
+data changes; workers poll that one row and reload only then. Re-stamping
+last_synced alone is not a change, so syncing an unchanged export reloads
+nothing. During a load the triggers only note that something changed
+(@catalog_bulk_load is set on the loader's connection) and the loader bumps
+the version once at the end, so workers reload once per load, not per row.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+BATCH_SIZE = 5000
+MAX_DELETE_FRACTION = 0.5
+
+UPSERT_SQL = """
+    INSERT INTO software (name, version, description, download_url, last_synced)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        description = VALUES(description),
+        download_url = VALUES(download_url),
+        last_synced = VALUES(last_synced)
+"""
+
+# Other spellings users type for catalog software, mapped to the catalog name
+SOFTWARE_ALIAS_DDL = """
+    CREATE TABLE IF NOT EXISTS software_alias (
+        alias VARCHAR(255) NOT NULL PRIMARY KEY,
+        software_name VARCHAR(255) NOT NULL,
+        INDEX idx_software_name (software_name)
+    )
+"""
+
+CATALOG_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id TINYINT NOT NULL PRIMARY KEY,
+        version BIGINT UNSIGNED NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+_BUMP = "UPDATE catalog_version SET version = version + 1 WHERE id = 1"
+# Inside a bulk load only note the change; the loader bumps once when it is done
+_BUMP_UNLESS_BULK = f"IF @catalog_bulk_load IS NULL THEN {_BUMP}; ELSE SET @catalog_changed = 1; END IF"
+
+# name -> (table, event, body). Updates count only when a column the bot shows changes.
+CATALOG_TRIGGERS = {
+    "software_version_ins": ("software", "INSERT", _BUMP_UNLESS_BULK),
+    "software_version_upd": ("software", "UPDATE", f"""
+        BEGIN
+            IF NOT (OLD.name <=> NEW.name AND OLD.version <=> NEW.version
+                    AND OLD.description <=> NEW.description AND OLD.download_url <=> NEW.download_url) THEN
+                {_BUMP_UNLESS_BULK};
+            END IF;
+        END"""),
+    "software_version_del": ("software", "DELETE", _BUMP_UNLESS_BULK),
+    "software_alias_version_ins": ("software_alias", "INSERT", _BUMP_UNLESS_BULK),
+    "software_alias_version_upd": ("software_alias", "UPDATE", _BUMP_UNLESS_BULK),
+    "software_alias_version_del": ("software_alias", "DELETE", _BUMP_UNLESS_BULK),
+}
+
+
+class CatalogLoadError(Exception):
+    pass
+
+
+def _has_index(cursor, name: str) -> bool:
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'software' AND INDEX_NAME = %s
+    """, [name])
+    return cursor.fetchone()[0] > 0
+
+
+def ensure_schema(conn):
+    """
+    Add the unique (name, version) key, the last_synced column, the
+    software_alias table and the catalog_version table if missing
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'software' AND COLUMN_NAME = 'last_synced'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("ALTER TABLE software ADD COLUMN last_synced BIGINT NULL, ADD INDEX idx_last_synced (last_synced)")
+        print("✅ software: added last_synced")
+
+    if not _has_index(cursor, "uq_name_version"):
+        # The same (name, version) twice carries no information; keep the oldest row
+        cursor.execute("""
+            DELETE s1 FROM software s1
+            JOIN software s2 ON s1.name = s2.name AND s1.version = s2.version AND s1.id > s2.id
+        """)
+        if cursor.rowcount:
+            print(f"🧹 software: removed {cursor.rowcount} duplicate (name, version) rows")
+        cursor.execute("ALTER TABLE software ADD UNIQUE KEY uq_name_version (name, version)")
+        print("✅ software: added unique key on (name, version)")
+
+    # Before the triggers, so the alias triggers are created with it
+    cursor.execute(SOFTWARE_ALIAS_DDL)
+    ensure_catalog_version(cursor)
+    conn.commit()
+    cursor.close()
+
+
+def ensure_catalog_version(cursor):
+    """
+    Create catalog_version and any missing trigger that bumps it, and replace
+    triggers whose body differs from CATALOG_TRIGGERS (e.g. created before the
+    bulk-load flag). Creating triggers needs the TRIGGER privilege, and SUPER
+    or log_bin_trust_function_creators when binary logging is on.
+    """
+    cursor.execute(CATALOG_VERSION_DDL)
+    cursor.execute("INSERT IGNORE INTO catalog_version (id, version) VALUES (1, 1)")
+    cursor.execute("""
+        SELECT TABLE_NAME FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ('software', 'software_alias')
+    """)
+    tables = {row[0] for row in cursor.fetchall()}
+    cursor.execute(
+        "SELECT TRIGGER_NAME, ACTION_STATEMENT FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE()"
+    )
+    existing = {row[0]: " ".join(row[1].split()) for row in cursor.fetchall()}
+    for name, (table, event, body) in CATALOG_TRIGGERS.items():
+        if table not in tables or existing.get(name) == " ".join(body.split()):
+            continue
+        if name in existing:
+            cursor.execute(f"DROP TRIGGER {name}")
+        cursor.execute(f"CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW {body}")
+        print(f"✅ {table}: {'replaced' if name in existing else 'added'} trigger {name}")
+
+
+def read_catalog_version(cursor) -> int:
+    cursor.execute("SELECT version FROM catalog_version WHERE id = 1")
+    return cursor.fetchone()[0]
+
+
+def end_bulk_load(cursor) -> bool:
+    """Clear the bulk-load flag and bump catalog_version once if the load changed anything"""
+    cursor.execute("SELECT @catalog_changed")
+    changed = cursor.fetchone()[0] is not None
+    cursor.execute("SET @catalog_bulk_load = NULL, @catalog_changed = NULL")
+    if changed:
+        cursor.execute(_BUMP)
+    return changed
+
+
+class _Progress:
+    """Characters read so far, for a percentage against the file size"""
+
+    def __init__(self, total: int):
+        self.total = max(total, 1)
+        self.read = 0
+
+    def lines(self, f) -> Iterator[str]:
+        for line in f:
+            self.read += len(line)
+            yield line
+
+    @property
+    def fraction(self) -> float:
+        return min(self.read / self.total, 1.0)
+
+
+def read_records(path: str, fmt: Optional[str], progress: _Progress) -> Iterator[Dict]:
+    """Stream records from a CSV or JSONL file"""
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(progress.lines(f))
+        else:
+            for number, line in enumerate(progress.lines(f), 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise CatalogLoadError(f"{path}:{number}: invalid JSON: {e}")
+
+
+def _row(record: Dict, run_id: int) -> Optional[Tuple]:
+    name = str(record.get("name") or "").strip()
+    version = str(record.get("version") or "").strip()
+    if not name or not version or len(name) > 255 or len(version) > 50:
+        return None
+    return (name, version, record.get("description") or None, record.get("download_url") or None, run_id)
+
+
+def _batches(records: Iterable[Dict], run_id: int, size: int, stats: Dict) -> Iterator[List[Tuple]]:
+    batch = []
+    for record in records:
+        row = _row(record, run_id)
+        if row is None:
+            stats["skipped"] += 1
+            continue
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def delete_unsynced(conn, run_id: int, batch_size: int) -> int:
+    """Delete, in batches, every row this run did not see"""
+    cursor = conn.cursor()
+    deleted = 0
+    while True:
+        cursor.execute(
+            "DELETE FROM software WHERE last_synced IS NULL OR last_synced <> %s LIMIT %s",
+            [run_id, batch_size],
+        )
+        conn.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            break
+    cursor.close()
+    return deleted
+
+
+def load_catalog(conn, path: str, fmt: Optional[str] = None, batch_size: int = BATCH_SIZE,
+                 delete_missing: bool = True, max_delete_fraction: float = MAX_DELETE_FRACTION,
+                 force: bool = False) -> Dict:
+    """Upsert every record of `path`, then delete rows the source no longer has. Returns counts."""
+    ensure_schema(conn)
+    run_id = time.time_ns() // 1000
+    stats = {"rows": 0, "skipped": 0, "deleted": 0, "batches": 0}
+    progress = _Progress(os.path.getsize(path))
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    # The triggers only note changes made on this connection (session variables)
+    cursor.execute("SET @catalog_bulk_load = 1, @catalog_changed = NULL")
+
+    try:
+        for batch in _batches(read_records(path, fmt, progress), run_id, batch_size, stats):
+            try:
+                cursor.executemany(UPSERT_SQL, batch)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            stats["rows"] += len(batch)
+            stats["batches"] += 1
+            elapsed = time.perf_counter() - start
+            print(f"\r📦 {stats['rows']:,} rows ({progress.fraction:.0%}), {stats['rows'] / elapsed:,.0f} rows/s",
+                  end="", flush=True)
+        print()
+
+        if delete_missing:
+            cursor.execute("SELECT COUNT(*) FROM software")
+            total = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM software WHERE last_synced IS NULL OR last_synced <> %s", [run_id])
+            missing = cursor.fetchone()[0]
+            if missing and not force and missing > total * max_delete_fraction:
+                raise CatalogLoadError(
+                    f"{missing} of {total} rows are not in {path}; refusing to delete more than "
+                    f"{max_delete_fraction:.0%} of the catalog (use --force if this is intended)"
+                )
+            stats["deleted"] = delete_unsynced(conn, run_id, batch_size)
+    except Exception:
+        # Batches committed before the failure still have to reach the workers
+        try:
+            end_bulk_load(cursor)
+            conn.commit()
+        except Exception as e:
+            print(f"⚠️  Could not bump catalog_version: {e}")
+        raise
+
+    stats["catalog_changed"] = end_bulk_load(cursor)
+    conn.commit()
+    stats["catalog_version"] = read_catalog_version(cursor)
+    cursor.close()
+    stats["seconds"] = round(time.perf_counter() - start, 1)
+    return stats
+
+
+def generate_sample(path: str, rows: int, versions_per_app: int = 5):
+    """Write a synthetic export with `rows` rows, as CSV or JSONL by extension"""
+    rng = random.Random(42)
+    words = ["studio", "code", "reader", "cloud", "desktop", "server", "client", "analytics", "designer", "sync"]
+    jsonl = path.endswith((".jsonl", ".ndjson"))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = None if jsonl else csv.writer(f)
+        if writer:
+            writer.writerow(["name", "version", "description", "download_url"])
+        for i in range(rows):
+            app = i // versions_per_app
+            name = f"{words[app % len(words)].title()} {words[(app // 10) % len(words)].title()} {app}"
+            record = {
+                "name": name,
+                "version": f"{i % versions_per_app + 1}.{rng.randrange(20)}.{rng.randrange(100)}",
+                "description": f"Sample package {app}",
+                "download_url": f"https://packages.example.com/{app}",
+            }
+            if writer:
+                writer.writerow(record.values())
+            else:
+                f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    load_cmd = commands.add_parser("load", help="upsert a CSV/JSONL export and delete what it no longer has")
+    load_cmd.add_argument("path")
+    load_cmd.add_argument("--format", choices=["csv", "jsonl"])
+    load_cmd.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    load_cmd.add_argument("--no-delete", action="store_true", help="only upsert; keep rows missing from the file")
+    load_cmd.add_argument("--max-delete-fraction", type=float, default=MAX_DELETE_FRACTION)
+    load_cmd.add_argument("--force", action="store_true", help="delete even above --max-delete-fraction")
+    generate_cmd = commands.add_parser("generate", help="write a synthetic export for load testing")
+    generate_cmd.add_argument("path")
+    generate_cmd.add_argument("rows", type=int)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate_sample(args.path, args.rows)
+        print(f"✅ Wrote {args.rows:,} rows to {args.path}")
+        sys.exit(0)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from db_connector import DB_CONFIG
+    import mysql.connector
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        result = load_catalog(connection, args.path, args.format, args.batch_size, not args.no_delete,
+                              args.max_delete_fraction, args.force)
+        print(f"✅ Catalog loaded: {result}")
+    except CatalogLoadError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
@@ -10,3 +10,18 @@ class DefaultConfig:
     PORT = 3978
     APP_ID = os.environ.get("MicrosoftAppId", "")
     APP_PASSWORD = os.environ.get("MicrosoftAppPassword", "")
+    SN_WEBHOOK_SECRET = os.environ.get("SN_WEBHOOK_SECRET", "")
+    STATUS_FLUSH_INTERVAL = float(os.environ.get("STATUS_FLUSH_INTERVAL", 1.0))
+    STATUS_MAX_BATCH = int(os.environ.get("STATUS_MAX_BATCH", 500))
+    # Incidents waiting for a status flush; webhooks get 503 beyond this
+    STATUS_MAX_PENDING = int(os.environ.get("STATUS_MAX_PENDING", 10000))
+    NOTIFY_CONCURRENCY = int(os.environ.get("NOTIFY_CONCURRENCY", 20))
+    NOTIFY_RATE_PER_CHANNEL = float(os.environ.get("NOTIFY_RATE_PER_CHANNEL", 10))
+    NOTIFY_BURST_PER_CHANNEL = int(os.environ.get("NOTIFY_BURST_PER_CHANNEL", 20))
+    NOTIFY_MAX_RETRIES = int(os.environ.get("NOTIFY_MAX_RETRIES", 3))
+    NOTIFY_QUEUE_SIZE = int(os.environ.get("NOTIFY_QUEUE_SIZE", 10000))
+    WARMUP_TIMEOUT = float(os.environ.get("WARMUP_TIMEOUT", 15))
+    # Seconds between request_logging maintenance runs (partitions, rollups, retention); 0 disables
+    REQUEST_LOG_MAINTENANCE_INTERVAL = float(os.environ.get("REQUEST_LOG_MAINTENANCE_INTERVAL", 6 * 3600))
+    # Seconds between writes of the daily LLM token totals to llm_usage_daily
+    LLM_USAGE_FLUSH_INTERVAL = float(os.environ.get("LLM_USAGE_FLUSH_INTERVAL", 60))
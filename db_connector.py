@@ -217,11 +217,20 @@
 
 # db_connector.py
 import os
-import mysql.connector
-from dotenv import load_dotenv
-from typing import Dict, List, Optional
- 
-load_dotenv()
+import re
+import json
+import time
+import logging
+import threading
+from metrics import timed
+from single_flight import SingleFlight
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+# mysql.connector is imported on first connection, not at import time
+if TYPE_CHECKING:
+    from mysql.connector import pooling
+
+logger = logging.getLogger(__name__)
  
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
@@ -230,25 +239,182 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD"),
     "database": os.getenv("DB_NAME"),
 }
+
+# Connections kept open per process. serve.py divides the pod-wide value
+# between its workers; 0 disables pooling. mysql-connector caps pools at 32.
+DB_POOL_SIZE = min(int(os.getenv("DB_POOL_SIZE", 10)), 32)
+
+_pool: Optional["pooling.MySQLConnectionPool"] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> "pooling.MySQLConnectionPool":
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from mysql.connector import pooling
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name=f"installer_bot_{os.getpid()}",
+                    pool_size=DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    **DB_CONFIG,
+                )
+    return _pool
  
  
 def get_connection():
-    """Get database connection with error handling"""
+    """
+    Get database connection with error handling. Pooled connections go back to
+    the pool on close(); when the pool is exhausted a one-off connection is
+    opened instead of failing the request.
+    """
+    import mysql.connector
+
     try:
+        if DB_POOL_SIZE > 0:
+            try:
+                return _get_pool().get_connection()
+            except mysql.connector.errors.PoolError:
+                logger.warning("Database pool exhausted (%d connections), opening a direct connection", DB_POOL_SIZE)
         return mysql.connector.connect(**DB_CONFIG)
     except mysql.connector.Error as e:
-        print(f"Database connection error: {e}")
+        logger.error("Database connection error: %s", e)
         raise
- 
- 
+
+
+def warm_connection_pool() -> int:
+    """
+    Open the pool's connections and check one with a round trip. Used at startup
+    so the first turns don't pay for connecting. Raises on failure.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return DB_POOL_SIZE
+
+
+# The full catalog is read on every "install software" turn but changes rarely,
+# so it is kept in memory. Every write to software or software_alias bumps the
+# one-row catalog_version table (triggers, see catalog_loader.py), so the snapshot
+# is reused until a primary-key read of that row says it changed; the version is
+# checked at most every CATALOG_POLL_INTERVAL seconds. app.py polls it in the
+# background, so turns normally never wait for the check. Databases without
+# catalog_version fall back to reloading every CATALOG_CACHE_TTL seconds.
+# The alias map is loaded with the catalog, and a snapshot is replaced as one
+# tuple, so readers never see one snapshot's catalog with another's aliases:
+# (catalog, aliases, version, checked_at). Callers must not mutate it.
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", 5))
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", 300))
+_catalog_cache: Optional[Tuple[Dict[str, List[str]], Dict[str, str], Optional[int], float]] = None
+
+# Identical catalog queries running at the same time (e.g. a crowd asking for the
+# catalog the moment the cache expires) share one database round trip
+CATALOG_FLIGHT = SingleFlight("catalog")
+
+
+def _is_current(cached) -> bool:
+    if cached[2] is None:
+        return time.time() - cached[3] < CATALOG_CACHE_TTL
+    # Two intervals: readers only check themselves if the background poll falls behind
+    return time.time() - cached[3] < 2 * CATALOG_POLL_INTERVAL
+
+
+def get_cached_catalog() -> Optional[Dict[str, List[str]]]:
+    """The in-memory catalog if it is known to be current, without touching the database"""
+    cached = _catalog_cache
+    if cached and _is_current(cached):
+        return cached[0]
+    return None
+
+
+def get_catalog_snapshot() -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """The current catalog and the alias map loaded with it"""
+    catalog = fetch_all_software()
+    cached = _catalog_cache
+    if cached and cached[0] is catalog:
+        return catalog, cached[1]
+    # Only when the database is unavailable and nothing was ever loaded
+    return catalog, {}
+
+
+def invalidate_catalog_cache():
+    global _catalog_cache
+    _catalog_cache = None
+
+
+@timed("db.fetch_all_software")
 def fetch_all_software() -> Dict[str, List[str]]:
     """
     Returns all software grouped by name -> [versions].
     Example: { "zoom": ["5.16.2", "5.15.9"], "slack": ["4.30.0"] }
+    Served from the in-memory catalog cache while it is fresh.
     """
+    catalog = get_cached_catalog()
+    if catalog is not None:
+        return catalog
+    return refresh_catalog()
+
+
+def refresh_catalog() -> Dict[str, List[str]]:
+    """
+    Check the catalog version now and reload the catalog only if it changed.
+    Returns the current catalog: the same dict object as before when nothing
+    changed, so caches keyed on it stay valid. Databases without
+    catalog_version have nothing to check; they reload every CATALOG_CACHE_TTL.
+    """
+    return CATALOG_FLIGHT.call("all", _refresh_catalog)
+
+
+def _refresh_catalog() -> Dict[str, List[str]]:
+    global _catalog_cache
+    cached = _catalog_cache
+    if cached and cached[2] is None and _is_current(cached):
+        # No catalog_version table to poll: reload only once CATALOG_CACHE_TTL is up
+        return cached[0]
+    if cached and cached[2] is not None:
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            version = _read_catalog_version(cursor)
+            cursor.close()
+            conn.close()
+        except Exception as e:
+            logger.error("Error checking the catalog version: %s", e)
+            return cached[0]
+        if version == cached[2]:
+            _catalog_cache = (cached[0], cached[1], version, time.time())
+            return cached[0]
+        logger.info("Catalog version %s -> %s, reloading", cached[2], version)
+    return _load_all_software()
+
+
+def _read_catalog_version(cursor) -> Optional[int]:
+    """The catalog version, or None for databases without the catalog_version table"""
+    try:
+        cursor.execute("SELECT version FROM catalog_version WHERE id = 1")
+        row = cursor.fetchone()
+    except Exception as e:
+        if getattr(e, "errno", None) != 1146:  # ER_NO_SUCH_TABLE
+            raise
+        return None
+    return int(row[0]) if row else None
+
+
+def _load_all_software() -> Dict[str, List[str]]:
+    global _catalog_cache
+    cached = _catalog_cache
     try:
         conn = get_connection()
         cursor = conn.cursor()
+        # Read before the catalog: a write landing in between is seen as a
+        # change on the next poll rather than missed
+        catalog_version = _read_catalog_version(cursor)
        
         # Order by version descending to get latest versions first
         cursor.execute("""
@@ -258,20 +424,31 @@ def fetch_all_software() -> Dict[str, List[str]]:
         """)
        
         rows = cursor.fetchall()
+
+        try:
+            cursor.execute("SELECT alias, software_name FROM software_alias")
+            alias_rows = cursor.fetchall()
+        except Exception as e:
+            # Databases created before the alias table existed
+            logger.warning("Software aliases unavailable: %s", e)
+            alias_rows = []
         cursor.close()
         conn.close()
  
         catalog = {}
         for name, version in rows:
             catalog.setdefault(name.lower(), []).append(version)
-       
+
+        _catalog_cache = (catalog, _build_alias_map(catalog, alias_rows), catalog_version, time.time())
         return catalog
    
     except Exception as e:
-        print(f"Error fetching all software: {e}")
-        return {}
+        logger.error("Error fetching all software: %s", e)
+        # Better a slightly stale catalog than none while the database is unavailable
+        return cached[0] if cached else {}
  
  
+@timed("db.fetch_software_by_names")
 def fetch_software_by_names(app_names: List[str]) -> Dict[str, List[str]]:
     """
     Fetch only software in app_names list.
@@ -279,7 +456,11 @@ def fetch_software_by_names(app_names: List[str]) -> Dict[str, List[str]]:
     """
     if not app_names:
         return {}
- 
+    key = ("names",) + tuple(sorted({name.lower() for name in app_names}))
+    return CATALOG_FLIGHT.call(key, _query_software_by_names, app_names)
+
+
+def _query_software_by_names(app_names: List[str]) -> Dict[str, List[str]]:
     try:
         conn = get_connection()
         cursor = conn.cursor()
@@ -309,17 +490,21 @@ def fetch_software_by_names(app_names: List[str]) -> Dict[str, List[str]]:
         return catalog
    
     except Exception as e:
-        print(f"Error fetching software by names: {e}")
+        logger.error("Error fetching software by names: %s", e)
         return {}
  
  
+@timed("db.search_software_fuzzy")
 def search_software_fuzzy(search_term: str) -> Dict[str, List[str]]:
     """
     Fuzzy search for software names containing the search term.
     """
     if not search_term:
         return {}
-   
+    return CATALOG_FLIGHT.call(("fuzzy", search_term.lower()), _query_software_fuzzy, search_term)
+
+
+def _query_software_fuzzy(search_term: str) -> Dict[str, List[str]]:
     try:
         conn = get_connection()
         cursor = conn.cursor()
@@ -344,10 +529,73 @@ def search_software_fuzzy(search_term: str) -> Dict[str, List[str]]:
         return catalog
    
     except Exception as e:
-        print(f"Error in fuzzy search: {e}")
+        logger.error("Error in fuzzy search: %s", e)
         return {}
+
+
+def normalize_software_name(text: str) -> str:
+    """Lookup key for a software name or alias: lowercase words, punctuation dropped ("Node.js" -> "node js")"""
+    return " ".join(re.findall(r"[a-z0-9+#]+", text.lower()))
+
+
+def _build_alias_map(catalog: Dict[str, List[str]], alias_rows) -> Dict[str, str]:
+    """
+    Lookup key -> canonical catalog name, for every catalog name, the same name
+    without spaces ("nodejs", "googlechrome") and every alias in software_alias.
+    A catalog name always wins over an alias spelled the same way, and aliases
+    for software that is not in the catalog are ignored.
+    """
+    aliases = {normalize_software_name(name): name for name in catalog}
+    for key, name in list(aliases.items()):
+        aliases.setdefault(key.replace(" ", ""), name)
+    for alias, software_name in alias_rows:
+        canonical = software_name.lower()
+        if canonical in catalog:
+            aliases.setdefault(normalize_software_name(alias), canonical)
+    return aliases
+
+
+def get_software_aliases() -> Dict[str, str]:
+    """
+    Lookup key (see normalize_software_name) -> canonical name, from the current
+    catalog snapshot. The database is only read if no snapshot has been loaded
+    yet; refreshing is left to fetch_all_software.
+    """
+    cached = _catalog_cache
+    if cached is None:
+        fetch_all_software()
+        cached = _catalog_cache
+    return cached[1] if cached else {}
+
+
+def resolve_software_alias(name: str) -> Optional[str]:
+    """Canonical (lowercase) catalog name for a catalog name or any alias of it, or None"""
+    return get_software_aliases().get(normalize_software_name(name))
+
+
+def get_all_software_names() -> List[str]:
+    """Every software name in the catalog (lowercase), served from the catalog cache"""
+    return list(fetch_all_software())
+
+
+def search_software_by_partial_name(partial_name: str, limit: int = 10) -> List[str]:
+    """
+    Catalog names containing `partial_name`, best match first: exact, then
+    prefix, then anywhere in the name, shorter names first. Served from the
+    catalog cache, not the database.
+    """
+    term = partial_name.strip().lower()
+    if not term:
+        return []
+    ranked = []
+    for name in fetch_all_software():
+        position = name.find(term)
+        if position >= 0:
+            ranked.append((0 if name == term else 1 if position == 0 else 2, len(name), name))
+    return [name for _, _, name in sorted(ranked)[:limit]]
  
  
+@timed("db.get_software_info")
 def get_software_info(app_name: str, version: Optional[str] = None) -> Optional[Dict]:
     """
     Get information about a specific software and version.
@@ -390,46 +638,90 @@ def get_software_info(app_name: str, version: Optional[str] = None) -> Optional[
         return None
        
     except Exception as e:
-        print(f"Error getting software info: {e}")
+        logger.error("Error getting software info: %s", e)
         return None
  
  
-def get_popular_software(limit: int = 10) -> Dict[str, List[str]]:
-    """
-    Get software from the database, limited by count.
-    Returns software alphabetically since we don't have popularity tracking.
-    """
+# Requests per app and day, counted by log_software_request as requests are
+# logged, so popularity never needs a COUNT(*) over request_logging:
+#   software_popularity (software_name, bucket_date, requests)
+# The per-app sums over the last POPULARITY_WINDOW_DAYS are held in memory and
+# reloaded every POPULARITY_CACHE_TTL seconds, which also picks up requests
+# logged by other processes. Between reloads this process's own requests are
+# added as they happen.
+POPULARITY_WINDOW_DAYS = int(os.getenv("POPULARITY_WINDOW_DAYS", 30))
+POPULARITY_TOP_N = int(os.getenv("POPULARITY_TOP_N", 50))
+POPULARITY_CACHE_TTL = int(os.getenv("POPULARITY_CACHE_TTL", 300))
+
+_popularity_lock = threading.Lock()
+_popularity_counts: Dict[str, int] = {}
+# The POPULARITY_TOP_N most requested apps, most requested first. Replaced, never mutated.
+_popular: List[str] = []
+_popularity_loaded_at = 0.0
+
+
+def _rank_popular(counts: Dict[str, int], names) -> List[str]:
+    return sorted(names, key=lambda name: (-counts[name], name))[:POPULARITY_TOP_N]
+
+
+def _load_popularity():
+    global _popularity_counts, _popular, _popularity_loaded_at
+    counts = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
-       
-        # Get unique software names first, then get all versions for each
-        query = """
-            SELECT name, version
-            FROM software
-            WHERE name IN (
-                SELECT DISTINCT name
-                FROM software
-                ORDER BY name
-                LIMIT %s
-            )
-            ORDER BY name, version DESC
-        """
-       
-        cursor.execute(query, [limit])
-        rows = cursor.fetchall()
+        cursor.execute("""
+            SELECT software_name, SUM(requests)
+            FROM software_popularity
+            WHERE bucket_date >= CURRENT_DATE - INTERVAL %s DAY
+            GROUP BY software_name
+        """, [POPULARITY_WINDOW_DAYS])
+        counts = {name.lower(): int(total) for name, total in cursor.fetchall()}
         cursor.close()
         conn.close()
-       
-        catalog = {}
-        for name, version in rows:
-            catalog.setdefault(name.lower(), []).append(version)
-       
-        return catalog
-       
     except Exception as e:
-        print(f"Error getting popular software: {e}")
-        return {}
+        logger.error("Error loading software popularity: %s", e)
+
+    with _popularity_lock:
+        if counts is not None:
+            _popularity_counts = counts
+            _popular = _rank_popular(counts, counts)
+        # Also after a failure, so an outage is retried once per TTL rather than on every turn
+        _popularity_loaded_at = time.time()
+
+
+def _count_request(software_name: str):
+    """Add one logged request to the in-memory counts, re-ranking only if it can change the top N"""
+    global _popular
+    name = software_name.lower()
+    with _popularity_lock:
+        counts = _popularity_counts
+        counts[name] = counts.get(name, 0) + 1
+        top = _popular
+        if name in top or len(top) < POPULARITY_TOP_N or counts[name] >= counts[top[-1]]:
+            _popular = _rank_popular(counts, set(top) | {name})
+
+
+def popular_software_names(limit: int = POPULARITY_TOP_N) -> List[str]:
+    """The most requested apps over the last POPULARITY_WINDOW_DAYS, most requested first"""
+    if time.time() - _popularity_loaded_at >= POPULARITY_CACHE_TTL:
+        CATALOG_FLIGHT.call("popularity", _load_popularity)
+    return _popular[:limit]
+
+
+@timed("db.get_popular_software")
+def get_popular_software(limit: int = 10) -> Dict[str, List[str]]:
+    """
+    The `limit` most requested software with their versions, most requested
+    first. Topped up alphabetically from the catalog while there is too little
+    request history.
+    """
+    catalog = fetch_all_software()
+    names = [name for name in popular_software_names(limit) if name in catalog]
+    if len(names) < limit:
+        chosen = set(names)
+        names += [name for name in sorted(catalog) if name not in chosen][:limit - len(names)]
+    return {name: catalog[name] for name in names}
  
  
 # def log_software_request(incident_number: str, app_name: str) -> bool:
@@ -467,7 +759,7 @@ def get_popular_software(limit: int = 10) -> Dict[str, List[str]]:
 #         return True
        
 #     except Exception as e:
-#         print(f"❌ Error logging software request: {e}")
+#         logger.error("Error logging software request: %s", e)
 #         return False
 
 
@@ -517,16 +809,193 @@ def get_popular_software(limit: int = 10) -> Dict[str, List[str]]:
 #         return True
 
 #     except Exception as e:
-#         print(f"❌ Error logging software request: {e}")
+#         logger.error("Error logging software request: %s", e)
 #         return False
 
 
 
+# Statuses after which a request no longer blocks a new ticket for the same software
+CLOSED_REQUEST_STATUSES = ["Resolved", "Closed", "Cancelled", "Failed", "Completed"]
+
+# (requested_by, software, version) -> (incident_number or None, cached_at).
+# Entries expire after a short while so a ticket created, closed or cancelled by
+# another process (or in ServiceNow directly) is picked up soon; closes seen here
+# drop the entry at once.
+_open_requests: Dict[Tuple[str, str, str], Tuple[Optional[str], float]] = {}
+OPEN_REQUEST_CACHE_TTL = int(os.getenv("OPEN_REQUEST_CACHE_TTL", 30))
+
+
+def _open_request_key(requested_by: str, software_name: str, version_name: str) -> Tuple[str, str, str]:
+    return (requested_by.lower(), software_name.lower(), version_name)
+
+
+@timed("db.find_open_request")
+def find_open_request(requested_by: str, software_name: str, version_name: str) -> Optional[str]:
+    """
+    Return the incident number of this user's open install request for the same
+    software and version, or None. Served from memory when possible, otherwise
+    one indexed lookup on (requested_by, software_name, version_name).
+    """
+    if not requested_by:
+        return None
+
+    key = _open_request_key(requested_by, software_name, version_name)
+    cached = _open_requests.get(key)
+    if cached and time.time() - cached[1] < OPEN_REQUEST_CACHE_TTL:
+        return cached[0]
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        placeholders = ", ".join(["%s"] * len(CLOSED_REQUEST_STATUSES))
+        query = f"""
+            SELECT incident_id
+            FROM request_logging
+            WHERE requested_by = %s AND software_name = %s AND version_name = %s
+              AND status NOT IN ({placeholders})
+            ORDER BY timestamp DESC
+            LIMIT 1
+        """
+        cursor.execute(query, [requested_by, software_name, version_name] + CLOSED_REQUEST_STATUSES)
+        row = cursor.fetchone()
+
+        cursor.close()
+        conn.close()
+
+        incident_number = row[0] if row else None
+        _open_requests[key] = (incident_number, time.time())
+        return incident_number
+
+    except Exception as e:
+        logger.error("Error looking up open request: %s", e)
+        return None
+
+
+@timed("db.update_request_statuses")
+def update_request_statuses(updates: Dict[str, str]) -> int:
+    """
+    Apply {incident_number: status} to request_logging in one transaction.
+    Returns the number of rows changed, or -1 if the write failed.
+    """
+    if not updates:
+        return 0
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        query = """
+            UPDATE request_logging
+            SET status = %s
+            WHERE incident_id = %s
+        """
+        cursor.executemany(query, [(status, incident) for incident, status in updates.items()])
+        conn.commit()
+        changed = cursor.rowcount
+
+        cursor.close()
+        conn.close()
+
+        # Closed requests must stop blocking new tickets in the duplicate check
+        closed = {incident for incident, status in updates.items() if status in CLOSED_REQUEST_STATUSES}
+        for key, (incident, _) in list(_open_requests.items()):
+            if incident in closed:
+                del _open_requests[key]
+
+        return changed
+
+    except Exception as e:
+        logger.error("Error updating request statuses: %s", e)
+        return -1
+
+
+@timed("db.save_conversation_reference")
+def save_conversation_reference(incident_number: str, reference: Dict) -> bool:
+    """Store the serialized conversation reference of the user who requested an incident"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        query = """
+            INSERT INTO conversation_references (incident_id, reference)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE reference = VALUES(reference)
+        """
+        cursor.execute(query, [incident_number, json.dumps(reference)])
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+        return True
+
+    except Exception as e:
+        logger.error("Error saving conversation reference: %s", e)
+        return False
+
+
+@timed("db.get_conversation_references")
+def get_conversation_references(incident_numbers: List[str]) -> Dict[str, Dict]:
+    """Return {incident_number: serialized conversation reference} for the given incidents"""
+    if not incident_numbers:
+        return {}
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        placeholders = ", ".join(["%s"] * len(incident_numbers))
+        query = f"""
+            SELECT incident_id, reference
+            FROM conversation_references
+            WHERE incident_id IN ({placeholders})
+        """
+        cursor.execute(query, list(incident_numbers))
+        rows = cursor.fetchall()
+
+        cursor.close()
+        conn.close()
+
+        return {incident: json.loads(reference) for incident, reference in rows}
+
+    except Exception as e:
+        logger.error("Error fetching conversation references: %s", e)
+        return {}
+
+
+@timed("db.delete_conversation_references")
+def delete_conversation_references(incident_numbers: List[str]) -> bool:
+    """Forget references of incidents that will not change again"""
+    if not incident_numbers:
+        return True
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        placeholders = ", ".join(["%s"] * len(incident_numbers))
+        cursor.execute(
+            f"DELETE FROM conversation_references WHERE incident_id IN ({placeholders})",
+            list(incident_numbers)
+        )
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+        return True
+
+    except Exception as e:
+        logger.error("Error deleting conversation references: %s", e)
+        return False
+
+
+@timed("db.log_software_request")
 def log_software_request(
     incident_number: str,
     software_name: str,
     version_name: str,
-    status: str
+    status: str,
+    requested_by: str = ""
 ) -> bool:
     """
     Log software installation request to request_logging table.
@@ -536,6 +1005,7 @@ def log_software_request(
         software_name: Name of the software being requested
         version_name: Version of the software
         status: Status of the request (e.g., Created, Completed, Failed)
+        requested_by: Channel user id of the requester, used for duplicate checks
     Returns:
         bool: True if logging successful, False otherwise
     """
@@ -545,24 +1015,42 @@ def log_software_request(
 
         # Insert log entry without timestamp (auto-handled by DB)
         query = """
-            INSERT INTO request_logging (incident_id, software_name, version_name, status)
-            VALUES (%s, %s, %s, %s)
+            INSERT INTO request_logging (incident_id, software_name, version_name, status, requested_by)
+            VALUES (%s, %s, %s, %s, %s)
         """
 
         cursor.execute(query, [
             incident_number,
             software_name,
             version_name,
-            status
+            status,
+            requested_by or None
         ])
+
+        # Popularity rollup for today, committed with the log entry
+        try:
+            cursor.execute("""
+                INSERT INTO software_popularity (software_name, bucket_date, requests)
+                VALUES (%s, CURRENT_DATE, 1)
+                ON DUPLICATE KEY UPDATE requests = requests + 1
+            """, [software_name.lower()])
+        except Exception as e:
+            logger.warning("Could not update software popularity: %s", e)
         conn.commit()
 
         cursor.close()
         conn.close()
 
-        print(f"📝 Request logged: {incident_number}, {software_name}, {version_name}, {status}")
+        _count_request(software_name)
+        if requested_by and status not in CLOSED_REQUEST_STATUSES:
+            _open_requests[_open_request_key(requested_by, software_name, version_name)] = (incident_number, time.time())
+
+        logger.info(
+            "Request logged",
+            extra={"incident": incident_number, "software": software_name, "version": version_name, "status": status}
+        )
         return True
 
     except Exception as e:
-        print(f"❌ Error logging software request: {e}")
+        logger.error("Error logging software request: %s", e)
         return False
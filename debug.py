@@ -5,6 +5,7 @@ Create the software_catalouge database and populate it with sample data
 import os
 import mysql.connector
 from dotenv import load_dotenv
+from catalog_loader import SOFTWARE_ALIAS_DDL, ensure_catalog_version
 
 def create_database():
     load_dotenv()
@@ -40,7 +41,10 @@ def create_database():
             description TEXT,
             download_url VARCHAR(500),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            INDEX idx_name (name)
+            last_synced BIGINT NULL,
+            INDEX idx_name (name),
+            UNIQUE KEY uq_name_version (name, version),
+            INDEX idx_last_synced (last_synced)
         )
         """
         cursor.execute(create_table_sql)
@@ -83,6 +87,31 @@ def create_database():
             print(f"✅ Added {len(sample_data)} software entries!")
         else:
             print(f"ℹ️  Table already has {count} records")
+
+        # Other spellings users type for catalog software, mapped to the catalog name
+        print("📋 Creating 'software_alias' table...")
+        cursor.execute(SOFTWARE_ALIAS_DDL)
+        sample_aliases = [
+            ('chrome', 'Google Chrome'),
+            ('firefox', 'Mozilla Firefox'),
+            ('vscode', 'Visual Studio Code'),
+            ('vs code', 'Visual Studio Code'),
+            ('node', 'Node.js'),
+            ('nodejs', 'Node.js'),
+            ('teams', 'Microsoft Teams'),
+            ('ms teams', 'Microsoft Teams'),
+            ('docker', 'Docker Desktop'),
+        ]
+        cursor.executemany(
+            "INSERT IGNORE INTO software_alias (alias, software_name) VALUES (%s, %s)", sample_aliases
+        )
+        conn.commit()
+        print(f"✅ Aliases ready ({cursor.rowcount} added)")
+
+        # Bumped by triggers on every catalog change, so the bot reloads only then
+        print("📋 Creating 'catalog_version' table and triggers...")
+        ensure_catalog_version(cursor)
+        conn.commit()
         
         # Verify the setup
         cursor.execute("SELECT COUNT(DISTINCT name) as software_count, COUNT(*) as version_count FROM software")
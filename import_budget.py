@@ -0,0 +1,96 @@
+# import_budget.py
+"""
+Import-time budget check, so slow or side-effecting imports don't creep back in.
+
+    python import_budget.py              # check every module in BUDGETS_MS
+    python import_budget.py bot=600      # override or add a budget (ms)
+
+Each module is imported in a fresh interpreter under `python -X importtime`
+(best of RUNS). The check fails if the cumulative import time is over budget,
+if the import pulls in one of the DEFERRED dependencies, which must only load
+on first use, or if the import raises, e.g. because a setting is missing.
+Exits non-zero on failure.
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, List, Set, Tuple
+
+# Cumulative import time per module, in milliseconds. botbuilder alone accounts
+# for most of `bot`; the rest should stay in the tens of milliseconds.
+BUDGETS_MS = {
+    "db_connector": 150,
+    "llm": 150,
+    "intent_parser": 150,
+    "software_extractor": 150,
+    "bot": 900,
+}
+
+# Heavy dependencies that are imported lazily by the modules above
+DEFERRED = ("langchain_groq", "langchain_core", "groq", "httpx", "mysql.connector")
+
+RUNS = 3
+
+
+def measure(module: str) -> Tuple[float, Set[str]]:
+    """Cumulative import time of `module` in ms, and every module it imported"""
+    # No .env and no API keys: importing must not depend on configuration
+    env = {k: v for k, v in os.environ.items() if k != "GROQ_API_KEY"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    cumulative = 0.0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        name = name.strip()
+        imported.add(name)
+        if name == module and total.strip().isdigit():
+            cumulative = int(total) / 1000
+    return cumulative, imported
+
+
+def leaked_deferred(imported: Set[str]) -> List[str]:
+    """The DEFERRED dependencies among the imported modules"""
+    return sorted(d for d in DEFERRED if any(m == d or m.startswith(d + ".") for m in imported))
+
+
+def check(budgets: Dict[str, float]) -> List[str]:
+    failures = []
+    for module, budget in budgets.items():
+        try:
+            runs = [measure(module) for _ in range(RUNS)]
+        except RuntimeError as e:
+            failures.append(f"{module}: import failed: {e}")
+            print(f"{module:<20} FAILED   import raised")
+            continue
+        elapsed = min(ms for ms, _ in runs)
+        imported = runs[0][1]
+        leaked = leaked_deferred(imported)
+
+        ok = elapsed <= budget and not leaked
+        print(f"{module:<20} {elapsed:7.1f} ms / {budget:.0f} ms  {'OK' if ok else 'OVER'}"
+              + (f"  imports {', '.join(leaked)}" if leaked else ""))
+        if elapsed > budget:
+            failures.append(f"{module}: {elapsed:.1f} ms exceeds budget of {budget:.0f} ms")
+        if leaked:
+            failures.append(f"{module}: imports deferred dependencies at import time: {', '.join(leaked)}")
+    return failures
+
+
+if __name__ == "__main__":
+    budgets = dict(BUDGETS_MS)
+    for arg in sys.argv[1:]:
+        name, _, value = arg.partition("=")
+        budgets[name] = float(value)
+
+    failures = check(budgets)
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,126 @@
+# incident_mirror.py
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class IncidentMirror:
+    """
+    Local SQLite copy of ServiceNow incidents, kept current by incremental sync
+    on the sys_updated_on watermark. Records are stored as JSON keyed by number.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS incidents (
+                number TEXT PRIMARY KEY,
+                sys_id TEXT,
+                sys_updated_on TEXT,
+                data TEXT NOT NULL,
+                synced_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_incidents_updated ON incidents (sys_updated_on);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self._conn.commit()
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", [key]).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self._conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [key, value]
+        )
+
+    def watermark(self) -> str:
+        """Highest sys_updated_on seen by a sync, or "" before the first sync"""
+        with self._lock:
+            return self._get_state("watermark") or ""
+
+    def last_synced(self) -> float:
+        """Epoch seconds of the last completed sync, 0 if never synced"""
+        with self._lock:
+            return float(self._get_state("last_synced") or 0)
+
+    def is_fresh(self, max_age_seconds: float) -> bool:
+        return time.time() - self.last_synced() <= max_age_seconds
+
+    def upsert(self, records: List[Dict]) -> int:
+        """Insert or replace records that carry a number; returns how many were stored"""
+        now = time.time()
+        records = [r for r in records if r.get("number")]
+        if not records:
+            return 0
+        with self._lock:
+            for record in records:
+                # Keep fields a partial write response did not include
+                existing = self._conn.execute(
+                    "SELECT data FROM incidents WHERE number = ?", [record["number"]]
+                ).fetchone()
+                merged = json.loads(existing[0]) if existing else {}
+                merged.update(record)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO incidents (number, sys_id, sys_updated_on, data, synced_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [merged["number"], merged.get("sys_id"), merged.get("sys_updated_on"), json.dumps(merged), now]
+                )
+            self._conn.commit()
+        return len(records)
+
+    def finish_sync(self, watermark: str):
+        """Record a completed sync and advance the watermark"""
+        with self._lock:
+            if watermark and watermark > (self._get_state("watermark") or ""):
+                self._set_state("watermark", watermark)
+            self._set_state("last_synced", str(time.time()))
+            self._conn.commit()
+
+    def get(self, number: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM incidents WHERE number = ?", [number]).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, numbers: List[str]) -> Dict[str, Dict]:
+        found = {}
+        with self._lock:
+            # SQLite caps bound parameters per statement, so look up in chunks
+            for i in range(0, len(numbers), 500):
+                chunk = numbers[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for (data,) in self._conn.execute(
+                    f"SELECT data FROM incidents WHERE number IN ({placeholders})", chunk
+                ):
+                    record = json.loads(data)
+                    found[record["number"]] = record
+        return found
+
+    def iter_records(self):
+        """Yield every mirrored record, without loading them all at once"""
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT number, data FROM incidents WHERE number > ? ORDER BY number LIMIT 1000", [last]
+                ).fetchall()
+            if not rows:
+                return
+            for _, data in rows:
+                yield json.loads(data)
+            last = rows[-1][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
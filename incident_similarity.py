@@ -0,0 +1,121 @@
+# incident_similarity.py
+import re
+import threading
+import zlib
+import numpy as np
+from typing import Dict, Iterable, List, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class IncidentSimilarityIndex:
+    """
+    In-memory top-k similarity search over incident text.
+
+    Each incident is embedded by hashing its words and character trigrams into a
+    fixed number of dimensions (signed feature hashing), then L2-normalised, so a
+    query is one matrix-vector product over all rows. Incidents can be added or
+    re-indexed one at a time; storage grows by doubling. Writers are
+    serialized, so syncs and write-throughs may feed it from any thread.
+    """
+
+    def __init__(self, dim: int = 256, initial_capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._numbers: List[str] = []
+        self._labels: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._write_lock = threading.RLock()
+        # Incremental sync state when the index is fed without a mirror
+        self.watermark = ""
+        self.last_synced = 0.0
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in TOKEN_RE.findall(text.lower()):
+            features = [word]
+            padded = f"<{word}>"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+            for feature in features:
+                h = zlib.crc32(feature.encode())
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+    def _grow(self):
+        grown = np.zeros((self._vectors.shape[0] * 2, self.dim), dtype=np.float32)
+        grown[:len(self._numbers)] = self._vectors[:len(self._numbers)]
+        self._vectors = grown
+
+    def add(self, number: str, text: str, label: str = ""):
+        """Index an incident, replacing its previous vector if it was already indexed"""
+        vector = self.embed(text)
+        with self._write_lock:
+            row = self._rows.get(number)
+            if row is None:
+                if len(self._numbers) == self._vectors.shape[0]:
+                    self._grow()
+                row = len(self._numbers)
+                self._rows[number] = row
+                self._vectors[row] = vector
+                # Appended last, so a concurrent query never sees the row before its vector
+                self._labels.append(label)
+                self._numbers.append(number)
+            else:
+                self._labels[row] = label
+                self._vectors[row] = vector
+
+    def add_records(self, records: Iterable[Dict]) -> int:
+        """Index ServiceNow incident records by short description and description"""
+        added = 0
+        with self._write_lock:
+            for record in records:
+                number = record.get("number")
+                short_description = record.get("short_description") or ""
+                text = f"{short_description} {record.get('description') or ''}".strip()
+                if number and text:
+                    self.add(number, text, short_description)
+                    added += 1
+        return added
+
+    def query(self, text: str, top_k: int = 5) -> List[Tuple[str, str, float]]:
+        """Return up to top_k (number, short_description, score) tuples, best first"""
+        count = len(self._numbers)
+        if not count or top_k <= 0:
+            return []
+        scores = self._vectors[:count] @ self.embed(text)
+        k = min(top_k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._numbers[i], self._labels[i], float(scores[i])) for i in top]
+
+
+if __name__ == "__main__":
+    # Synthetic benchmark: build a 100k-incident index and time top-k queries
+    import random
+    import time
+
+    random.seed(7)
+    apps = ["zoom", "slack", "chrome", "firefox", "python", "docker", "git", "teams", "vpn", "outlook"]
+    problems = ["install fails", "crashes on start", "license expired", "cannot login", "update stuck",
+                "slow performance", "missing dependency", "permission denied", "network timeout"]
+    index = IncidentSimilarityIndex()
+
+    start = time.perf_counter()
+    for n in range(100_000):
+        app, problem = random.choice(apps), random.choice(problems)
+        index.add(f"INC{n:07d}", f"{app} {problem} on laptop {random.randint(1, 500)}", f"{app} {problem}")
+    print(f"Indexed {len(index)} incidents in {time.perf_counter() - start:.1f}s")
+
+    queries = [f"{random.choice(apps)} {random.choice(problems)}" for _ in range(200)]
+    start = time.perf_counter()
+    for q in queries:
+        index.query(q, top_k=10)
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"Average top-10 query: {elapsed:.2f} ms")
+    print(f"Sample: 'zoom crashes on start' -> {index.query('zoom crashes on start', 3)}")
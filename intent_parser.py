@@ -1,9 +1,17 @@
-from llm import get_llm_response
+from llm import complete, complete_limited
+from catalog_index import STOPWORDS, find_software_mentions, split_software_mentions
+from db_connector import get_cached_catalog
+from metrics import timed
+from typing import Optional
 import json
+import logging
+import os
 import re
 
-INTENT_PROMPT = """
-You are an advanced intent classifier. Analyze the user's message and classify it into one of these categories:
+logger = logging.getLogger(__name__)
+
+# The system message of every classification call; the user message is sent as is
+INTENT_PROMPT = """You are an advanced intent classifier. Analyze the user's message and classify it into one of these categories:
 
 1. **install** - User wants to install, download, or get software/applications
 2. **cs_it** - User asks CS/IT related questions (programming, algorithms, databases, networking, system administration, software development, computer science concepts, etc.)
@@ -30,10 +38,68 @@ Examples:
 - "Hello how are you?" → {"intent": "other", "apps": []}
 """
 
+# Classify and answer CS/IT and general messages in one completion instead of two
+COMBINED_INTENT_ANSWER = os.getenv("COMBINED_INTENT_ANSWER", "true").lower() == "true"
+# The combined call runs at install priority, so it only answers what fits in a
+# few sentences; the model leaves longer answers to the usual separate call at
+# CS/IT or general priority. The cap is the backstop: an answer that still runs
+# into it is dropped and counted in bot_llm_truncated_total{path="intent_answer"}.
+COMBINED_ANSWER_MAX_TOKENS = int(os.getenv("COMBINED_ANSWER_MAX_TOKENS", 200))
+
+# The system message of parse_intent_and_answer. The classification goes on the
+# first line, so the answer after it can contain anything, code included.
+CLASSIFY_AND_ANSWER_PROMPT = """You are the assistant of a software installation bot. For every user message, classify it and, unless it is an install request, answer it, all in one reply.
+
+Categories:
+1. **install** - User wants to install, download, or get software/applications
+2. **cs_it** - User asks CS/IT related questions (programming, algorithms, data structures, databases, networking, cybersecurity, system administration, software engineering, DevOps, cloud, computer science concepts, etc.)
+3. **other** - General conversation or other topics
+
+Reply format:
+- Line 1: a single-line JSON object {"intent": "install" | "cs_it" | "other", "apps": [...]}. "apps" lists the specific software names the user wants to install; it is empty when none are named and for every other intent.
+- For "install", output line 1 and nothing else.
+- For "cs_it" and "other", line 1 is followed by a blank line and your answer to the user, but only if the complete answer fits in a few sentences (under 100 words).
+- If a good answer needs more than that, such as a detailed explanation or code, output line 1 and nothing else; the answer is written separately.
+
+For "cs_it", answer as a CS/IT expert: accurate, practical and clear.
+For "other", answer as a helpful AI assistant.
+
+Examples:
+- "install zoom and slack" → {"intent": "install", "apps": ["zoom", "slack"]}
+- "I want to download software" → {"intent": "install", "apps": []}
+- "What does DNS stand for?" → {"intent": "cs_it", "apps": []}, a blank line, then a short answer
+- "How do I implement a binary search tree in Java?" → {"intent": "cs_it", "apps": []} and nothing else
+- "Hello how are you?" → {"intent": "other", "apps": []}, a blank line, then a friendly reply
+"""
+
+# Words that make a message an install request on their own
+INSTALL_VERBS = {"install", "download", "setup", "set", "get", "add", "deploy", "need", "want"}
+
+
+def match_install_request(user_message: str) -> Optional[dict]:
+    """
+    Classify plain install requests without the LLM. Only when the message is
+    an install verb plus apps from the catalog (by name or alias) and filler
+    words, e.g. "please install vscode and slack", is the intent certain;
+    anything else returns None and goes to the classifier.
+    """
+    apps, rest = split_software_mentions(user_message)
+    if not apps or not INSTALL_VERBS.intersection(rest):
+        return None
+    if any(word not in STOPWORDS and word not in INSTALL_VERBS for word in rest):
+        return None
+    return {"intent": "install", "apps": apps}
+
+
+@timed("parse_intent")
 def parse_intent(user_message: str) -> dict:
+    """
+    Classify with the LLM. Callers try match_install_request first, on the
+    event loop against the cached catalog, so it is not repeated here.
+    """
     try:
         # Get LLM response for intent classification
-        response = get_llm_response(f"{INTENT_PROMPT}\nUser message: {user_message}")
+        response = complete("intent", INTENT_PROMPT, user_message)
         
         # Clean the response - sometimes LLM adds extra text
         response = response.strip()
@@ -42,34 +108,69 @@ def parse_intent(user_message: str) -> dict:
         json_match = re.search(r'\{.*\}', response, re.DOTALL)
         if json_match:
             json_str = json_match.group(0)
-            parsed = json.loads(json_str)
-            
-            # Validate the response format
-            if "intent" in parsed and "apps" in parsed:
-                # Ensure apps is a list
-                if not isinstance(parsed["apps"], list):
-                    parsed["apps"] = []
-                
-                # Normalize app names to lowercase
-                parsed["apps"] = [app.lower().strip() for app in parsed["apps"]]
-                
-                # Validate intent value
-                valid_intents = ["install", "cs_it", "other"]
-                if parsed["intent"] not in valid_intents:
-                    parsed["intent"] = "other"
-                
+            parsed = _validate_intent(json.loads(json_str))
+            if parsed:
                 return parsed
         
         # Fallback parsing if JSON parsing fails
         return fallback_intent_detection(user_message)
         
     except Exception as e:
-        print(f"Error in intent parsing: {e}")
+        logger.warning("Error in intent parsing, using keyword fallback: %s", e)
         return fallback_intent_detection(user_message)
 
+
+def _validate_intent(parsed) -> Optional[dict]:
+    """The classifier's JSON with apps normalized and the intent checked, or None if it is malformed"""
+    # Validate the response format
+    if not isinstance(parsed, dict) or "intent" not in parsed or "apps" not in parsed:
+        return None
+
+    # Ensure apps is a list
+    if not isinstance(parsed["apps"], list):
+        parsed["apps"] = []
+
+    # Normalize app names to lowercase
+    parsed["apps"] = [str(app).lower().strip() for app in parsed["apps"]]
+
+    # Validate intent value
+    valid_intents = ["install", "cs_it", "other"]
+    if parsed["intent"] not in valid_intents:
+        parsed["intent"] = "other"
+
+    return parsed
+
+
+@timed("parse_intent_and_answer")
+def parse_intent_and_answer(user_message: str) -> dict:
+    """
+    parse_intent and, for cs_it and other messages, the reply, from a single
+    completion: {"intent", "apps", "answer"}. "answer" is empty for install
+    requests, and whenever the reply could not be split; the caller then
+    answers with a separate call as before. The model leaves out answers that
+    need more than a few sentences, and one that still ran into
+    COMBINED_ANSWER_MAX_TOKENS is dropped too. Like parse_intent, it expects the caller to
+    have tried match_install_request already.
+    """
+    try:
+        response, truncated = complete_limited(
+            "intent_answer", CLASSIFY_AND_ANSWER_PROMPT, user_message, COMBINED_ANSWER_MAX_TOKENS)
+        header, _, answer = response.strip().partition("\n")
+        json_match = re.search(r'\{.*\}', header)
+        parsed = _validate_intent(json.loads(json_match.group(0))) if json_match else None
+        if parsed:
+            parsed["answer"] = answer.strip() if parsed["intent"] != "install" and not truncated else ""
+            return parsed
+        logger.warning("Combined reply had no classification line, using keyword fallback")
+    except Exception as e:
+        logger.warning("Error in combined intent parsing, using keyword fallback: %s", e)
+    return {**fallback_intent_detection(user_message), "answer": ""}
+
 def fallback_intent_detection(user_message: str) -> dict:
     """
-    Fallback intent detection using keyword matching
+    Fallback intent detection using keyword matching. It runs when the LLM is
+    overloaded or failing, so it never waits on the database: app names are
+    only picked out of the catalog if it is already in memory.
     """
     message_lower = user_message.lower()
     
@@ -89,24 +190,10 @@ def fallback_intent_detection(user_message: str) -> dict:
         "cloud", "aws", "azure", "docker", "kubernetes", "linux", "windows"
     ]
     
-    # Common software names for extraction
-    common_software = [
-        "zoom", "slack", "teams", "discord", "skype", "chrome", "firefox",
-        "vscode", "visual studio", "pycharm", "intellij", "eclipse",
-        "photoshop", "illustrator", "premiere", "after effects",
-        "office", "word", "excel", "powerpoint", "outlook",
-        "spotify", "vlc", "winrar", "7zip", "notepad++", "sublime",
-        "docker", "git", "node", "npm", "python", "java"
-    ]
-    
     # Check for install intent
     if any(keyword in message_lower for keyword in install_keywords):
-        # Extract software names
-        apps = []
-        for software in common_software:
-            if software in message_lower:
-                apps.append(software)
-        
+        # Software names and aliases from the cached catalog
+        apps = find_software_mentions(user_message) if get_cached_catalog() is not None else []
         return {"intent": "install", "apps": apps}
     
     # Check for CS/IT intent
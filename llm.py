@@ -1,31 +1,19 @@
 # llm_connector.py
 import os
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from dotenv import load_dotenv
-
-# Load environment variables from .env if present
-load_dotenv()
-
-# Ensure Groq API Key is available
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("⚠️ Missing GROQ_API_KEY. Please set it in your environment or .env file.")
-
-# Initialize Groq LLM
-llm = ChatGroq(
-    model_name="llama-3.3-70b-versatile",  # You can switch to another model if needed
-    temperature=0.7
-)
-
-# Create prompt templates
-general_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a helpful AI assistant."),
-    ("user", "{input}")
-])
-
-cs_it_prompt = ChatPromptTemplate.from_messages([
-    ("system", """You are a specialized CS/IT expert assistant. You have deep knowledge in:
+import time
+from typing import Optional, Tuple
+
+import llm_usage
+from metrics import timed
+
+# LangChain, the Groq SDK and httpx take about a second to import, so they are
+# only imported, and the client and model only built, on first use.
+
+GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com").rstrip("/")
+
+GENERAL_SYSTEM_PROMPT = "You are a helpful AI assistant."
+
+CS_IT_SYSTEM_PROMPT = """You are a specialized CS/IT expert assistant. You have deep knowledge in:
     - Programming languages (Python, Java, JavaScript, C++, etc.)
     - Algorithms and data structures
     - Database design and management
@@ -38,32 +26,139 @@ cs_it_prompt = ChatPromptTemplate.from_messages([
     - Operating systems and networking
     
     Provide detailed, accurate, and practical answers. Include code examples when relevant.
-    Use clear explanations that are educational and helpful for learning."""),
-    ("user", "{input}")
-])
+    Use clear explanations that are educational and helpful for learning."""
+
+_http_client = None
+_llm = None
+
+
+def get_api_key() -> str:
+    """The Groq API key; raises if it is not configured"""
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("⚠️ Missing GROQ_API_KEY. Please set it in your environment or .env file.")
+    return api_key
+
+
+def get_http_client():
+    """
+    One connection pool for every Groq call in the process (LangChain calls and the
+    incident extractor), so the TLS handshake is paid once, not per request
+    """
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.Client(timeout=httpx.Timeout(60.0, connect=10.0))
+    return _http_client
+
+
+def get_llm():
+    """The shared ChatGroq model"""
+    global _llm
+    if _llm is None:
+        from langchain_groq import ChatGroq
+        _llm = ChatGroq(
+            model_name="llama-3.3-70b-versatile",  # You can switch to another model if needed
+            temperature=0.7,
+            api_key=get_api_key(),
+            http_client=get_http_client()
+        )
+    return _llm
+
 
-# Create chains
-general_chain = general_prompt | llm
-cs_it_chain = cs_it_prompt | llm
+def complete(path: str, system_prompt: str, user_input: str) -> str:
+    """
+    One chat completion, accounted under `path` (see llm_usage.py). Fixed
+    instructions go in `system_prompt` and only the per-call text in
+    `user_input`, so every call on a path starts with the same prefix, which
+    the provider can cache. Raises on failure.
+    """
+    return complete_limited(path, system_prompt, user_input)[0]
+
+
+def complete_limited(path: str, system_prompt: str, user_input: str,
+                     max_tokens: Optional[int] = None) -> Tuple[str, bool]:
+    """
+    complete() generating at most `max_tokens` tokens. Returns the reply and
+    whether it was cut off at the limit.
+    """
+    model = get_llm()
+    if max_tokens:
+        model = model.bind(max_tokens=max_tokens)
+    start = time.perf_counter()
+    try:
+        result = model.invoke([("system", system_prompt), ("user", user_input)])
+    except Exception:
+        llm_usage.record(path, time.perf_counter() - start, ok=False)
+        raise
+    usage = result.usage_metadata or {}
+    truncated = (result.response_metadata or {}).get("finish_reason") == "length"
+    llm_usage.record(
+        path,
+        time.perf_counter() - start,
+        usage.get("input_tokens", 0),
+        usage.get("output_tokens", 0),
+        (usage.get("input_token_details") or {}).get("cache_read", 0),
+        truncated=truncated,
+    )
+    return result.content, truncated
+
+
+def groq_chat(path: str, client, **options):
+    """client.chat.completions.create(**options) with the Groq SDK, accounted under `path`"""
+    start = time.perf_counter()
+    try:
+        completion = client.chat.completions.create(**options)
+    except Exception:
+        llm_usage.record(path, time.perf_counter() - start, ok=False)
+        raise
+    usage = completion.usage
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        llm_usage.record(
+            path,
+            time.perf_counter() - start,
+            usage.prompt_tokens or 0,
+            usage.completion_tokens or 0,
+            getattr(details, "cached_tokens", None) or 0,
+        )
+    else:
+        llm_usage.record(path, time.perf_counter() - start)
+    return completion
+
+
+def warm_up() -> int:
+    """
+    Open a connection to Groq ahead of the first turn using the model list
+    endpoint, which costs no tokens. Returns the HTTP status; raises on failure.
+    """
+    # Importing LangChain and building the model is part of the cold-start cost too
+    get_llm()
+    response = get_http_client().get(
+        f"{GROQ_API_BASE}/openai/v1/models",
+        headers={"Authorization": f"Bearer {get_api_key()}"},
+    )
+    response.raise_for_status()
+    return response.status_code
 
 
+@timed("llm.get_llm_response")
 def get_llm_response(user_input: str) -> str:
     """
     Send user input to Groq LLM and return the generated response for general queries.
     """
     try:
-        result = general_chain.invoke({"input": user_input})
-        return result.content
+        return complete("general", GENERAL_SYSTEM_PROMPT, user_input)
     except Exception as e:
         return f"⚠️ Error while generating response: {e}"
 
 
+@timed("llm.get_cs_it_response")
 def get_cs_it_response(user_input: str) -> str:
     """
     Send user input to Groq LLM with specialized CS/IT context and return the response.
     """
     try:
-        result = cs_it_chain.invoke({"input": user_input})
-        return result.content
+        return complete("cs_it", CS_IT_SYSTEM_PROMPT, user_input)
     except Exception as e:
         return f"⚠️ Error while generating CS/IT response: {e}"
\ No newline at end of file
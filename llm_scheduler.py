@@ -0,0 +1,164 @@
+# llm_scheduler.py
+"""
+Admission control for every LLM call the bot makes.
+
+Calls wait in per-priority queues and are admitted by a dispatcher that
+enforces a concurrency cap and a token-bucket rate limit sized from the Groq
+quota. Higher priorities always go first:
+
+    INSTALL   intent classification and the install flow
+    CS_IT     CS/IT answers
+    GENERAL   general chat
+
+Within a priority, users are served round-robin, so one user sending a burst
+cannot starve the others. When a priority's queue is deeper than its share of
+LLM_MAX_QUEUE, or a call has waited more than LLM_MAX_WAIT seconds, the call is
+shed with LLMOverloaded. The caller then answers from a fallback or with
+BUSY_REPLY instead of adding to a backlog that would hit the provider's rate
+limit. Admitted calls run in a worker thread, so the blocking SDK calls no
+longer stall the event loop.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import Deque, Dict, Optional
+
+from metrics import Counter, Gauge, Histogram
+from rate_limit import TokenBucket
+
+# Per process; serve.py divides the pod-wide values between its workers
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 30))
+LLM_BURST = int(os.getenv("LLM_BURST", 5))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 100))
+LLM_MAX_WAIT = float(os.getenv("LLM_MAX_WAIT", 20))
+
+BUSY_REPLY = "⏳ I'm handling a lot of requests right now. Please try again in a minute."
+
+
+class Priority(IntEnum):
+    INSTALL = 0
+    CS_IT = 1
+    GENERAL = 2
+
+
+# Share of LLM_MAX_QUEUE each priority may fill before its calls are shed, so
+# chat is turned away long before install work is
+SHED_AT = {Priority.INSTALL: 1.0, Priority.CS_IT: 0.6, Priority.GENERAL: 0.3}
+
+QUEUE_WAIT = Histogram("bot_llm_queue_wait_seconds", "Time LLM calls waited for admission", ["priority"])
+QUEUE_DEPTH = Gauge("bot_llm_queue_depth", "LLM calls waiting for admission", ["priority"])
+IN_FLIGHT = Gauge("bot_llm_in_flight", "LLM calls currently running")
+SHED = Counter("bot_llm_shed_total", "LLM calls rejected by admission control", ["priority", "reason"])
+
+
+class LLMOverloaded(Exception):
+    """The call was shed; answer from a fallback instead"""
+
+
+class LLMScheduler:
+    def __init__(self, concurrency: int = LLM_CONCURRENCY, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 burst: int = LLM_BURST, max_queue: int = LLM_MAX_QUEUE, max_wait: float = LLM_MAX_WAIT):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._bucket = TokenBucket(requests_per_minute / 60, burst)
+        # priority -> user -> waiters, users in round-robin order
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[asyncio.Future]]"] = {p: OrderedDict() for p in Priority}
+        self._depth: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def depth(self, priority: Optional[Priority] = None) -> int:
+        return self._depth[priority] if priority is not None else sum(self._depth.values())
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher.done():
+            # First call, or a new event loop: nothing queued on the old one can be served
+            for priority in Priority:
+                self._queues[priority].clear()
+                self._set_depth(priority, -self._depth[priority])
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue:
+                user, waiters = next(iter(queue.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    queue.move_to_end(user)
+                else:
+                    del queue[user]
+                if not waiter.done():
+                    self._set_depth(priority, -1)
+                    return waiter
+        return None
+
+    def _set_depth(self, priority: Priority, delta: int):
+        self._depth[priority] += delta
+        QUEUE_DEPTH.set(priority.name.lower(), value=self._depth[priority])
+
+    async def _dispatch(self):
+        while True:
+            if not self.depth():
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._slots.acquire()
+            await self._bucket.acquire()
+            waiter = self._next_waiter()
+            if waiter is None:
+                self._slots.release()
+                continue
+            waiter.set_result(None)
+
+    async def run(self, priority: Priority, user_id: str, func, *args, **kwargs):
+        """
+        Run blocking `func(*args, **kwargs)` in a worker thread once admitted.
+        Raises LLMOverloaded if the call is shed.
+        """
+        self._start()
+        label = priority.name.lower()
+        if self._depth[priority] >= self.max_queue * SHED_AT[priority]:
+            SHED.inc(label, "queue_full")
+            raise LLMOverloaded(f"{label} queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(user_id or "", deque()).append(waiter)
+        self._set_depth(priority, 1)
+        self._wakeup.set()
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._set_depth(priority, -1)
+            SHED.inc(label, "timeout")
+            raise LLMOverloaded(f"waited {self.max_wait:g}s for an LLM slot")
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._set_depth(priority, -1)
+            else:
+                self._slots.release()
+            raise
+        finally:
+            QUEUE_WAIT.observe(time.perf_counter() - start, label)
+
+        IN_FLIGHT.inc()
+        try:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        finally:
+            IN_FLIGHT.dec()
+            self._slots.release()
+
+
+LLM_SCHEDULER = LLMScheduler()
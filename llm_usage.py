@@ -0,0 +1,228 @@
+# llm_usage.py
+"""
+Token and latency accounting for every LLM call.
+
+Each call is recorded under its path: intent, intent_answer (classification
+and answer in one call), cs_it, general, software_extraction or
+incident_extraction.
+- Prometheus gets calls, prompt/completion/cached tokens and latency per path,
+  and how many replies were cut off at their max_tokens cap.
+- The calls made while handling a turn are charged to the turn's intent once
+  the turn is over. The classification call runs before the intent is known,
+  so it could not be attributed any earlier.
+- Daily totals per (day, intent, path) are kept in memory and written to
+  llm_usage_daily every LLM_USAGE_FLUSH_INTERVAL seconds, one upsert per flush,
+  so no turn waits on a database write for accounting.
+
+    python llm_usage.py report [--days 7] [--by-path]
+"""
+import argparse
+import asyncio
+import contextvars
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LLM_CALLS = Counter("bot_llm_calls_total", "LLM calls by path and outcome", ["path", "outcome"])
+LLM_TOKENS = Counter("bot_llm_tokens_total", "LLM tokens by path: prompt, completion, and cached (part of prompt)",
+                     ["path", "kind"])
+LLM_LATENCY = Histogram("bot_llm_call_duration_seconds", "Latency of LLM calls by path, excluding queueing",
+                        ["path"])
+LLM_TRUNCATED = Counter("bot_llm_truncated_total", "LLM replies cut off at their max_tokens cap by path", ["path"])
+
+# Calls outside any turn (scripts, background jobs)
+NO_TURN = "-"
+
+LLM_USAGE_DDL = """
+    CREATE TABLE IF NOT EXISTS llm_usage_daily (
+        day DATE NOT NULL,
+        intent VARCHAR(32) NOT NULL,
+        path VARCHAR(32) NOT NULL,
+        calls INT UNSIGNED NOT NULL DEFAULT 0,
+        errors INT UNSIGNED NOT NULL DEFAULT 0,
+        prompt_tokens BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        completion_tokens BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        cached_tokens BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        latency_ms BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, intent, path)
+    )
+"""
+
+_FIELDS = ("calls", "errors", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms")
+
+UPSERT_SQL = f"""
+    INSERT INTO llm_usage_daily (day, intent, path, {", ".join(_FIELDS)})
+    VALUES (%s, %s, %s, {", ".join(["%s"] * len(_FIELDS))})
+    ON DUPLICATE KEY UPDATE {", ".join(f"{f} = {f} + VALUES({f})" for f in _FIELDS)}
+"""
+
+# One record per call: (path, ok, prompt_tokens, completion_tokens, cached_tokens, seconds)
+_Call = Tuple[str, bool, int, int, int, float]
+
+# The calls of the turn being handled. asyncio.to_thread copies the context, so
+# calls made from worker threads land in their turn's list too.
+_turn_calls: contextvars.ContextVar[Optional[List[_Call]]] = contextvars.ContextVar("llm_turn_calls", default=None)
+
+_lock = threading.Lock()
+# (day, intent, path) -> totals in _FIELDS order, not yet written
+_pending: Dict[Tuple[str, str, str], List[int]] = {}
+_table_ready = False
+
+
+def record(path: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+           cached_tokens: int = 0, ok: bool = True, truncated: bool = False):
+    """
+    Account one LLM call. Failed calls count towards latency and errors only;
+    truncated marks a reply that ran into its max_tokens cap.
+    """
+    LLM_CALLS.inc(path, "ok" if ok else "error")
+    if truncated:
+        LLM_TRUNCATED.inc(path)
+    LLM_LATENCY.observe(seconds, path)
+    if ok:
+        LLM_TOKENS.inc(path, "prompt", amount=prompt_tokens)
+        LLM_TOKENS.inc(path, "completion", amount=completion_tokens)
+        if cached_tokens:
+            LLM_TOKENS.inc(path, "cached", amount=cached_tokens)
+    logger.debug("LLM call", extra={
+        "path": path, "ok": ok, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+        "cached_tokens": cached_tokens, "truncated": truncated, "seconds": round(seconds, 3),
+    })
+
+    call = (path, ok, prompt_tokens, completion_tokens, cached_tokens, seconds)
+    calls = _turn_calls.get()
+    if calls is not None:
+        calls.append(call)
+    else:
+        _charge(NO_TURN, [call])
+
+
+def _charge(intent: str, calls: List[_Call]):
+    day = datetime.now(timezone.utc).date().isoformat()
+    with _lock:
+        for path, ok, prompt_tokens, completion_tokens, cached_tokens, seconds in calls:
+            totals = _pending.setdefault((day, intent, path), [0] * len(_FIELDS))
+            totals[0] += 1
+            totals[1] += 0 if ok else 1
+            totals[2] += prompt_tokens
+            totals[3] += completion_tokens
+            totals[4] += cached_tokens
+            totals[5] += round(seconds * 1000)
+
+
+class TurnUsage:
+    """
+    Collects the LLM calls made while the block runs; charge() then books them
+    under the turn's intent.
+    """
+    __slots__ = ("calls", "_token")
+
+    def __init__(self):
+        self.calls: List[_Call] = []
+        self._token = None
+
+    def __enter__(self):
+        self._token = _turn_calls.set(self.calls)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _turn_calls.reset(self._token)
+        return False
+
+    def charge(self, intent: str):
+        if self.calls:
+            _charge(intent, self.calls)
+
+
+def flush() -> int:
+    """Write the pending daily totals. Returns the number of rows upserted."""
+    global _pending, _table_ready
+    with _lock:
+        pending, _pending = _pending, {}
+    if not pending:
+        return 0
+    try:
+        from db_connector import get_connection
+        conn = get_connection()
+        cursor = conn.cursor()
+        if not _table_ready:
+            cursor.execute(LLM_USAGE_DDL)
+            _table_ready = True
+        cursor.executemany(UPSERT_SQL, [key + tuple(totals) for key, totals in pending.items()])
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return len(pending)
+    except Exception as e:
+        logger.error("Error writing LLM usage: %s", e)
+        # Keep the totals for the next flush
+        with _lock:
+            for key, totals in pending.items():
+                current = _pending.setdefault(key, [0] * len(_FIELDS))
+                for i, value in enumerate(totals):
+                    current[i] += value
+        return 0
+
+
+async def flush_loop(interval: float):
+    """Flush the daily totals every `interval` seconds until cancelled, then once more"""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(flush)
+    finally:
+        await asyncio.to_thread(flush)
+
+
+def report(days: int = 7, by_path: bool = False) -> List[tuple]:
+    """Token spend per day and intent (and path), newest day first"""
+    from db_connector import get_connection
+    group = "day, intent, path" if by_path else "day, intent"
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {group}, SUM(calls), SUM(errors), SUM(prompt_tokens), SUM(completion_tokens),
+               SUM(cached_tokens), SUM(latency_ms) / NULLIF(SUM(calls), 0)
+        FROM llm_usage_daily
+        WHERE day >= CURRENT_DATE - INTERVAL %s DAY
+        GROUP BY {group}
+        ORDER BY day DESC, SUM(prompt_tokens) + SUM(completion_tokens) DESC
+    """, [days])
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_cmd = commands.add_parser("report", help="token spend per intent per day")
+    report_cmd.add_argument("--days", type=int, default=7)
+    report_cmd.add_argument("--by-path", action="store_true", help="split each intent by LLM call path")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    columns = ["day", "intent"] + (["path"] if args.by_path else []) + [
+        "calls", "errors", "prompt", "completion", "cached", "total", "avg ms"]
+    table = []
+    for row in report(args.days, args.by_path):
+        *keys, calls, errors, prompt, completion, cached, avg_ms = row
+        table.append([str(k) for k in keys] + [
+            f"{int(calls):,}", f"{int(errors):,}", f"{int(prompt):,}", f"{int(completion):,}",
+            f"{int(cached):,}", f"{int(prompt) + int(completion):,}", f"{float(avg_ms or 0):,.0f}"])
+    if not table:
+        print(f"ℹ️  No LLM usage recorded in the last {args.days} days")
+    else:
+        widths = [max(len(c), *(len(r[i]) for r in table)) for i, c in enumerate(columns)]
+        print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+        for r in table:
+            print("  ".join(v.ljust(w) if i < len(columns) - 7 else v.rjust(w)
+                            for i, (v, w) in enumerate(zip(r, widths))))
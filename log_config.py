@@ -0,0 +1,107 @@
+# log_config.py
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+import tracing
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+# Fraction of DEBUG records kept; lets DEBUG run in production without flooding
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1.0))
+# Longest rendering of a single structured field before it is truncated
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", 2000))
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "correlation_id"}
+
+_listener = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread untouched. The stock QueueHandler
+    formats the message in the caller (on the event loop); here all formatting
+    and serialisation happen on the listener thread instead.
+    """
+
+    def prepare(self, record):
+        # Capture the correlation ID now: the listener thread has no trace context
+        record.correlation_id = tracing.current_correlation_id()
+        return record
+
+
+class _SamplingFilter(logging.Filter):
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or LOG_DEBUG_SAMPLE_RATE >= 1:
+            return True
+        return random.random() < LOG_DEBUG_SAMPLE_RATE
+
+
+def _render(value) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) > LOG_MAX_FIELD_CHARS:
+        return f"{text[:LOG_MAX_FIELD_CHARS]}... ({len(text)} chars)"
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, correlation_id and extra fields"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "correlation_id", ""):
+            entry["correlation_id"] = record.correlation_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value if isinstance(value, (int, float, bool)) or value is None else _render(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname} {record.name}: {record.getMessage()}"
+        fields = " ".join(f"{k}={_render(v)}" for k, v in vars(record).items() if k not in _RESERVED)
+        if fields:
+            line = f"{line} | {fields}"
+        if record.exc_info:
+            line = f"{line}\n{self.formatException(record.exc_info)}"
+        return line
+
+
+def configure_logging():
+    """
+    Route all logging through a queue to a single listener thread that writes to
+    stderr. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    handler = _DeferredQueueHandler(log_queue)
+    handler.addFilter(_SamplingFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -1,18 +1,410 @@
 import os
+import json
+import logging
+import base64
+import time
+import asyncio
 import httpx
 from dotenv import load_dotenv
 from fastmcp import FastMCP
 from datetime import datetime
+from typing import Optional
+from incident_mirror import IncidentMirror
+from incident_similarity import IncidentSimilarityIndex
+from log_config import configure_logging
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 SN_INSTANCE = os.getenv("SN_INSTANCE", "").rstrip("/")
 SN_USER = os.getenv("SN_USER")
 SN_PASS = os.getenv("SN_PASS")
 DEFAULT_TABLE = os.getenv("DEFAULT_TABLE", "incident")
 
+# Bulk operations: how many numbers go into one "number IN" lookup, how many
+# PATCHes go into one Batch API call, and how many requests run at once when
+# the Batch API is not available on the instance.
+SN_LOOKUP_CHUNK_SIZE = int(os.getenv("SN_LOOKUP_CHUNK_SIZE", 100))
+SN_MAX_QUERY_CHARS = int(os.getenv("SN_MAX_QUERY_CHARS", 2000))
+SN_BATCH_SIZE = int(os.getenv("SN_BATCH_SIZE", 50))
+SN_MAX_CONCURRENCY = int(os.getenv("SN_MAX_CONCURRENCY", 8))
+
+INCIDENT_DETAIL_FIELDS = ("number,short_description,description,state,priority,caller_id,assignment_group,"
+                          "assigned_to,opened_at,resolved_at,close_code,close_notes,work_notes")
+
+# Paged listing: default projection and the largest page a caller may request
+LIST_FIELDS = "number,short_description,state,priority,opened_at,caller_id"
+SN_MAX_PAGE_SIZE = int(os.getenv("SN_MAX_PAGE_SIZE", 1000))
+
+# Optional local mirror of incidents (SQLite). Empty path disables it and every
+# read goes live to ServiceNow. Reads accept data up to max_age_seconds old.
+INCIDENT_MIRROR_PATH = os.getenv("INCIDENT_MIRROR_PATH", "")
+INCIDENT_MIRROR_MAX_AGE = int(os.getenv("INCIDENT_MIRROR_MAX_AGE", 60))
+INCIDENT_MIRROR_BACKFILL_DAYS = int(os.getenv("INCIDENT_MIRROR_BACKFILL_DAYS", 30))
+MIRROR_FIELDS = INCIDENT_DETAIL_FIELDS + ",sys_id,sys_updated_on"
+SIMILARITY_FIELDS = "number,short_description,description,sys_id,sys_updated_on"
+SIMILARITY_DIM = int(os.getenv("SIMILARITY_DIM", 256))
+
+STATE_MAP = {"new": "1", "in progress": "2", "completed": "6", "closed": "7", "cancelled": "8"}
+TERMINAL_STATES = ["6", "7", "8"]  # Resolved, Closed, or Cancelled
+
 mcp = FastMCP("mcpnowsimilarity")
 
+MIRROR = IncidentMirror(INCIDENT_MIRROR_PATH) if INCIDENT_MIRROR_PATH else None
+_mirror_sync_lock = asyncio.Lock()
+# The first, full sync of an empty mirror; reads go live until it finishes
+_mirror_backfill: Optional[asyncio.Task] = None
+
+SIMILARITY = IncidentSimilarityIndex(dim=SIMILARITY_DIM)
+_similarity_sync_lock = asyncio.Lock()
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _state_updates(mapped_state: str, new_state: str, current_caller: str) -> dict:
+    """Build the PATCH payload for a state change, including the fields terminal states require"""
+    updates = {"state": mapped_state}
+
+    if mapped_state in TERMINAL_STATES:
+        current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+        updates.update({
+            "close_code": "Solved (Permanently)" if mapped_state != "8" else "Cancelled",
+            "close_notes": f"Updated via automated system to {new_state}",
+            "resolved_by": current_caller if current_caller else "admin",
+            "resolved_at": current_time,
+            "work_notes": f"System auto-updated incident to {new_state} state."
+        })
+
+        if mapped_state == "8":
+            updates["u_cancellation_reason"] = "Cancelled via automated system"
+
+    return updates
+
+
+def _close_updates(resolution_notes: str, close_code: str, current_caller: str) -> dict:
+    """Build the PATCH payload that closes an incident with resolution details"""
+    current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        "state": "7",
+        "close_code": close_code,
+        "close_notes": resolution_notes,
+        "resolved_by": current_caller if current_caller else "admin",
+        "resolved_at": current_time,
+        "work_notes": f"Incident resolved and closed. Resolution: {resolution_notes}"
+    }
+
+
+def _number_chunks(incident_numbers: list[str]):
+    """Split numbers into "number IN" lists that stay under both the count and URL length limits"""
+    chunk, length = [], 0
+    for number in incident_numbers:
+        if chunk and (len(chunk) >= SN_LOOKUP_CHUNK_SIZE or length + len(number) + 1 > SN_MAX_QUERY_CHARS):
+            yield chunk
+            chunk, length = [], 0
+        chunk.append(number)
+        length += len(number) + 1
+    if chunk:
+        yield chunk
+
+
+async def _lookup_incidents(client: httpx.AsyncClient, incident_numbers: list[str], fields: str) -> dict:
+    """
+    Resolve many incident numbers with "number IN" queries, one per chunk, running
+    at most SN_MAX_CONCURRENCY chunks at a time.
+    Returns {number: record}; numbers that do not exist are simply absent.
+    """
+    url = f"{SN_INSTANCE}/api/now/table/incident"
+    headers = {"Accept": "application/json"}
+    semaphore = asyncio.Semaphore(SN_MAX_CONCURRENCY)
+    # "number" is the key of the result, so it is always part of the projection
+    projection = ",".join(dict.fromkeys(["number"] + fields.split(",")))
+
+    async def lookup_chunk(chunk: list[str]) -> list[dict]:
+        params = {"sysparm_query": f"numberIN{','.join(chunk)}",
+                  "sysparm_fields": projection,
+                  "sysparm_limit": len(chunk),
+                  "sysparm_no_count": "true",
+                  "sysparm_exclude_reference_link": "true"}
+        async with semaphore:
+            resp = await client.get(url, headers=headers, params=params)
+        resp.raise_for_status()
+        return resp.json().get("result", [])
+
+    pages = await asyncio.gather(*(lookup_chunk(chunk) for chunk in _number_chunks(incident_numbers)))
+    return {record["number"]: record for page in pages for record in page}
+
+
+def _encode_cursor(record: dict) -> str:
+    key = {"ts": record.get("sys_updated_on", ""), "id": record.get("sys_id", "")}
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> dict:
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+
+def _keyset_query(query: str, cursor: str) -> str:
+    """
+    Encoded query for the page after cursor, ordered by (sys_updated_on, sys_id).
+    ^NQ ORs whole clauses, so the caller's filter is repeated on both sides.
+    """
+    prefix = f"{query}^" if query else ""
+    order = "^ORDERBYsys_updated_on^ORDERBYsys_id"
+    if not cursor:
+        return f"{prefix}{order[1:]}"
+    key = _decode_cursor(cursor)
+    return (f"{prefix}sys_updated_on>{key['ts']}"
+            f"^NQ{prefix}sys_updated_on={key['ts']}^sys_id>{key['id']}{order}")
+
+
+async def _iter_incident_pages(client: httpx.AsyncClient, query: str, fields: str, page_size: int, cursor: str = ""):
+    """
+    Async generator over pages of incidents using keyset pagination on
+    sys_updated_on. Yields (records, next_cursor); next_cursor is "" on the last page.
+    """
+    url = f"{SN_INSTANCE}/api/now/table/incident"
+    headers = {"Accept": "application/json"}
+    # The cursor needs the sort keys even when the caller did not ask for them
+    projection = ",".join(dict.fromkeys([f.strip() for f in fields.split(",")] + ["sys_updated_on", "sys_id"]))
+
+    while True:
+        params = {"sysparm_query": _keyset_query(query, cursor),
+                  "sysparm_fields": projection,
+                  "sysparm_limit": page_size,
+                  "sysparm_no_count": "true",
+                  "sysparm_exclude_reference_link": "true"}
+        resp = await client.get(url, headers=headers, params=params)
+        resp.raise_for_status()
+        records = resp.json().get("result", [])
+
+        cursor = _encode_cursor(records[-1]) if len(records) == page_size else ""
+        yield records, cursor
+        if not cursor:
+            return
+
+
+async def _sync_mirror(client: httpx.AsyncClient) -> int:
+    """Pull every incident updated since the mirror watermark; returns how many were stored"""
+    watermark = await asyncio.to_thread(MIRROR.watermark)
+    if watermark:
+        query = f"sys_updated_on>={watermark}"
+    else:
+        query = f"sys_updated_on>=javascript:gs.daysAgoStart({INCIDENT_MIRROR_BACKFILL_DAYS})"
+
+    synced, newest = 0, watermark
+    async for records, _ in _iter_incident_pages(client, query, MIRROR_FIELDS, SN_MAX_PAGE_SIZE):
+        synced += await asyncio.to_thread(MIRROR.upsert, records)
+        await asyncio.to_thread(SIMILARITY.add_records, records)
+        if records:
+            newest = max(newest, records[-1].get("sys_updated_on") or "")
+    await asyncio.to_thread(MIRROR.finish_sync, newest)
+    return synced
+
+
+async def _backfill_mirror():
+    try:
+        async with httpx.AsyncClient(auth=(SN_USER, SN_PASS), timeout=60) as client:
+            async with _mirror_sync_lock:
+                synced = await _sync_mirror(client)
+        logger.info("Incident mirror backfill finished: %s incidents", synced)
+    except Exception as e:
+        logger.warning("Incident mirror backfill failed, will retry on the next read: %s", e)
+
+
+async def _ensure_mirror_fresh(client: httpx.AsyncClient, max_age_seconds: int) -> Optional[bool]:
+    """
+    Sync the mirror if it is older than max_age_seconds. Concurrent readers share
+    one sync. Returns False if the sync failed and the mirror may be stale, and
+    None while the mirror has never been synced: the full backfill then runs in
+    the background and the caller reads live from ServiceNow meanwhile.
+    """
+    global _mirror_backfill
+    if not await asyncio.to_thread(MIRROR.last_synced):
+        if _mirror_backfill is None or _mirror_backfill.done():
+            _mirror_backfill = asyncio.create_task(_backfill_mirror())
+        return None
+    if await asyncio.to_thread(MIRROR.is_fresh, max_age_seconds):
+        return True
+    async with _mirror_sync_lock:
+        # Another reader may have synced while we waited for the lock
+        if await asyncio.to_thread(MIRROR.is_fresh, max_age_seconds):
+            return True
+        try:
+            await _sync_mirror(client)
+            return True
+        except Exception as e:
+            logger.warning("Incident mirror sync failed, serving cached data: %s", e)
+            return False
+
+
+def _plain_values(record: dict) -> dict:
+    """
+    Write responses carry reference fields as {"link": ..., "value": ...}, while
+    reads request plain values (sysparm_exclude_reference_link). Store the plain
+    value so mirrored records look the same either way.
+    """
+    return {field: value["value"] if isinstance(value, dict) and "value" in value else value
+            for field, value in record.items()}
+
+
+async def _mirror_write(*response_bodies) -> None:
+    """Apply ServiceNow write responses ({"result": record}) to the mirror"""
+    records = [_plain_values(body["result"]) for body in response_bodies
+               if isinstance(body, dict) and isinstance(body.get("result"), dict)]
+    if not records:
+        return
+    if MIRROR:
+        await asyncio.to_thread(MIRROR.upsert, records)
+    await asyncio.to_thread(SIMILARITY.add_records, records)
+
+
+async def _ensure_similarity_fresh(client: httpx.AsyncClient, max_age_seconds: int):
+    """
+    Bring the similarity index up to date. With the mirror enabled the index is
+    seeded from it once and then follows mirror syncs; otherwise it pulls changes
+    since its own watermark straight from ServiceNow.
+    """
+    if MIRROR:
+        if not SIMILARITY.last_synced:
+            async with _similarity_sync_lock:
+                # Seed once, even when several searches arrive before it is done
+                if not SIMILARITY.last_synced:
+                    await asyncio.to_thread(SIMILARITY.add_records, MIRROR.iter_records())
+                    SIMILARITY.last_synced = time.time()
+        await _ensure_mirror_fresh(client, max_age_seconds)
+        return
+
+    if time.time() - SIMILARITY.last_synced <= max_age_seconds:
+        return
+    async with _similarity_sync_lock:
+        if time.time() - SIMILARITY.last_synced <= max_age_seconds:
+            return
+        if SIMILARITY.watermark:
+            query = f"sys_updated_on>={SIMILARITY.watermark}"
+        else:
+            query = f"sys_updated_on>=javascript:gs.daysAgoStart({INCIDENT_MIRROR_BACKFILL_DAYS})"
+        async for records, _ in _iter_incident_pages(client, query, SIMILARITY_FIELDS, SN_MAX_PAGE_SIZE):
+            await asyncio.to_thread(SIMILARITY.add_records, records)
+            if records:
+                SIMILARITY.watermark = max(SIMILARITY.watermark, records[-1].get("sys_updated_on") or "")
+        SIMILARITY.last_synced = time.time()
+
+
+def _detail_view(record: dict) -> dict:
+    return {field: record.get(field, "") for field in INCIDENT_DETAIL_FIELDS.split(",")}
+
+
+def _patch_result(status_code: int, body) -> dict:
+    if 200 <= status_code < 300:
+        return {"success": True, "data": body}
+    return {"error": f"HTTP {status_code}", "details": body}
+
+
+async def _batch_patch(client: httpx.AsyncClient, patches: dict) -> dict:
+    """
+    Send {number: (sys_id, updates)} as PATCHes through the ServiceNow Batch API.
+    Returns {number: result}. A chunk the Batch API rejects is sent as
+    individual requests instead, so chunks that already went through are
+    neither lost nor patched twice.
+    """
+    url = f"{SN_INSTANCE}/api/now/v1/batch"
+    headers = {"Content-Type": "application/json", "Accept": "application/json"}
+    item_headers = [{"name": "Content-Type", "value": "application/json"},
+                    {"name": "Accept", "value": "application/json"}]
+    results = {}
+
+    for batch_no, chunk in enumerate(_chunks(list(patches.items()), SN_BATCH_SIZE)):
+        payload = {
+            "batch_request_id": str(batch_no),
+            "rest_requests": [
+                {
+                    "id": number,
+                    "exclude_response_headers": True,
+                    "headers": item_headers,
+                    "url": f"/api/now/table/incident/{sys_id}",
+                    "method": "PATCH",
+                    "body": base64.b64encode(json.dumps(updates).encode()).decode()
+                }
+                for number, (sys_id, updates) in chunk
+            ]
+        }
+        try:
+            resp = await client.post(url, headers=headers, json=payload)
+            resp.raise_for_status()
+            data = resp.json()
+        except httpx.HTTPStatusError as e:
+            logger.warning("Batch API rejected chunk %s (%s), sending it as individual requests", batch_no, e)
+            results.update(await _concurrent_patch(client, dict(chunk)))
+            continue
+
+        for served in data.get("serviced_requests", []):
+            raw = base64.b64decode(served["body"]).decode() if served.get("body") else ""
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                body = raw
+            results[served["id"]] = _patch_result(served.get("status_code", 500), body)
+
+        for number in data.get("unserviced_requests", []):
+            results[number] = {"error": "Request was not serviced by the Batch API"}
+
+    return results
+
+
+async def _concurrent_patch(client: httpx.AsyncClient, patches: dict) -> dict:
+    """Send {number: (sys_id, updates)} as individual PATCHes, at most SN_MAX_CONCURRENCY at a time"""
+    headers = {"Content-Type": "application/json", "Accept": "application/json"}
+    semaphore = asyncio.Semaphore(SN_MAX_CONCURRENCY)
+
+    async def patch_one(number: str, sys_id: str, updates: dict):
+        async with semaphore:
+            try:
+                resp = await client.patch(f"{SN_INSTANCE}/api/now/table/incident/{sys_id}",
+                                          headers=headers, json=updates)
+                body = resp.json() if resp.content else {}
+                return number, _patch_result(resp.status_code, body)
+            except Exception as e:
+                return number, {"error": f"Error updating incident: {str(e)}"}
+
+    pairs = await asyncio.gather(*(patch_one(number, sys_id, updates)
+                                   for number, (sys_id, updates) in patches.items()))
+    return dict(pairs)
+
+
+async def _bulk_patch(incident_numbers: list[str], build_updates) -> dict:
+    """
+    Resolve sys_ids for all incident numbers in bulk, then PATCH each one with
+    build_updates(record). Uses the Batch API and falls back to bounded
+    concurrent requests for any chunk it rejects. Returns per-item results.
+    """
+    numbers = list(dict.fromkeys(n.strip() for n in incident_numbers if n and n.strip()))
+    if not numbers:
+        return {"error": "No incident numbers given."}
+
+    async with httpx.AsyncClient(auth=(SN_USER, SN_PASS), timeout=60) as client:
+        records = await _lookup_incidents(client, numbers, "sys_id,number,caller_id,state")
+        patches = {number: (records[number]["sys_id"], build_updates(records[number]))
+                   for number in numbers if number in records}
+
+        results = await _batch_patch(client, patches) if patches else {}
+
+    await _mirror_write(*(result["data"] for result in results.values() if result.get("success")))
+
+    items = {}
+    for number in numbers:
+        if number not in records:
+            items[number] = {"error": f"Incident {number} not found."}
+        else:
+            items[number] = results.get(number, {"error": "No response for this incident"})
+
+    succeeded = sum(1 for item in items.values() if item.get("success"))
+    return {"total": len(numbers), "succeeded": succeeded, "failed": len(numbers) - succeeded, "results": items}
+
 @mcp.tool()
 async def add_incidents(short_description: str, description: str, priority: str, caller: str, state: str, cate: str):
     url = f"{SN_INSTANCE}/api/now/table/incident"
@@ -29,22 +421,27 @@ async def add_incidents(short_description: str, description: str, priority: str,
         async with httpx.AsyncClient() as client:
             response = await client.post(url, headers=headers, json=data, auth=(SN_USER, SN_PASS))
         response.raise_for_status()
-        return response.json()
+        created = response.json()
+        await _mirror_write(created)
+        return created
     except Exception as e:
         return {"error": f"Error creating incident: {str(e)}"}
 
 
 @mcp.tool()
-async def get_table_content():
-    url = f"{SN_INSTANCE}/api/now/table/incident"
-    headers = {"Accept": "application/json"}
-    params = {"sysparm_limit": 5, "sysparm_query": "active=true",
-              "sysparm_fields": "number,short_description,state,priority,opened_at,caller_id"}
+async def get_table_content(query: str = "active=true", fields: str = LIST_FIELDS, page_size: int = 5, cursor: str = ""):
+    """
+    List incidents one page at a time. query is a ServiceNow encoded query,
+    fields a comma-separated projection. Pass the returned next_cursor back in
+    to get the following page; an empty next_cursor means there are no more.
+    """
+    page_size = max(1, min(page_size, SN_MAX_PAGE_SIZE))
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, auth=(SN_USER, SN_PASS), params=params)
-        response.raise_for_status()
-        return response.json()
+        async with httpx.AsyncClient(auth=(SN_USER, SN_PASS), timeout=60) as client:
+            pages = _iter_incident_pages(client, query, fields, page_size, cursor)
+            records, next_cursor = await pages.__anext__()
+            await pages.aclose()
+        return {"result": records, "next_cursor": next_cursor}
     except Exception as e:
         return {"error": f"Error fetching incidents: {str(e)}"}
 
@@ -52,13 +449,11 @@ async def get_table_content():
 @mcp.tool()
 async def update_incident_state(incident_number: str, new_state: str):
     """Update the state of an existing incident in ServiceNow with proper field handling"""
-    state_map = {"new": "1", "in progress": "2", "completed": "6", "closed": "7", "cancelled": "8"}
-    
-    if new_state.lower() not in state_map:
-        return {"error": f"Invalid state: {new_state}. Use one of {list(state_map.keys())}"}
+    if new_state.lower() not in STATE_MAP:
+        return {"error": f"Invalid state: {new_state}. Use one of {list(STATE_MAP.keys())}"}
     
     try:
-        mapped_state = state_map[new_state.lower()]
+        mapped_state = STATE_MAP[new_state.lower()]
         
         # Step 1: Lookup sys_id and get current incident data
         url_lookup = f"{SN_INSTANCE}/api/now/table/incident"
@@ -80,22 +475,7 @@ async def update_incident_state(incident_number: str, new_state: str):
         # Step 2: Prepare update payload
         url_update = f"{SN_INSTANCE}/api/now/table/incident/{sys_id}"
         headers = {"Content-Type": "application/json", "Accept": "application/json"}
-        updates = {"state": mapped_state}
-
-        # Add mandatory fields for terminal states
-        if mapped_state in ["6", "7", "8"]:  # Resolved, Closed, or Cancelled
-            current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            
-            updates.update({
-                "close_code": "Solved (Permanently)" if mapped_state != "8" else "Cancelled",
-                "close_notes": f"Updated via automated system to {new_state}",
-                "resolved_by": current_caller if current_caller else "admin",
-                "resolved_at": current_time,
-                "work_notes": f"System auto-updated incident to {new_state} state."
-            })
-            
-            if mapped_state == "8":
-                updates["u_cancellation_reason"] = "Cancelled via automated system"
+        updates = _state_updates(mapped_state, new_state, current_caller)
 
         # Step 3: Update the incident
         async with httpx.AsyncClient() as client:
@@ -117,7 +497,9 @@ async def update_incident_state(incident_number: str, new_state: str):
             return {"error": "Bad request - invalid data or missing required fields", "details": error_details}
             
         update_resp.raise_for_status()
-        return update_resp.json()
+        updated = update_resp.json()
+        await _mirror_write(updated)
+        return updated
         
     except Exception as e:
         return {"error": f"Error updating incident: {str(e)}"}
@@ -142,7 +524,9 @@ async def update_incident_priority(incident_number: str, new_priority: str):
         async with httpx.AsyncClient() as client:
             update_resp = await client.patch(url_update, headers=headers, json=updates, auth=(SN_USER, SN_PASS))
         update_resp.raise_for_status()
-        return update_resp.json()
+        updated = update_resp.json()
+        await _mirror_write(updated)
+        return updated
     except Exception as e:
         return {"error": f"Error updating priority: {str(e)}"}
 
@@ -171,16 +555,7 @@ async def close_incident_with_resolution(incident_number: str, resolution_notes:
         url_update = f"{SN_INSTANCE}/api/now/table/incident/{sys_id}"
         headers = {"Content-Type": "application/json", "Accept": "application/json"}
         
-        current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        
-        updates = {
-            "state": "7",
-            "close_code": close_code,
-            "close_notes": resolution_notes,
-            "resolved_by": current_caller if current_caller else "admin",
-            "resolved_at": current_time,
-            "work_notes": f"Incident resolved and closed. Resolution: {resolution_notes}"
-        }
+        updates = _close_updates(resolution_notes, close_code, current_caller)
 
         async with httpx.AsyncClient() as client:
             update_resp = await client.patch(url_update, headers=headers, json=updates, auth=(SN_USER, SN_PASS))
@@ -190,34 +565,158 @@ async def close_incident_with_resolution(incident_number: str, resolution_notes:
             return {"error": f"Failed to close incident (HTTP {update_resp.status_code})", "details": error_details}
             
         update_resp.raise_for_status()
-        return {"success": True, "message": f"Incident {incident_number} closed successfully", "data": update_resp.json()}
+        closed = update_resp.json()
+        await _mirror_write(closed)
+        return {"success": True, "message": f"Incident {incident_number} closed successfully", "data": closed}
         
     except Exception as e:
         return {"error": f"Error closing incident: {str(e)}"}
 
 
 @mcp.tool()
-async def get_incident_details(incident_number: str):
-    """Get detailed information about a specific incident"""
+async def bulk_update_incident_state(incident_numbers: list[str], new_state: str):
+    """Update the state of many incidents at once. Returns a result per incident number"""
+    if new_state.lower() not in STATE_MAP:
+        return {"error": f"Invalid state: {new_state}. Use one of {list(STATE_MAP.keys())}"}
+
+    mapped_state = STATE_MAP[new_state.lower()]
     try:
-        url = f"{SN_INSTANCE}/api/now/table/incident"
-        params = {"sysparm_query": f"number={incident_number}",
-                  "sysparm_fields": "number,short_description,description,state,priority,caller_id,assignment_group,assigned_to,opened_at,resolved_at,close_code,close_notes,work_notes"}
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, auth=(SN_USER, SN_PASS), params=params)
+        return await _bulk_patch(
+            incident_numbers,
+            lambda record: _state_updates(mapped_state, new_state, record.get("caller_id", ""))
+        )
+    except Exception as e:
+        return {"error": f"Error updating incidents: {str(e)}"}
+
+
+@mcp.tool()
+async def bulk_close_incidents(incident_numbers: list[str], resolution_notes: str = "Closed via automated system", close_code: str = "Solved (Permanently)"):
+    """Close many incidents with the same resolution details. Returns a result per incident number"""
+    try:
+        return await _bulk_patch(
+            incident_numbers,
+            lambda record: _close_updates(resolution_notes, close_code, record.get("caller_id", ""))
+        )
+    except Exception as e:
+        return {"error": f"Error closing incidents: {str(e)}"}
+
+
+@mcp.tool()
+async def get_incident_details(incident_number: str, max_age_seconds: int = INCIDENT_MIRROR_MAX_AGE):
+    """
+    Get detailed information about a specific incident. When the local mirror is
+    enabled it is served from there if the mirror is at most max_age_seconds old;
+    pass 0 to always read live from ServiceNow.
+    """
+    try:
+        async with httpx.AsyncClient(auth=(SN_USER, SN_PASS), timeout=60) as client:
+            if MIRROR and max_age_seconds > 0:
+                fresh = await _ensure_mirror_fresh(client, max_age_seconds)
+                record = await asyncio.to_thread(MIRROR.get, incident_number) if fresh is not None else None
+                if record:
+                    return {"incident": _detail_view(record), "source": "mirror", "stale": not fresh}
+
+            url = f"{SN_INSTANCE}/api/now/table/incident"
+            params = {"sysparm_query": f"number={incident_number}",
+                      "sysparm_fields": MIRROR_FIELDS if MIRROR else INCIDENT_DETAIL_FIELDS,
+                      "sysparm_exclude_reference_link": "true"}
+            response = await client.get(url, params=params)
         
         response.raise_for_status()
         results = response.json().get("result", [])
         
         if not results:
             return {"error": f"Incident {incident_number} not found."}
-            
-        return {"incident": results[0]}
+
+        if MIRROR:
+            await asyncio.to_thread(MIRROR.upsert, results)
+        return {"incident": _detail_view(results[0])}
         
     except Exception as e:
         return {"error": f"Error fetching incident details: {str(e)}"}
 
 
+@mcp.tool()
+async def get_incidents_details(incident_numbers: list[str], max_age_seconds: int = INCIDENT_MIRROR_MAX_AGE):
+    """
+    Get detailed information about many incidents at once, keyed by incident number.
+    Numbers that do not exist are returned as {"found": false, "error": ...}.
+    Served from the local mirror when enabled and fresh enough, like get_incident_details.
+    """
+    numbers = list(dict.fromkeys(n.strip() for n in incident_numbers if n and n.strip()))
+    if not numbers:
+        return {"error": "No incident numbers given."}
+
+    try:
+        records = {}
+        async with httpx.AsyncClient(auth=(SN_USER, SN_PASS), timeout=60) as client:
+            if MIRROR and max_age_seconds > 0:
+                if await _ensure_mirror_fresh(client, max_age_seconds) is not None:
+                    records = await asyncio.to_thread(MIRROR.get_many, numbers)
+
+            # Anything the mirror does not hold yet is fetched live
+            missing = [number for number in numbers if number not in records]
+            if missing:
+                live = await _lookup_incidents(client, missing, MIRROR_FIELDS if MIRROR else INCIDENT_DETAIL_FIELDS)
+                if MIRROR:
+                    await asyncio.to_thread(MIRROR.upsert, list(live.values()))
+                records.update(live)
+
+        incidents = {}
+        for number in numbers:
+            if number in records:
+                incidents[number] = {"found": True, "incident": _detail_view(records[number])}
+            else:
+                incidents[number] = {"found": False, "error": f"Incident {number} not found."}
+        return {"incidents": incidents, "found": len(records), "missing": len(numbers) - len(records)}
+
+    except Exception as e:
+        return {"error": f"Error fetching incident details: {str(e)}"}
+
+
+@mcp.tool()
+async def sync_incident_mirror():
+    """Pull every incident changed since the last sync into the local mirror"""
+    if not MIRROR:
+        return {"error": "Incident mirror is disabled. Set INCIDENT_MIRROR_PATH to enable it."}
+    try:
+        async with httpx.AsyncClient(auth=(SN_USER, SN_PASS), timeout=60) as client:
+            async with _mirror_sync_lock:
+                synced = await _sync_mirror(client)
+        return {"success": True, "synced": synced, "watermark": await asyncio.to_thread(MIRROR.watermark)}
+    except Exception as e:
+        return {"error": f"Error syncing incident mirror: {str(e)}"}
+
+
+
+@mcp.tool()
+async def find_similar_incidents(text: str, top_k: int = 5, max_age_seconds: int = INCIDENT_MIRROR_MAX_AGE):
+    """
+    Find the incidents whose short description and description are most similar
+    to text, using a local vector index. Returns number, short description and a
+    cosine score per match, best first.
+    """
+    try:
+        async with httpx.AsyncClient(auth=(SN_USER, SN_PASS), timeout=60) as client:
+            try:
+                await _ensure_similarity_fresh(client, max_age_seconds)
+            except Exception as e:
+                # A slow or failing instance should not block answers from the local index
+                logger.warning("Similarity index refresh failed, using current index: %s", e)
+
+        matches = SIMILARITY.query(text, top_k)
+        return {
+            "matches": [
+                {"number": number, "short_description": label, "score": round(score, 4)}
+                for number, label, score in matches
+            ],
+            "indexed": len(SIMILARITY)
+        }
+    except Exception as e:
+        return {"error": f"Error searching similar incidents: {str(e)}"}
+
+
 if __name__ == "__main__":
+    # Logs go to stderr; stdout carries the MCP stdio protocol
+    configure_logging()
     mcp.run(transport='stdio')
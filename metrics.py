@@ -0,0 +1,225 @@
+# metrics.py
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+import tracing
+
+# Seconds; spans fast DB lookups through slow LLM completions
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in _REGISTRY) + "\n"
+
+
+def _add_label(sample: str, label: str, value: str) -> str:
+    name, brace, rest = sample.partition("{")
+    if brace:
+        return f'{name}{{{label}="{value}",{rest}'
+    name, _, rest = sample.partition(" ")
+    return f'{name}{{{label}="{value}"}} {rest}'
+
+
+def merge_worker_metrics(texts: Dict[str, str]) -> str:
+    """
+    One exposition from several processes' render_metrics() output: every
+    sample gets a `worker` label, and each family's samples stay together
+    under a single HELP/TYPE header, as the text format requires.
+    """
+    families: Dict[str, List[str]] = {}
+    for worker, text in texts.items():
+        family: List[str] = families.setdefault("", [])
+        for line in text.splitlines():
+            if line.startswith("# "):
+                family = families.setdefault(line.split(" ", 3)[2], [])
+                if line not in family:
+                    family.append(line)
+            elif line:
+                family.append(_add_label(line, "worker", worker))
+    return "\n".join(line for lines in families.values() for line in lines) + "\n"
+
+
+STAGE_LATENCY = Histogram("bot_stage_duration_seconds", "Latency of each turn stage", ["stage"])
+STAGE_IN_FLIGHT = Gauge("bot_stage_in_flight", "Calls currently running per stage", ["stage"])
+STAGE_ERRORS = Counter("bot_stage_errors_total", "Exceptions raised per stage", ["stage"])
+TURNS = Counter("bot_turns_total", "Handled turns by intent and outcome", ["intent", "outcome"])
+TURN_LATENCY = Histogram("bot_turn_duration_seconds", "End-to-end turn latency by intent", ["intent"])
+
+
+class stage_timer:
+    """
+    Time a block as `stage`: latency histogram, in-flight gauge, error counter,
+    and a tracing span when the block runs inside a traced turn.
+    A plain class rather than @contextmanager keeps the per-call cost to a few microseconds.
+    """
+    __slots__ = ("stage", "start", "span")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.start = 0.0
+        self.span = tracing.span(stage)
+
+    def __enter__(self):
+        STAGE_IN_FLIGHT.inc(self.stage)
+        self.span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_LATENCY.observe(time.perf_counter() - self.start, self.stage)
+        STAGE_IN_FLIGHT.dec(self.stage)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            STAGE_ERRORS.inc(self.stage)
+        self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def timed(stage: str):
+    """Decorator form of stage_timer for both plain and async functions"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage_timer(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    # Overhead benchmark. Measures the cost a stage wrapper adds to a call, then
+    # relates it to a turn with 10 instrumented stages. The fastest real turn
+    # (card submission, one DB query and one send_activity round trip) takes well
+    # over 10ms, so 10ms is used as a conservative floor.
+    STAGES_PER_TURN = 10
+    TURN_FLOOR_SECONDS = 0.010
+    CALLS = 200_000
+
+    def noop():
+        return None
+
+    instrumented_noop = timed("bench")(noop)
+
+    def run(fn):
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            fn()
+        return time.perf_counter() - start
+
+    run(noop)
+    run(instrumented_noop)
+    bare = min(run(noop) for _ in range(5))
+    instrumented = min(run(instrumented_noop) for _ in range(5))
+
+    per_stage = (instrumented - bare) / CALLS
+    per_turn = per_stage * STAGES_PER_TURN
+    share = per_turn / TURN_FLOOR_SECONDS * 100
+    print(f"overhead: {per_stage * 1e6:.2f} us per stage, {per_turn * 1e6:.1f} us per turn")
+    print(f"= {share:.3f}% of a {TURN_FLOOR_SECONDS * 1000:.0f}ms turn ({'OK' if share < 1 else 'OVER BUDGET'}: budget 1%)")
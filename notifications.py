@@ -0,0 +1,125 @@
+# notifications.py
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from botbuilder.core import BotFrameworkAdapter, TurnContext
+from botbuilder.schema import ConversationReference
+
+from db_connector import (
+    CLOSED_REQUEST_STATUSES,
+    delete_conversation_references,
+    get_conversation_references,
+)
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Sends proactive messages to the users who requested incidents when their
+    status changes. Messages go through a bounded queue drained by a fixed pool
+    of workers, so bursts never block inbound traffic; each channel has its own
+    rate limit and failed sends are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        adapter: BotFrameworkAdapter,
+        app_id: str,
+        concurrency: int = 20,
+        rate_per_channel: float = 10.0,
+        burst_per_channel: int = 20,
+        max_retries: int = 3,
+        queue_size: int = 10000,
+    ):
+        self.adapter = adapter
+        self.app_id = app_id
+        self.concurrency = concurrency
+        self.rate_per_channel = rate_per_channel
+        self.burst_per_channel = burst_per_channel
+        self.max_retries = max_retries
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._workers: List[asyncio.Task] = []
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def _bucket(self, channel_id: str) -> TokenBucket:
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate_per_channel, self.burst_per_channel)
+            self._buckets[channel_id] = bucket
+        return bucket
+
+    def enqueue(self, reference: ConversationReference, text: str) -> bool:
+        try:
+            self._queue.put_nowait((reference, text))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Notification queue full, dropping message for %s", reference.conversation.id)
+            return False
+
+    async def notify_status_changes(self, updates: Dict[str, str]):
+        """StatusUpdateBatcher listener: queue a message for every incident we hold a reference for"""
+        references = await asyncio.to_thread(get_conversation_references, list(updates))
+        finished = []
+        for incident_number, serialized in references.items():
+            status = updates[incident_number]
+            reference = ConversationReference().deserialize(serialized)
+            queued = self.enqueue(reference, f"🔔 Your installation request {incident_number} is now **{status}**.")
+            if queued and status in CLOSED_REQUEST_STATUSES:
+                finished.append(incident_number)
+
+        # Terminal states will not change again, so the reference is no longer needed.
+        # A dropped message keeps its reference so a repeated event can still notify.
+        if finished:
+            await asyncio.to_thread(delete_conversation_references, finished)
+
+    async def _send(self, reference: ConversationReference, text: str):
+        async def callback(turn_context: TurnContext):
+            await turn_context.send_activity(text)
+
+        await self.adapter.continue_conversation(reference, callback, bot_id=self.app_id)
+
+    async def _worker(self):
+        while True:
+            reference, text = await self._queue.get()
+            try:
+                await self._deliver(reference, text)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, reference: ConversationReference, text: str):
+        bucket = self._bucket(reference.channel_id or "")
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                await self._send(reference, text)
+                self.sent += 1
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error("Giving up on notification to %s: %s", reference.conversation.id, e)
+                    return
+                await asyncio.sleep(0.5 * (2 ** attempt))
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout: Optional[float] = 5.0):
+        """Give queued messages up to `timeout` seconds to drain, then stop the workers"""
+        if self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Stopping with %d notifications undelivered", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,545 @@
+# request_log_schema.py
+"""
+Schema, maintenance and online migration for request_logging.
+
+request_logging has a surrogate key and is range-partitioned by month on
+`timestamp`. Time-range queries read only the months they cover, and old data
+is removed by dropping whole partitions instead of running DELETEs:
+
+    PRIMARY KEY (id, timestamp)       MySQL requires the partition column in every unique key
+    idx_incident (incident_id)        status updates and lookups by ticket
+    idx_software_time (software_name, timestamp)
+                                      per-app history and reports
+    idx_open_request (requested_by, software_name, version_name, status)
+                                      duplicate check
+
+run_maintenance is scheduled by app.py every REQUEST_LOG_MAINTENANCE_INTERVAL
+seconds, or can be run from cron. It does three things:
+  - keeps REQUEST_LOG_PARTITIONS_AHEAD empty months ready;
+  - recomputes the daily rollups in request_log_daily for the last
+    REQUEST_LOG_ROLLUP_DAYS days, because statuses change after the fact;
+  - drops partitions older than REQUEST_LOG_RETENTION_MONTHS once they are
+    rolled up.
+Reports read request_log_daily, not the raw log.
+
+    python request_log_schema.py migrate [--batch-hours N]   # online migration of an existing table
+    python request_log_schema.py maintain
+    python request_log_schema.py benchmark [--rows N] [--keep]   # scratch tables, 50M rows by default
+
+The migration copies into a new table while triggers mirror live writes, then
+swaps the two with an atomic RENAME, unless the new table holds fewer rows
+than the old one. Creating triggers needs the TRIGGER
+privilege; with binary logging on it may also need log_bin_trust_function_creators.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LOG_RETENTION_MONTHS = int(os.getenv("REQUEST_LOG_RETENTION_MONTHS", 13))
+REQUEST_LOG_PARTITIONS_AHEAD = int(os.getenv("REQUEST_LOG_PARTITIONS_AHEAD", 3))
+REQUEST_LOG_ROLLUP_DAYS = int(os.getenv("REQUEST_LOG_ROLLUP_DAYS", 7))
+
+TABLE = "request_logging"
+ROLLUP_TABLE = "request_log_daily"
+MAINTENANCE_LOCK = "request_log_maintenance"
+
+COLUMNS = "incident_id, software_name, version_name, status, requested_by, timestamp"
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _partition_month(name: str) -> Optional[date]:
+    if len(name) == 7 and name.startswith("p") and name[1:].isdigit():
+        return date(int(name[1:5]), int(name[5:]), 1)
+    return None
+
+
+def _partition_clause(month: date) -> str:
+    # Rows from before the first partition's month land in it too
+    return (f"PARTITION {_partition_name(month)} "
+            f"VALUES LESS THAN (UNIX_TIMESTAMP('{_add_months(month, 1)} 00:00:00'))")
+
+
+def table_ddl(name: str = TABLE, first_month: Optional[date] = None,
+              months_ahead: int = REQUEST_LOG_PARTITIONS_AHEAD) -> str:
+    """CREATE TABLE for the partitioned layout, one partition per month from `first_month`"""
+    current = _month_start(date.today())
+    month = _month_start(first_month) if first_month else current
+    clauses = []
+    while month <= _add_months(current, months_ahead):
+        clauses.append(_partition_clause(month))
+        month = _add_months(month, 1)
+    clauses.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+    partitions = ",\n        ".join(clauses)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {name} (
+        id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+        incident_id VARCHAR(100) NOT NULL,
+        software_name VARCHAR(255) NOT NULL,
+        version_name VARCHAR(100) NOT NULL,
+        status VARCHAR(256) NOT NULL,
+        requested_by VARCHAR(255) NULL,
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, timestamp),
+        INDEX idx_incident (incident_id),
+        INDEX idx_software_time (software_name, timestamp),
+        INDEX idx_open_request (requested_by, software_name, version_name, status)
+    )
+    PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) (
+        {partitions}
+    )
+    """
+
+
+def rollup_ddl(name: str = ROLLUP_TABLE) -> str:
+    return f"""
+    CREATE TABLE IF NOT EXISTS {name} (
+        day DATE NOT NULL,
+        software_name VARCHAR(255) NOT NULL,
+        status VARCHAR(256) NOT NULL,
+        requests INT UNSIGNED NOT NULL,
+        PRIMARY KEY (day, software_name, status),
+        INDEX idx_software_day (software_name, day)
+    )
+    """
+
+
+def list_partitions(cursor, table: str = TABLE) -> List[str]:
+    cursor.execute("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, [table])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def ensure_partitions(cursor, table: str = TABLE, months_ahead: int = REQUEST_LOG_PARTITIONS_AHEAD) -> List[str]:
+    """
+    Split p_future so each of the next `months_ahead` months has its own
+    partition. p_future is empty by then, so this is a metadata-only change.
+    Returns the partitions added; none for a table that isn't partitioned yet.
+    """
+    existing = list_partitions(cursor, table)
+    if "p_future" not in existing:
+        return []
+    current = _month_start(date.today())
+    months = [month for month in map(_partition_month, existing) if month]
+    month = _add_months(max(months), 1) if months else current
+    added = []
+    while month <= _add_months(current, months_ahead):
+        added.append(month)
+        month = _add_months(month, 1)
+    if not added:
+        return []
+    clauses = ", ".join([_partition_clause(m) for m in added] + ["PARTITION p_future VALUES LESS THAN MAXVALUE"])
+    cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO ({clauses})")
+    return [_partition_name(m) for m in added]
+
+
+def drop_expired_partitions(cursor, table: str = TABLE,
+                            retention_months: int = REQUEST_LOG_RETENTION_MONTHS) -> List[str]:
+    """Drop the monthly partitions that ended before the retention cutoff. Returns their names."""
+    cutoff = _add_months(_month_start(date.today()), -retention_months)
+    expired = [
+        name for name in list_partitions(cursor, table)
+        if _partition_month(name) and _add_months(_partition_month(name), 1) <= cutoff
+    ]
+    if expired:
+        cursor.execute(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}")
+    return expired
+
+
+def refresh_rollups(conn, since: Optional[date] = None, table: str = TABLE, rollup_table: str = ROLLUP_TABLE) -> int:
+    """
+    Recompute request_log_daily from `since` through today, one month per
+    transaction. By default that is the last REQUEST_LOG_ROLLUP_DAYS days, or
+    further back if earlier runs were missed. Each month's range reads a
+    single partition. Returns the number of rollup rows written.
+    """
+    cursor = conn.cursor()
+    cursor.execute(rollup_ddl(rollup_table))
+    today = date.today()
+    if since is None:
+        cursor.execute(f"SELECT MAX(day) FROM {rollup_table}")
+        last = cursor.fetchone()[0]
+        if last is None:
+            cursor.execute(f"SELECT DATE(MIN(timestamp)) FROM {table}")
+            last = cursor.fetchone()[0] or today
+        since = min(last, today - timedelta(days=REQUEST_LOG_ROLLUP_DAYS))
+
+    written = 0
+    start = since
+    while start <= today:
+        end = min(_add_months(_month_start(start), 1), today + timedelta(days=1))
+        cursor.execute(f"DELETE FROM {rollup_table} WHERE day >= %s AND day < %s", [start, end])
+        cursor.execute(f"""
+            INSERT INTO {rollup_table} (day, software_name, status, requests)
+            SELECT DATE(timestamp), software_name, status, COUNT(*)
+            FROM {table}
+            WHERE timestamp >= %s AND timestamp < %s
+            GROUP BY DATE(timestamp), software_name, status
+        """, [start, end])
+        written += cursor.rowcount
+        conn.commit()
+        start = end
+    cursor.close()
+    return written
+
+
+def run_maintenance(conn=None) -> Dict:
+    """
+    Add upcoming partitions, refresh the daily rollups, then drop expired
+    partitions, in that order, so nothing is dropped before it is rolled up.
+    A MySQL named lock makes sure only one process runs it at a time.
+    """
+    own_connection = conn is None
+    if own_connection:
+        from db_connector import get_connection
+        conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", [MAINTENANCE_LOCK])
+        if not cursor.fetchone()[0]:
+            return {"skipped": "maintenance is running in another process"}
+        try:
+            added = ensure_partitions(cursor)
+            rollup_rows = refresh_rollups(conn)
+            dropped = drop_expired_partitions(cursor)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", [MAINTENANCE_LOCK])
+            cursor.fetchone()
+        return {"partitions_added": added, "rollup_rows": rollup_rows, "partitions_dropped": dropped}
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+
+async def maintenance_loop(interval: float):
+    """Run run_maintenance in a worker thread every `interval` seconds until cancelled"""
+    while True:
+        try:
+            result = await asyncio.to_thread(run_maintenance)
+            logger.info("Request log maintenance finished", extra=result)
+        except Exception as e:
+            logger.error("Request log maintenance failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+# ---------------------------------------------------------------------------
+# Online migration of a table created by the old request_logs.py
+# ---------------------------------------------------------------------------
+
+_TRIGGERS = ("request_logging_mig_ins", "request_logging_mig_upd", "request_logging_mig_del")
+_SAME_ROW = """incident_id = OLD.incident_id AND software_name = OLD.software_name
+               AND version_name = OLD.version_name AND timestamp = OLD.timestamp"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+def _time_windows(start: datetime, end: datetime, hours: int):
+    while start < end:
+        stop = min(start + timedelta(hours=hours), end)
+        yield start, stop
+        start = stop
+
+
+def migrate(conn, batch_hours: int = 6, pause: float = 0.05):
+    """
+    Move an unpartitioned request_logging to the partitioned layout while the
+    bot keeps writing to it:
+
+      1. index `timestamp` on the old table (INPLACE, no lock) so it can be copied in time slices
+      2. create request_logging_new and triggers that mirror every insert, update and delete into it
+      3. copy rows older than the triggers in `batch_hours` slices, one short transaction each,
+         then the rows logged while the triggers were being created, skipping those they mirrored
+      4. re-apply statuses that changed while their slice was being copied
+      5. RENAME both tables in one atomic statement; the old table is kept as request_logging_old
+
+    If the new table ends up with fewer rows than the old one, it raises
+    MigrationError before the RENAME and leaves the triggers in place, so
+    request_logging_new keeps up with live writes while it is inspected.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    if "p_future" in list_partitions(cursor):
+        print("ℹ️  request_logging is already partitioned")
+        return
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'request_logging' AND COLUMN_NAME = 'timestamp'
+          AND SEQ_IN_INDEX = 1
+    """)
+    if cursor.fetchone()[0] == 0:
+        print("➕ Indexing timestamp on the current table...")
+        cursor.execute("ALTER TABLE request_logging ADD INDEX idx_migrate_ts (timestamp), ALGORITHM=INPLACE, LOCK=NONE")
+
+    cursor.execute("SELECT MIN(timestamp) FROM request_logging")
+    first = cursor.fetchone()[0]
+    cursor.execute(table_ddl("request_logging_new", first.date() if first else None))
+
+    # Everything logged before this second is copied in slices below
+    cursor.execute("SELECT NOW()")
+    t0 = cursor.fetchone()[0]
+
+    print("🔁 Mirroring live writes into request_logging_new...")
+    cursor.execute(f"""
+        CREATE TRIGGER {_TRIGGERS[0]} AFTER INSERT ON request_logging FOR EACH ROW
+        INSERT INTO request_logging_new ({COLUMNS})
+        VALUES (NEW.incident_id, NEW.software_name, NEW.version_name, NEW.status, NEW.requested_by,
+                COALESCE(NEW.timestamp, CURRENT_TIMESTAMP))
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {_TRIGGERS[1]} AFTER UPDATE ON request_logging FOR EACH ROW
+        UPDATE request_logging_new SET status = NEW.status, requested_by = NEW.requested_by
+        WHERE {_SAME_ROW}
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {_TRIGGERS[2]} AFTER DELETE ON request_logging FOR EACH ROW
+        DELETE FROM request_logging_new WHERE {_SAME_ROW} LIMIT 1
+    """)
+    # Everything logged after this second is copied by the triggers
+    cursor.execute("SELECT NOW()")
+    cutoff = cursor.fetchone()[0]
+    start = first or t0
+
+    # Rows without a timestamp (the old column allowed NULL) go to the first partition
+    cursor.execute(f"""
+        INSERT INTO request_logging_new ({COLUMNS})
+        SELECT incident_id, software_name, version_name, status, requested_by, FROM_UNIXTIME(1)
+        FROM request_logging WHERE timestamp IS NULL
+    """)
+    conn.commit()
+
+    copied = cursor.rowcount
+    total_seconds = max((t0 - start).total_seconds(), 1)
+    for low, high in _time_windows(start, t0, batch_hours):
+        cursor.execute(f"""
+            INSERT INTO request_logging_new ({COLUMNS})
+            SELECT {COLUMNS} FROM request_logging WHERE timestamp >= %s AND timestamp < %s
+        """, [low, high])
+        conn.commit()
+        copied += cursor.rowcount
+        print(f"\r📦 Copied {copied} rows ({(high - start).total_seconds() / total_seconds:.0%})", end="", flush=True)
+        time.sleep(pause)
+    # Rows logged while the triggers were being created may or may not have been
+    # mirrored; copy the ones that were not
+    cursor.execute(f"""
+        INSERT INTO request_logging_new ({COLUMNS})
+        SELECT o.incident_id, o.software_name, o.version_name, o.status, o.requested_by, o.timestamp
+        FROM request_logging o
+        WHERE o.timestamp >= %s AND o.timestamp <= %s AND NOT EXISTS (
+            SELECT 1 FROM request_logging_new n
+            WHERE n.incident_id = o.incident_id AND n.software_name = o.software_name
+              AND n.version_name = o.version_name AND n.timestamp = o.timestamp
+        )
+    """, [t0, cutoff])
+    conn.commit()
+    print()
+
+    print("🩹 Re-applying statuses that changed during the copy...")
+    fixed = 0
+    for low, high in _time_windows(start, cutoff + timedelta(seconds=1), batch_hours):
+        cursor.execute("""
+            UPDATE request_logging_new n
+            JOIN request_logging o
+              ON n.incident_id = o.incident_id AND n.software_name = o.software_name
+             AND n.version_name = o.version_name AND n.timestamp = o.timestamp
+            SET n.status = o.status, n.requested_by = o.requested_by
+            WHERE o.timestamp >= %s AND o.timestamp < %s
+              AND (n.status <> o.status OR NOT (n.requested_by <=> o.requested_by))
+        """, [low, high])
+        conn.commit()
+        fixed += cursor.rowcount
+
+    cursor.execute("SELECT COUNT(*) FROM request_logging")
+    old_count = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM request_logging_new")
+    new_count = cursor.fetchone()[0]
+    print(f"🔎 {old_count} rows in the current table, {new_count} in the new one, {fixed} statuses re-applied")
+    if new_count < old_count:
+        cursor.close()
+        raise MigrationError(
+            f"request_logging_new is missing {old_count - new_count} of {old_count} rows; not swapping the tables. "
+            f"The triggers still mirror live writes. To start over, drop {', '.join(_TRIGGERS)} "
+            f"and request_logging_new.")
+
+    cursor.execute("RENAME TABLE request_logging TO request_logging_old, request_logging_new TO request_logging")
+    for trigger in _TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute(rollup_ddl())
+    conn.commit()
+    cursor.close()
+    print("✅ request_logging is partitioned. request_logging_old is kept; drop it once you have checked the new table.")
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: legacy layout vs partitioned layout on scratch tables
+# ---------------------------------------------------------------------------
+
+BENCH_LEGACY = "bench_request_logging_legacy"
+BENCH_TABLE = "bench_request_logging"
+BENCH_ROLLUP = "bench_request_log_daily"
+
+
+def _fill(conn, table: str, rows: int, months: int, apps: int):
+    """Seed a few thousand random rows, then keep doubling with INSERT ... SELECT and fresh random values"""
+    cursor = conn.cursor()
+    now = int(time.time())
+    span = months * 31 * 86400
+    statuses = ["Created", "In Progress", "Resolved", "Closed"]
+    seed = [
+        (f"INC{random.randrange(10 ** 9):09d}", f"app{random.randrange(apps)}", f"{random.randrange(1, 20)}.0",
+         random.choice(statuses), f"user{random.randrange(10 ** 5)}",
+         datetime.fromtimestamp(now - random.randrange(span)))
+        for _ in range(5000)
+    ]
+    cursor.executemany(f"INSERT INTO {table} ({COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s)", seed)
+    conn.commit()
+    count = len(seed)
+    while count < rows:
+        cursor.execute(f"""
+            INSERT INTO {table} ({COLUMNS})
+            SELECT CONCAT('INC', LPAD(FLOOR(RAND() * 1e9), 9, '0')), CONCAT('app', FLOOR(RAND() * %s)),
+                   version_name, status, requested_by, FROM_UNIXTIME(%s - FLOOR(RAND() * %s))
+            FROM {table} LIMIT %s
+        """, [apps, now, span, min(count, rows - count)])
+        conn.commit()
+        count += cursor.rowcount
+        print(f"\r📦 {table}: {count} rows", end="", flush=True)
+    print()
+    cursor.close()
+
+
+def _best_of(cursor, sql: str, params, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(conn, rows: int = 50_000_000, months: int = 12, apps: int = 500, repeat: int = 3, keep: bool = False):
+    """
+    Load the same data into the legacy layout (no keys) and the partitioned
+    layout and time the queries the bot and reports run against each.
+    """
+    cursor = conn.cursor()
+    first_month = _add_months(_month_start(date.today()), -months)
+    cursor.execute(f"DROP TABLE IF EXISTS {BENCH_LEGACY}, {BENCH_TABLE}, {BENCH_ROLLUP}")
+    cursor.execute(table_ddl(BENCH_TABLE, first_month))
+    cursor.execute(f"""
+        CREATE TABLE {BENCH_LEGACY} (
+            incident_id VARCHAR(100) NOT NULL,
+            software_name VARCHAR(255) NOT NULL,
+            version_name VARCHAR(100) NOT NULL,
+            status VARCHAR(256) NOT NULL,
+            requested_by VARCHAR(255) NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _fill(conn, BENCH_TABLE, rows, months, apps)
+    print(f"📦 Copying into {BENCH_LEGACY}...")
+    cursor.execute(f"INSERT INTO {BENCH_LEGACY} ({COLUMNS}) SELECT {COLUMNS} FROM {BENCH_TABLE}")
+    conn.commit()
+
+    start = time.perf_counter()
+    refresh_rollups(conn, since=first_month, table=BENCH_TABLE, rollup_table=BENCH_ROLLUP)
+    print(f"🧮 Full rollup: {time.perf_counter() - start:.1f}s")
+
+    cursor.execute(f"SELECT incident_id, software_name FROM {BENCH_TABLE} ORDER BY RAND() LIMIT 1")
+    incident, app = cursor.fetchone()
+    last_month = _add_months(_month_start(date.today()), -1)
+    this_month = _month_start(date.today())
+    queries = [
+        ("ticket lookup",
+         "SELECT status FROM {t} WHERE incident_id = %s", [incident], None),
+        ("app history, one month",
+         "SELECT COUNT(*) FROM {t} WHERE software_name = %s AND timestamp >= %s AND timestamp < %s",
+         [app, last_month, this_month], None),
+        ("volume, one month",
+         "SELECT COUNT(*) FROM {t} WHERE timestamp >= %s AND timestamp < %s", [last_month, this_month], None),
+        ("daily report, one month",
+         "SELECT DATE(timestamp), software_name, COUNT(*) FROM {t} "
+         "WHERE timestamp >= %s AND timestamp < %s GROUP BY DATE(timestamp), software_name",
+         [last_month, this_month],
+         f"SELECT day, software_name, SUM(requests) FROM {BENCH_ROLLUP} "
+         f"WHERE day >= %s AND day < %s GROUP BY day, software_name"),
+    ]
+    print(f"\n{'query':<28}{'legacy':>12}{'partitioned':>14}")
+    for label, sql, params, optimized in queries:
+        legacy = _best_of(cursor, sql.format(t=BENCH_LEGACY), params, repeat)
+        new = _best_of(cursor, optimized or sql.format(t=BENCH_TABLE), params, repeat)
+        print(f"{label:<28}{legacy * 1000:>10.1f}ms{new * 1000:>12.1f}ms")
+
+    # Retention: dropping the oldest month
+    oldest = _partition_name(first_month)
+    start = time.perf_counter()
+    cursor.execute(f"DELETE FROM {BENCH_LEGACY} WHERE timestamp < %s", [_add_months(first_month, 1)])
+    conn.commit()
+    legacy = time.perf_counter() - start
+    start = time.perf_counter()
+    cursor.execute(f"ALTER TABLE {BENCH_TABLE} DROP PARTITION {oldest}")
+    new = time.perf_counter() - start
+    print(f"{'retention, one month':<28}{legacy * 1000:>10.1f}ms{new * 1000:>12.1f}ms")
+
+    if not keep:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_LEGACY}, {BENCH_TABLE}, {BENCH_ROLLUP}")
+    cursor.close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from db_connector import DB_CONFIG
+    import mysql.connector
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_cmd = commands.add_parser("migrate", help="partition an existing request_logging online")
+    migrate_cmd.add_argument("--batch-hours", type=int, default=6)
+    commands.add_parser("maintain", help="add partitions, refresh rollups, apply retention")
+    bench_cmd = commands.add_parser("benchmark", help="compare layouts on scratch tables")
+    bench_cmd.add_argument("--rows", type=int, default=50_000_000)
+    bench_cmd.add_argument("--months", type=int, default=12)
+    bench_cmd.add_argument("--keep", action="store_true", help="keep the scratch tables")
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        if args.command == "migrate":
+            try:
+                migrate(connection, args.batch_hours)
+            except MigrationError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+        elif args.command == "maintain":
+            print(run_maintenance(connection))
+        else:
+            benchmark(connection, args.rows, args.months, keep=args.keep)
+    finally:
+        connection.close()
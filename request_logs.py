@@ -47,6 +47,8 @@
 import os
 import mysql.connector
 from dotenv import load_dotenv
+from catalog_loader import SOFTWARE_ALIAS_DDL
+from request_log_schema import list_partitions, rollup_ddl, table_ddl
 
 # Load environment variables from .env
 load_dotenv()
@@ -70,18 +72,64 @@ try:
     # Drop old table if structure is different (optional: only if you want fresh structure)
     # cursor.execute("DROP TABLE IF EXISTS request_logging")
 
-    # Create table with correct structure
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS request_logging (
-        incident_id VARCHAR(100) NOT NULL,
+    # Create table with correct structure: surrogate key, indexes, monthly partitions
+    cursor.execute(table_ddl())
+    cursor.execute(rollup_ddl())
+
+    # Upgrade tables created before duplicate detection existed
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'request_logging' AND COLUMN_NAME = 'requested_by'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("ALTER TABLE request_logging ADD COLUMN requested_by VARCHAR(255) NULL AFTER status")
+        cursor.execute("""
+            CREATE INDEX idx_open_request
+            ON request_logging (requested_by, software_name, version_name, status)
+        """)
+        print("✅ request_logging upgraded with requested_by column and duplicate-check index")
+
+    if "p_future" not in list_partitions(cursor):
+        print("ℹ️  request_logging predates partitioning; run `python request_log_schema.py migrate` to upgrade it online")
+
+    # Daily request counts per app behind "popular software". Filled by
+    # log_software_request; backfilled once from existing request history.
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'software_popularity'
+    """)
+    popularity_exists = cursor.fetchone()[0] > 0
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS software_popularity (
         software_name VARCHAR(255) NOT NULL,
-        version_name VARCHAR(100) NOT NULL,
-        status VARCHAR(256) NOT NULL,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        bucket_date DATE NOT NULL,
+        requests INT UNSIGNED NOT NULL DEFAULT 0,
+        PRIMARY KEY (software_name, bucket_date),
+        INDEX idx_bucket_date (bucket_date)
     );
-    """
+    """)
+    if not popularity_exists:
+        cursor.execute("""
+            INSERT INTO software_popularity (software_name, bucket_date, requests)
+            SELECT LOWER(software_name), DATE(timestamp), COUNT(*)
+            FROM request_logging
+            GROUP BY LOWER(software_name), DATE(timestamp)
+        """)
+        print(f"✅ software_popularity created and backfilled ({cursor.rowcount} daily rows)")
+
+    # Conversation references for proactive "your ticket changed" messages
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS conversation_references (
+        incident_id VARCHAR(100) NOT NULL PRIMARY KEY,
+        reference TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+    # Alias map the bot resolves typed software names through; catalog_loader
+    # adds its catalog_version triggers on the next load
+    cursor.execute(SOFTWARE_ALIAS_DDL)
 
-    cursor.execute(create_table_query)
     connection.commit()
 
     print("✅ request_logging table created/verified successfully!")
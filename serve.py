@@ -0,0 +1,443 @@
+# serve.py
+"""
+Production launcher for the bot.
+
+Starts WEB_CONCURRENCY worker processes, each running the aiohttp app on its
+own socket bound to the same port with SO_REUSEPORT, so the kernel spreads
+incoming connections across them. The parent only supervises: it restarts
+workers that die (with backoff, giving up on a crash loop) and on SIGTERM or
+SIGINT asks every worker to shut down gracefully before killing stragglers.
+
+Pod-wide budgets such as the DB pool size are divided between the workers.
+
+A request to the shared port reaches a random worker, so /metrics, /healthz
+and /readyz there only describe that one process. The launcher therefore
+serves them for the whole pod on METRICS_PORT. It collects them from each
+worker's own port, 127.0.0.1:METRICS_PORT + 1 + worker id:
+  /metrics  every worker's metrics, each sample labelled worker="<id>", plus bot_worker_up
+  /readyz   200 only once every worker is ready
+  /healthz  200 while the launcher is supervising
+Scrape and probe METRICS_PORT, not PORT.
+
+    python serve.py                       # WEB_CONCURRENCY workers on HOST:PORT
+    python serve.py --workers 4 --port 3978 --metrics-port 9090
+    python serve.py --benchmark           # throughput from 1 to N workers
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Before anything reads the environment; spawned workers inherit it
+load_dotenv()
+
+from config import DefaultConfig
+from llm_scheduler import LLM_BURST, LLM_CONCURRENCY, LLM_MAX_QUEUE, LLM_REQUESTS_PER_MINUTE
+from log_config import configure_logging
+
+logger = logging.getLogger("serve")
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 0)) or os.cpu_count() or 1
+HOST = os.getenv("HOST", "0.0.0.0")
+# Seconds a worker gets to finish in-flight requests and flush its queues on shutdown
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", 30))
+# More than RESTART_LIMIT crashes within RESTART_WINDOW seconds stops the launcher
+RESTART_LIMIT = int(os.getenv("RESTART_LIMIT", 5))
+RESTART_WINDOW = float(os.getenv("RESTART_WINDOW", 60))
+RESTART_BACKOFF_MAX = float(os.getenv("RESTART_BACKOFF_MAX", 10))
+# Pod-wide /metrics, /healthz and /readyz; worker N listens on METRICS_PORT + 1 + N. 0 turns it off.
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9090))
+ADMIN_PATHS = ("/metrics", "/healthz", "/readyz")
+
+# Pod-wide budgets divided between workers: env var -> (default total, type).
+# DB_POOL_SIZE uses the same default as db_connector.
+PER_WORKER_SPLIT = {
+    "DB_POOL_SIZE": (10, int),
+    "NOTIFY_CONCURRENCY": (DefaultConfig.NOTIFY_CONCURRENCY, int),
+    "NOTIFY_RATE_PER_CHANNEL": (DefaultConfig.NOTIFY_RATE_PER_CHANNEL, float),
+    "NOTIFY_BURST_PER_CHANNEL": (DefaultConfig.NOTIFY_BURST_PER_CHANNEL, int),
+    # The Groq quota is per account, so its rate limit must be shared too
+    "LLM_CONCURRENCY": (LLM_CONCURRENCY, int),
+    "LLM_REQUESTS_PER_MINUTE": (LLM_REQUESTS_PER_MINUTE, float),
+    "LLM_BURST": (LLM_BURST, int),
+    "LLM_MAX_QUEUE": (LLM_MAX_QUEUE, int),
+}
+
+
+def worker_settings(workers: int) -> Dict[str, str]:
+    """Environment overrides giving each worker its share of the pod-wide budgets"""
+    settings = {}
+    for name, (default, kind) in PER_WORKER_SPLIT.items():
+        total = kind(os.getenv(name, default))
+        share = total / workers
+        # Round a positive budget up to one per worker; 0 (e.g. DB_POOL_SIZE=0,
+        # pooling disabled) must stay 0
+        if kind is int:
+            share = max(1, int(share)) if total > 0 else total
+        settings[name] = str(share)
+    return settings
+
+
+def _reuseport_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+def _load_app(target: str):
+    """Resolve "module:attribute"; the attribute may be an Application or a factory for one"""
+    module_name, _, attribute = target.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute)
+    return app() if callable(app) else app
+
+
+def _serve_admin(app, port: int):
+    """Also serve the app's ADMIN_PATHS on 127.0.0.1:port, where the launcher collects them"""
+    from aiohttp import web
+
+    admin = web.Application()
+    for route in app.router.routes():
+        if route.method == "GET" and route.resource is not None and route.resource.canonical in ADMIN_PATHS:
+            admin.router.add_get(route.resource.canonical, route.handler)
+    runner = web.AppRunner(admin, access_log=None)
+
+    async def start(_):
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    async def stop(_):
+        await runner.cleanup()
+
+    app.on_startup.append(start)
+    app.on_cleanup.append(stop)
+
+
+def _worker_main(worker_id: int, target: str, host: str, port: int, settings: Dict[str, str],
+                 admin_port: int = 0):
+    # Runs in a freshly spawned interpreter, so the overrides are in place before
+    # config.py and db_connector read the environment
+    os.environ.update(settings)
+    os.environ["WORKER_ID"] = str(worker_id)
+    configure_logging()
+
+    from aiohttp import web
+
+    app = _load_app(target)
+    if admin_port:
+        _serve_admin(app, admin_port)
+    sock = _reuseport_socket(host, port)
+    logger.info("Worker %d (pid %d) serving on %s:%d", worker_id, os.getpid(), host, port)
+    # run_app turns SIGTERM/SIGINT into a graceful shutdown that runs on_cleanup
+    web.run_app(app, sock=sock, shutdown_timeout=GRACEFUL_TIMEOUT, print=None, access_log=None)
+
+
+def _fetch(port: int, path: str, timeout: float = 2.0) -> Tuple[int, bytes]:
+    """(status, body) of a worker's admin endpoint; status 0 if it is unreachable"""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except OSError:
+        return 0, b""
+
+
+def pod_endpoint(path: str, worker_ports: Dict[int, int]) -> Tuple[int, str, bytes]:
+    """(status, content type, body) of a pod-wide admin endpoint, gathered from the workers"""
+    from metrics import merge_worker_metrics
+
+    if path == "/healthz":
+        return 200, "application/json", json.dumps({"status": "ok", "workers": len(worker_ports)}).encode()
+
+    replies = {worker_id: _fetch(port, path) for worker_id, port in worker_ports.items()}
+    if path == "/metrics":
+        texts = {str(w): body.decode("utf-8") for w, (status, body) in replies.items() if status == 200}
+        up = ["# HELP bot_worker_up Whether the launcher could collect the worker's metrics",
+              "# TYPE bot_worker_up gauge"]
+        up += [f'bot_worker_up{{worker="{w}"}} {int(str(w) in texts)}' for w in replies]
+        body = merge_worker_metrics(texts) + "\n".join(up) + "\n"
+        return 200, "text/plain; version=0.0.4; charset=utf-8", body.encode("utf-8")
+
+    # /readyz: the pod takes traffic only once every worker can serve it
+    workers = {}
+    for worker_id, (status, body) in replies.items():
+        try:
+            workers[str(worker_id)] = json.loads(body) if status else {"status": "unreachable"}
+        except ValueError:
+            workers[str(worker_id)] = {"status": f"HTTP {status}"}
+    ready = all(status == 200 for status, _ in replies.values())
+    body = json.dumps({"status": "ready" if ready else "starting", "workers": workers})
+    return 200 if ready else 503, "application/json", body.encode()
+
+
+def _admin_server(host: str, port: int, worker_ports: Dict[int, int]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ADMIN_PATHS:
+                self.send_error(404)
+                return
+            status, content_type, body = pod_endpoint(self.path, worker_ports)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+class Supervisor:
+    """Keeps `workers` processes running until asked to stop"""
+
+    def __init__(self, target: str, host: str, port: int, workers: int, metrics_port: int = 0):
+        self.target = target
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.metrics_port = metrics_port
+        self.worker_ports = {w: metrics_port + 1 + w for w in range(workers)} if metrics_port else {}
+        self._admin: Optional[ThreadingHTTPServer] = None
+        self.settings = worker_settings(workers)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._respawn_at: Dict[int, float] = {}
+        self._crashes: List[float] = []
+        self._stopping = False
+        self._guard: Optional[socket.socket] = None
+
+    def _spawn(self, worker_id: int):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.target, self.host, self.port, self.settings, self.worker_ports.get(worker_id, 0)),
+            name=f"worker-{worker_id}",
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _reap(self, worker_id: int, process: multiprocessing.Process):
+        process.join()
+        del self._processes[worker_id]
+        if self._stopping:
+            return
+        now = time.monotonic()
+        self._crashes = [t for t in self._crashes if now - t < RESTART_WINDOW] + [now]
+        if len(self._crashes) > RESTART_LIMIT:
+            logger.error("%d worker crashes within %.0fs, giving up", len(self._crashes), RESTART_WINDOW)
+            self._stopping = True
+            return
+        delay = min(RESTART_BACKOFF_MAX, 0.5 * 2 ** (len(self._crashes) - 1))
+        logger.warning("Worker %d exited with code %s, restarting in %.1fs", worker_id, process.exitcode, delay)
+        self._respawn_at[worker_id] = now + delay
+
+    def run(self, handle_signals: bool = True) -> int:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            logger.error("SO_REUSEPORT is not available on this platform; run app.py directly")
+            return 1
+        # Holding a bound, non-listening socket fails fast if the port is taken and
+        # keeps it reserved; the kernel only hands connections to listening sockets
+        try:
+            self._guard = _reuseport_socket(self.host, self.port)
+        except OSError as e:
+            logger.error("Cannot bind %s:%d: %s", self.host, self.port, e)
+            return 1
+        if self.metrics_port:
+            try:
+                self._admin = _admin_server(self.host, self.metrics_port, self.worker_ports)
+            except OSError as e:
+                logger.error("Cannot bind the metrics port %s:%d: %s", self.host, self.metrics_port, e)
+                self._guard.close()
+                return 1
+            threading.Thread(target=self._admin.serve_forever, name="pod-metrics", daemon=True).start()
+
+        if handle_signals:
+            signal.signal(signal.SIGTERM, self._request_stop)
+            signal.signal(signal.SIGINT, self._request_stop)
+
+        logger.info("Starting %d workers on %s:%d (per worker: %s)", self.workers, self.host, self.port, self.settings)
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+
+        crashed = False
+        while not self._stopping:
+            now = time.monotonic()
+            for worker_id, due in list(self._respawn_at.items()):
+                if due <= now:
+                    del self._respawn_at[worker_id]
+                    self._spawn(worker_id)
+
+            sentinels = {process.sentinel: worker_id for worker_id, process in self._processes.items()}
+            for sentinel in wait(list(sentinels), timeout=0.5):
+                worker_id = sentinels[sentinel]
+                self._reap(worker_id, self._processes[worker_id])
+            crashed = len(self._crashes) > RESTART_LIMIT
+
+        self.stop()
+        return 1 if crashed else 0
+
+    def stop(self):
+        """SIGTERM every worker, wait up to GRACEFUL_TIMEOUT (+ margin), then SIGKILL"""
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        for worker_id, process in self._processes.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Worker %d did not stop in time, killing it", worker_id)
+                process.kill()
+                process.join()
+        self._processes.clear()
+        if self._guard is not None:
+            self._guard.close()
+            self._guard = None
+        if self._admin is not None:
+            self._admin.shutdown()
+            self._admin.server_close()
+            self._admin = None
+        logger.info("All workers stopped")
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def benchmark_app():
+    """
+    Stand-in for app.APP without MySQL, Groq or ServiceNow: each request parses
+    the activity JSON, builds the software selection card for a 300-entry
+    catalog, serialises it, and awaits a short sleep in place of backend I/O.
+    """
+    from aiohttp import web
+    from card_builder import build_software_selection_card
+
+    catalog = {f"application-{i:03d}": [f"{i % 7}.{i % 11}.{i % 13}", f"{i % 7}.{i % 11}.0"] for i in range(300)}
+
+    async def messages(req):
+        activity = await req.json()
+        await asyncio.sleep(0.002)
+        card = build_software_selection_card(catalog)
+        return web.json_response({"id": activity.get("id"), "attachments": [card.serialize()]})
+
+    app = web.Application()
+    app.router.add_post("/api/messages", messages)
+    return app
+
+
+def _load_generator(url: str, connections: int, duration: float, results):
+    import aiohttp
+
+    async def run():
+        body = {"type": "message", "text": "install software", "id": "bench"}
+        done = 0
+        stop_at = time.monotonic() + duration
+
+        async def client(session):
+            nonlocal done
+            while time.monotonic() < stop_at:
+                async with session.post(url, json=body) as response:
+                    await response.read()
+                    if response.status == 200:
+                        done += 1
+
+        connector = aiohttp.TCPConnector(limit=0, force_close=False)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await asyncio.gather(*(client(session) for _ in range(connections)))
+        return done
+
+    results.put(asyncio.run(run()))
+
+
+def _wait_until_listening(host: str, port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on {host}:{port}")
+
+
+def benchmark(max_workers: int, duration: float, port: int):
+    import threading
+
+    context = multiprocessing.get_context("spawn")
+    host = "127.0.0.1"
+    url = f"http://{host}:{port}/api/messages"
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+
+    print(f"{os.cpu_count()} CPUs, {duration:.0f}s per run, load generator: 2 processes x 64 connections")
+    baseline = None
+    for workers in counts:
+        supervisor = Supervisor("serve:benchmark_app", host, port, workers)
+        # Signal handlers can only be installed from the main thread
+        thread = threading.Thread(target=supervisor.run, kwargs={"handle_signals": False}, daemon=True)
+        thread.start()
+        _wait_until_listening(host, port)
+        time.sleep(1.0)  # let every worker bind
+
+        results = context.Queue()
+        generators = [context.Process(target=_load_generator, args=(url, 64, duration, results)) for _ in range(2)]
+        for generator in generators:
+            generator.start()
+        total = sum(results.get() for _ in generators)
+        for generator in generators:
+            generator.join()
+
+        supervisor._request_stop(None, None)
+        thread.join()
+
+        throughput = total / duration
+        baseline = baseline or throughput
+        print(f"workers={workers:<3d} {throughput:9.0f} req/s   speedup x{throughput / baseline:.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", DefaultConfig.PORT)))
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="pod-wide /metrics, /healthz and /readyz; workers use the ports after it (0: off)")
+    parser.add_argument("--app", default="app:APP", help="module:attribute of the aiohttp application")
+    parser.add_argument("--benchmark", action="store_true", help="measure throughput from 1 to --workers workers")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per benchmark run")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.benchmark:
+        benchmark(max(1, args.workers), args.duration, args.port)
+        return 0
+    return Supervisor(args.app, args.host, args.port, max(1, args.workers), args.metrics_port).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
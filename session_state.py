@@ -0,0 +1,191 @@
+# session_state.py
+"""
+Per-conversation session state.
+
+The bot keeps one small "session" dict per conversation in Bot Framework
+ConversationState. It holds the catalog slice the user was last shown and the
+apps whose version card is still pending, so follow-up card submissions can be
+answered without another database round trip.
+
+Storage is pluggable: SESSION_STORAGE=memory (default) uses
+BoundedMemoryStorage below, and SESSION_STORAGE=module:factory uses any
+botbuilder Storage returned by that factory, e.g. Cosmos DB or Blob storage.
+SESSION_TTL is also checked when a session is read, so sessions expire on any
+backend.
+"""
+import importlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from botbuilder.core import ConversationState, Storage
+
+SESSION_STORAGE = os.getenv("SESSION_STORAGE", "memory")
+# Seconds of inactivity after which a conversation's session is dropped
+SESSION_TTL = int(os.getenv("SESSION_TTL", 1800))
+# Limits for the in-memory backend: conversations kept, and total serialized size
+SESSION_MAX_CONVERSATIONS = int(os.getenv("SESSION_MAX_CONVERSATIONS", 10000))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", 64 * 1024 * 1024))
+# Per-conversation limits: apps kept in the catalog slice, and serialized size
+SESSION_MAX_APPS = int(os.getenv("SESSION_MAX_APPS", 50))
+SESSION_MAX_ITEM_BYTES = int(os.getenv("SESSION_MAX_ITEM_BYTES", 16 * 1024))
+
+
+def _dumps(item) -> bytes:
+    return json.dumps(item, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class BoundedMemoryStorage(Storage):
+    """
+    In-process botbuilder Storage with TTL and LRU eviction. Items are kept as
+    compact JSON bytes, so the size accounting is exact and reads hand out fresh
+    copies. Writes are last-writer-wins, the same as MemoryStorage for state that
+    carries no e_tag.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_items: int = SESSION_MAX_CONVERSATIONS,
+                 max_bytes: int = SESSION_MAX_BYTES, max_item_bytes: int = SESSION_MAX_ITEM_BYTES):
+        super().__init__()
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        # key -> (expires_at, serialized item), least recently used first
+        self._items: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _drop(self, key: str):
+        _, data = self._items.pop(key)
+        self._bytes -= len(data)
+
+    def _evict(self, now: float):
+        # Oldest first: expired items, then whatever exceeds the count or size limit
+        while self._items:
+            key, (expires_at, _) = next(iter(self._items.items()))
+            if expires_at > now and len(self._items) <= self.max_items and self._bytes <= self.max_bytes:
+                break
+            self._drop(key)
+
+    async def read(self, keys: List[str]):
+        now = time.monotonic()
+        data = {}
+        with self._lock:
+            for key in keys or []:
+                entry = self._items.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    self._drop(key)
+                    continue
+                # Any access counts as activity, so LRU order is also expiry order
+                self._items[key] = (now + self.ttl, entry[1])
+                self._items.move_to_end(key)
+                data[key] = json.loads(entry[1])
+        return data
+
+    async def write(self, changes: Dict[str, object]):
+        if changes is None:
+            raise Exception("Changes are required when writing")
+        now = time.monotonic()
+        with self._lock:
+            for key, change in changes.items():
+                serialized = _dumps(change)
+                if key in self._items:
+                    self._drop(key)
+                if len(serialized) > self.max_item_bytes:
+                    # Oversized state is not kept; the next turn starts from an empty session
+                    continue
+                self._items[key] = (now + self.ttl, serialized)
+                self._bytes += len(serialized)
+            self._evict(now)
+
+    async def delete(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                if key in self._items:
+                    self._drop(key)
+
+
+def create_storage() -> Storage:
+    """Storage backend selected by SESSION_STORAGE"""
+    if SESSION_STORAGE == "memory":
+        return BoundedMemoryStorage()
+    module_name, _, attribute = SESSION_STORAGE.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+def create_conversation_state(storage: Optional[Storage] = None) -> ConversationState:
+    return ConversationState(storage or create_storage())
+
+
+# ---------------------------------------------------------------------------
+# Session helpers. A session is a plain dict so any storage can serialize it:
+#   {"catalog": {app: [versions]}, "pending": [app, ...], "updated": epoch seconds}
+# ---------------------------------------------------------------------------
+
+def new_session() -> dict:
+    return {}
+
+
+def refresh(session: dict) -> dict:
+    """Clear the session if it has been idle longer than SESSION_TTL"""
+    if session and time.time() - session.get("updated", 0) > SESSION_TTL:
+        session.clear()
+    return session
+
+
+def remember_catalog(session: dict, catalog: Dict[str, List[str]], pending: bool = False):
+    """
+    Merge a resolved catalog slice into the session, keeping only the
+    SESSION_MAX_APPS most recently shown apps. With `pending`, the apps are also
+    recorded as waiting for a version choice.
+    """
+    if not catalog:
+        return
+    known = session.setdefault("catalog", {})
+    for app, versions in catalog.items():
+        known.pop(app, None)
+        known[app] = list(versions)
+    while len(known) > SESSION_MAX_APPS:
+        del known[next(iter(known))]
+
+    if pending:
+        waiting = [app for app in session.get("pending", []) if app not in catalog] + list(catalog)
+        session["pending"] = waiting[-SESSION_MAX_APPS:]
+    session["updated"] = time.time()
+
+
+def resolve_from_session(session: dict, names: List[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+    """Split `names` into the part of the catalog the session already holds and the names it doesn't"""
+    known = session.get("catalog", {})
+    found, missing = {}, []
+    for name in names:
+        versions = known.get(name.lower())
+        if versions is None:
+            missing.append(name)
+        else:
+            found[name.lower()] = versions
+    return found, missing
+
+
+def has_version(session: dict, app: str, version: str) -> bool:
+    return version in session.get("catalog", {}).get(app.lower(), ())
+
+
+def resolve_pending(session: dict, app: str):
+    """The user has picked a version for `app`"""
+    pending = session.get("pending")
+    if pending and app.lower() in pending:
+        pending.remove(app.lower())
+        session["updated"] = time.time()
@@ -0,0 +1,99 @@
+# single_flight.py
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from metrics import Counter
+
+COALESCED = Counter(
+    "bot_single_flight_total",
+    "Calls through single-flight groups: 'leader' ran the work, 'coalesced' shared an in-flight result",
+    ["flight", "role"],
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution instead of each
+    doing the same work. Nothing is cached: once the call finishes, the next
+    caller runs it again.
+
+    `call` is for plain functions called from several threads. `run` is for
+    coroutines on the event loop, where waiting callers don't hold a thread.
+    Every caller gets the same result object, so treat it as read-only.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+
+    def call(self, key: Hashable, func: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED.inc(self.name, "coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        COALESCED.inc(self.name, "leader")
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]):
+        while True:
+            future = self._futures.get(key)
+            if future is None:
+                break
+            COALESCED.inc(self.name, "coalesced")
+            try:
+                # shield: one caller giving up must not cancel the others
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    continue  # the leader was cancelled, not us; run it ourselves
+                raise
+
+        COALESCED.inc(self.name, "leader")
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting; don't warn about an unretrieved exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._futures[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._futures.get(key) is future:
+                del self._futures[key]
@@ -1,62 +1,132 @@
 # software_extractor.py
-from llm import get_llm_response
-from db_connector import get_all_software_names, search_software_by_partial_name
+from llm import complete
+from db_connector import resolve_software_alias, search_software_by_partial_name
+from catalog_index import find_software_mentions, get_catalog_index
+from intent_parser import match_install_request
+from single_flight import SingleFlight
+from typing import List, Tuple
 import json
+import logging
+import os
 import re
 
+logger = logging.getLogger(__name__)
 
-def get_software_extraction_prompt(available_software: list[str], user_message: str) -> str:
-    """
-    Create a prompt for LLM to extract software names from user message.
-    """
-    software_list = "\n".join([f"- {software}" for software in available_software])
-    
-    prompt = f"""You are a software name extraction expert. Your task is to identify which software from the available database the user wants to install.
+# Upper bound on the extraction prompt, in estimated tokens. Only the catalog
+# shortlist for the message goes into the prompt, trimmed to fit this budget.
+EXTRACTION_PROMPT_TOKEN_BUDGET = int(os.getenv("EXTRACTION_PROMPT_TOKEN_BUDGET", 1200))
 
-AVAILABLE SOFTWARE IN DATABASE:
-{software_list}
+# The same message arriving from several users at once is extracted once
+EXTRACTION_FLIGHT = SingleFlight("extraction")
 
-USER MESSAGE: "{user_message}"
+
+# The same for every call, so it goes in the system message; only the candidate
+# list and the message change per call
+EXTRACTION_SYSTEM_PROMPT = """You are a software name extraction expert. Your task is to identify which software from the available database the user wants to install.
 
 INSTRUCTIONS:
 1. Extract software names that the user wants to install
-2. Match user requests to the EXACT names from the available software list above
+2. Match user requests to the EXACT names from the AVAILABLE SOFTWARE list in the user's message
 3. Handle common variations (e.g., "chrome" → "Google Chrome", "vscode" → "Visual Studio Code")
 4. If user says "install software" or similar without specifying, return empty apps list
 5. If no matches found, return empty apps list
 
 OUTPUT FORMAT (JSON only):
-{{
+{
   "intent": "install" | "other",
   "apps": ["Exact Software Name 1", "Exact Software Name 2"],
   "confidence": "high" | "medium" | "low",
   "reasoning": "Brief explanation of matches made"
-}}
+}
 
 EXAMPLES:
-User: "install chrome" → {{"intent": "install", "apps": ["Google Chrome"], "confidence": "high", "reasoning": "Chrome matches Google Chrome"}}
-User: "I need vscode and python" → {{"intent": "install", "apps": ["Visual Studio Code", "Python"], "confidence": "high", "reasoning": "vscode→Visual Studio Code, python→Python"}}
-User: "what is AI?" → {{"intent": "other", "apps": [], "confidence": "high", "reasoning": "Not an installation request"}}
+User: "install chrome" → {"intent": "install", "apps": ["Google Chrome"], "confidence": "high", "reasoning": "Chrome matches Google Chrome"}
+User: "I need vscode and python" → {"intent": "install", "apps": ["Visual Studio Code", "Python"], "confidence": "high", "reasoning": "vscode→Visual Studio Code, python→Python"}
+User: "what is AI?" → {"intent": "other", "apps": [], "confidence": "high", "reasoning": "Not an installation request"}
 """
-    return prompt
+
+
+def get_software_extraction_prompt(available_software: list[str], user_message: str) -> str:
+    """
+    The per-call part of the extraction prompt: the candidates and the user
+    message. The instructions are EXTRACTION_SYSTEM_PROMPT.
+    """
+    software_list = "\n".join([f"- {software}" for software in available_software])
+
+    return f"""AVAILABLE SOFTWARE IN DATABASE (closest matches to the message):
+{software_list}
+
+USER MESSAGE: "{user_message}"
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about 4 characters per token for English text"""
+    return len(text) // 4 + 1
+
+
+def build_extraction_prompt(candidates: List[str], user_message: str,
+                            budget: int = EXTRACTION_PROMPT_TOKEN_BUDGET) -> Tuple[str, List[str]]:
+    """
+    Extraction user prompt listing as many of `candidates` (best first) as fit
+    in `budget` tokens together with EXTRACTION_SYSTEM_PROMPT. Returns the
+    prompt and the candidates it lists.
+    """
+    # A pasted log or essay keeps only its start, about a quarter of the
+    # budget, so there is still room for the candidates
+    user_message = user_message[:budget]
+
+    remaining = (budget - estimate_tokens(EXTRACTION_SYSTEM_PROMPT)
+                 - estimate_tokens(get_software_extraction_prompt([], user_message)))
+    kept = []
+    for name in candidates:
+        cost = estimate_tokens(f"- {name}\n")
+        if cost > remaining:
+            break
+        kept.append(name)
+        remaining -= cost
+    return get_software_extraction_prompt(kept, user_message), kept
 
 
 def extract_software_names(user_message: str) -> dict:
     """
     Use LLM to extract software names from user message based on available database software.
     """
+    key = " ".join(user_message.lower().split())
+    return EXTRACTION_FLIGHT.call(key, _extract_software_names, user_message)
+
+
+def _extract_software_names(user_message: str) -> dict:
+    # "install vscode and slack" needs no LLM: every word is accounted for by the alias map
+    matched = match_install_request(user_message)
+    if matched:
+        return {**matched, "confidence": "high", "reasoning": "Matched catalog names and aliases"}
+
     try:
-        # Get available software from database
-        available_software = get_all_software_names()
+        # Index over the cached catalog
+        index = get_catalog_index()
         
-        if not available_software:
+        if not len(index):
             return {"intent": "other", "apps": [], "confidence": "low", "reasoning": "No software available in database"}
         
-        # Create extraction prompt
-        prompt = get_software_extraction_prompt(available_software, user_message)
+        # Only the likely candidates go to the LLM, not the whole catalog
+        candidates = index.shortlist(user_message)
+        if not candidates:
+            # Nothing in the catalog resembles the message, so there is nothing for the LLM to match
+            return fallback_extraction(user_message, [])
+
+        prompt, listed = build_extraction_prompt(candidates, user_message)
+        logger.debug("Extraction prompt built", extra={
+            "candidates": len(listed), "catalog_size": len(index),
+            "prompt_tokens": estimate_tokens(EXTRACTION_SYSTEM_PROMPT) + estimate_tokens(prompt),
+        })
         
         # Get LLM response
-        response = get_llm_response(prompt)
+        try:
+            response = complete("software_extraction", EXTRACTION_SYSTEM_PROMPT, prompt)
+        except Exception as e:
+            logger.warning("Software extraction call failed, using keyword fallback: %s", e)
+            return fallback_extraction(user_message, index.names)
         
         # Extract JSON from response
         json_match = re.search(r'\{.*\}', response, re.DOTALL)
@@ -73,8 +143,9 @@ def extract_software_names(user_message: str) -> dict:
                 # Verify extracted software names exist in database
                 verified_apps = []
                 for app in result["apps"]:
-                    if app in available_software:
-                        verified_apps.append(app)
+                    canonical = resolve_software_alias(app)
+                    if canonical:
+                        verified_apps.append(canonical)
                     else:
                         # Try fuzzy matching
                         matches = search_software_by_partial_name(app)
@@ -85,10 +156,10 @@ def extract_software_names(user_message: str) -> dict:
                 return result
         
         # Fallback if JSON parsing fails
-        return fallback_extraction(user_message, available_software)
+        return fallback_extraction(user_message, index.names)
         
     except Exception as e:
-        print(f"Software extraction error: {e}")
+        logger.warning("Software extraction error: %s", e)
         return {"intent": "other", "apps": [], "confidence": "low", "reasoning": f"Extraction failed: {str(e)}"}
 
 
@@ -103,8 +174,8 @@ def fallback_extraction(user_message: str, available_software: list[str]) -> dic
     if not any(keyword in message_lower for keyword in install_keywords):
         return {"intent": "other", "apps": [], "confidence": "high", "reasoning": "No install keywords detected"}
     
-    # Find matching software
-    found_software = []
+    # Names and aliases first, then any catalog name sharing a word with the message
+    found_software = find_software_mentions(user_message)
     for software in available_software:
         software_lower = software.lower()
         software_words = software_lower.split()
@@ -114,18 +185,6 @@ def fallback_extraction(user_message: str, available_software: list[str]) -> dic
             if len(word) > 2 and word in message_lower:  # Ignore very short words
                 found_software.append(software)
                 break
-        
-        # Check common abbreviations
-        if "visual studio code" == software_lower and any(term in message_lower for term in ["vscode", "vs code"]):
-            found_software.append(software)
-        elif "google chrome" == software_lower and "chrome" in message_lower:
-            found_software.append(software)
-        elif "microsoft teams" == software_lower and "teams" in message_lower:
-            found_software.append(software)
-        elif "node.js" == software_lower and any(term in message_lower for term in ["node", "nodejs"]):
-            found_software.append(software)
-        elif "docker desktop" == software_lower and "docker" in message_lower:
-            found_software.append(software)
     
     # Remove duplicates
     found_software = list(dict.fromkeys(found_software))
@@ -143,16 +202,16 @@ def fallback_extraction(user_message: str, available_software: list[str]) -> dic
 
 def validate_software_exists(software_names: list[str]) -> tuple[list[str], list[str]]:
     """
-    Validate that software names exist in database.
-    Returns (found_software, missing_software)
+    Validate that software names exist in database, by catalog name or alias.
+    Returns (found_software, missing_software); found names are canonical.
     """
-    available_software = get_all_software_names()
     found = []
     missing = []
     
     for software in software_names:
-        if software in available_software:
-            found.append(software)
+        canonical = resolve_software_alias(software)
+        if canonical:
+            found.append(canonical)
         else:
             missing.append(software)
     
@@ -0,0 +1,110 @@
+# status_updates.py
+import asyncio
+import hashlib
+import hmac
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from db_connector import update_request_statuses
+
+logger = logging.getLogger(__name__)
+
+# ServiceNow incident state codes -> request_logging status
+SN_STATE_STATUS = {
+    "1": "New",
+    "2": "In Progress",
+    "3": "On Hold",
+    "6": "Resolved",
+    "7": "Closed",
+    "8": "Cancelled",
+}
+
+
+def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    """Check an HMAC-SHA256 hex signature of the raw request body"""
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def status_from_event(event: dict) -> Optional[str]:
+    """Map a webhook event's state (code or label) to a request_logging status"""
+    state = str(event.get("state", "")).strip()
+    if state in SN_STATE_STATUS:
+        return SN_STATE_STATUS[state]
+    for status in SN_STATE_STATUS.values():
+        if state.lower() == status.lower():
+            return status
+    return None
+
+
+class StatusUpdateBatcher:
+    """
+    Coalesces incident status changes and writes them to request_logging in
+    batches. Only the latest status per incident within a flush window is kept.
+    Listeners are awaited with each flushed batch, e.g. to notify requesters.
+    At most max_pending incidents wait for a flush; while the database is down
+    further incidents are refused instead of piling up in memory.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, max_batch: int = 500, max_pending: int = 10000):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.listeners: List[Callable[[Dict[str, str]], Awaitable[None]]] = []
+        self._pending: Dict[str, str] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def submit(self, incident_number: str, status: str) -> bool:
+        """Queue a status change. Returns False if the buffer is full and it was dropped."""
+        # A newer status for a pending incident takes no extra room
+        if incident_number not in self._pending and len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self._pending[incident_number] = status
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        changed = await asyncio.to_thread(update_request_statuses, batch)
+        if changed < 0:
+            # Keep the batch for the next flush, but never overwrite newer statuses
+            for incident, status in batch.items():
+                self._pending.setdefault(incident, status)
+            return 0
+        for listener in self.listeners:
+            try:
+                await listener(batch)
+            except Exception as e:
+                logger.exception("Status update listener failed: %s", e)
+        return changed
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -0,0 +1,46 @@
+# conftest.py
+import os
+import sys
+
+import pytest
+from langchain_core.messages import AIMessage
+
+# The bot's modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: timing checks that take several seconds; deselect with -m 'not slow'")
+
+
+class FakeChatModel:
+    """Replies by user message; a reply longer than max_tokens words is cut off like the API does"""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.calls = []
+        self.max_tokens = None
+
+    def bind(self, max_tokens=None):
+        bound = FakeChatModel(self.replies)
+        bound.calls, bound.max_tokens = self.calls, max_tokens
+        return bound
+
+    def invoke(self, messages):
+        (_, system), (_, user) = messages
+        self.calls.append((system, user, self.max_tokens))
+        words = self.replies[user].split(" ")
+        cut = self.max_tokens is not None and len(words) > self.max_tokens
+        return AIMessage(" ".join(words[:self.max_tokens] if cut else words),
+                         response_metadata={"finish_reason": "length" if cut else "stop"})
+
+
+@pytest.fixture
+def chat_model(monkeypatch):
+    """Install a FakeChatModel with the given replies as the shared LLM"""
+    def install(replies):
+        import llm
+        model = FakeChatModel(replies)
+        monkeypatch.setattr(llm, "_llm", model)
+        return model
+    return install
@@ -0,0 +1,124 @@
+# test_bot_routing.py
+import asyncio
+import threading
+import time
+
+import pytest
+from botbuilder.core import TurnContext
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.schema import Activity, ActivityTypes, ChannelAccount, ConversationAccount
+
+import bot
+import intent_parser
+from llm_scheduler import Priority
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.priorities = []
+
+    async def run(self, priority, user_id, func, *args, **kwargs):
+        self.priorities.append(priority)
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+
+@pytest.fixture
+def scheduler(monkeypatch, chat_model):
+    scheduler = RecordingScheduler()
+    monkeypatch.setattr(bot, "LLM_SCHEDULER", scheduler)
+    monkeypatch.setattr(bot, "COMBINED_INTENT_ANSWER", True)
+    monkeypatch.setattr(bot, "get_cached_catalog", lambda: None)
+    chat_model({
+        "what is a stack?": '{"intent": "cs_it", "apps": []}\n\nA stack is last in, first out.',
+        "explain everything": '{"intent": "cs_it", "apps": []}\n\n' + "word " * 50,
+    })
+    return scheduler
+
+
+def replies(text):
+    async def turn():
+        adapter = TestAdapter(bot.MyBot().on_turn)
+        await adapter.send(Activity(type=ActivityTypes.message, text=text, from_property=ChannelAccount(id="u1")))
+        return [activity.text for activity in adapter.activity_buffer]
+    return asyncio.run(turn())
+
+
+def test_short_answer_comes_from_the_classification_call(scheduler):
+    assert replies("what is a stack?") == ["A stack is last in, first out."]
+    assert scheduler.priorities == [Priority.INSTALL]
+
+
+def test_long_answer_is_generated_at_cs_it_priority(scheduler, monkeypatch):
+    monkeypatch.setattr(intent_parser, "COMBINED_ANSWER_MAX_TOKENS", 20)
+    sent = replies("explain everything")
+    assert scheduler.priorities == [Priority.INSTALL, Priority.CS_IT]
+    assert sent[-1].startswith('{"intent": "cs_it"')
+
+
+def card_turn(adapter, value):
+    activity = Activity(type=ActivityTypes.message, value=value, from_property=ChannelAccount(id="u1"),
+                        conversation=ConversationAccount(id="c1"), channel_id="test", service_url="https://test")
+    return TurnContext(adapter, activity)
+
+
+def test_double_click_on_an_install_card_creates_one_ticket(monkeypatch):
+    created = []
+
+    def find_open_request(requested_by, app, version):
+        time.sleep(0.05)  # a database round trip, off the event loop
+        return None
+
+    async def create_incident_direct(incident_data):
+        await asyncio.sleep(0.05)
+        created.append(incident_data)
+        return {"result": {"number": "INC0010001"}}
+
+    async def extract_incident_data(description, requested_by=""):
+        return {"short_description": description}
+
+    monkeypatch.setattr(bot, "find_open_request", find_open_request)
+    monkeypatch.setattr(bot, "get_software_info", lambda app, version: {"name": app, "version": version})
+    monkeypatch.setattr(bot, "log_software_request", lambda *args: True)
+    monkeypatch.setattr(bot, "save_conversation_reference", lambda incident, reference: True)
+    monkeypatch.setattr(bot.MyBot, "create_incident_direct", staticmethod(create_incident_direct))
+    monkeypatch.setattr(bot.MyBot, "extract_incident_data", staticmethod(extract_incident_data))
+
+    async def two_clicks():
+        adapter, my_bot = TestAdapter(), bot.MyBot()
+        card = {"action": "install", "app": "zoom", "version": "5.0"}
+        await asyncio.gather(*(my_bot._handle_card_submission(card_turn(adapter, card)) for _ in range(2)))
+        return [activity.text for activity in adapter.activity_buffer]
+
+    sent = asyncio.run(two_clicks())
+    assert len(created) == 1
+    assert any("already being created" in text for text in sent)
+    assert "✅ Incident created successfully! Incident Number: INC0010001" in sent
+    assert not bot._INSTALLS_IN_FLIGHT
+
+
+def test_ticket_bookkeeping_runs_off_the_event_loop(monkeypatch):
+    loop_thread = threading.get_ident()
+    writes = []
+
+    def record(name):
+        def write(*args):
+            writes.append((name, threading.get_ident() != loop_thread))
+            return True
+        return write
+
+    async def create_incident_direct(incident_data):
+        return {"result": {"number": "INC0010002"}}
+
+    async def extract_incident_data(description, requested_by=""):
+        return {}
+
+    monkeypatch.setattr(bot, "find_open_request", lambda *args: None)
+    monkeypatch.setattr(bot, "get_software_info", lambda app, version: {"name": app, "version": version})
+    monkeypatch.setattr(bot, "log_software_request", record("log"))
+    monkeypatch.setattr(bot, "save_conversation_reference", record("reference"))
+    monkeypatch.setattr(bot.MyBot, "create_incident_direct", staticmethod(create_incident_direct))
+    monkeypatch.setattr(bot.MyBot, "extract_incident_data", staticmethod(extract_incident_data))
+
+    card = {"action": "install", "app": "git", "version": "2.4"}
+    asyncio.run(bot.MyBot()._handle_card_submission(card_turn(TestAdapter(), card)))
+    assert writes == [("log", True), ("reference", True)]
@@ -0,0 +1,225 @@
+# test_catalog_loader.py
+import json
+import tracemalloc
+
+import pytest
+
+import catalog_loader
+from catalog_loader import CatalogLoadError, load_catalog
+
+
+class FakeSoftwareTable:
+    """
+    Just enough of MySQL for load_catalog: the software rows keyed by (name,
+    version), catalog_version and its triggers, and the session variables
+    """
+
+    def __init__(self, rows=()):
+        self.rows = {(name, version): {"last_synced": None} for name, version in rows}
+        self.version = 1
+        self.session = {}
+        self.commits = 0
+        self.rollbacks = 0
+
+    def trigger(self):
+        if self.session.get("catalog_bulk_load") is None:
+            self.version += 1
+        else:
+            self.session["catalog_changed"] = 1
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeCursor:
+    def __init__(self, table):
+        self.table = table
+        self.rowcount = 0
+        self._row = None
+
+    def executemany(self, query, rows):
+        for name, version, description, url, run_id in rows:
+            previous = self.table.rows.get((name, version))
+            self.table.rows[(name, version)] = {"description": description, "last_synced": run_id}
+            if previous is None or previous.get("description") != description:
+                self.table.trigger()
+        self.rowcount = len(rows)
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        rows = self.table.rows
+        if query == "SELECT COUNT(*) FROM software":
+            self._row = (len(rows),)
+        elif query.startswith("SELECT COUNT(*) FROM software WHERE"):
+            self._row = (sum(1 for r in rows.values() if r["last_synced"] != params[0]),)
+        elif query.startswith("DELETE FROM software"):
+            run_id, limit = params
+            stale = [key for key, r in rows.items() if r["last_synced"] != run_id][:limit]
+            for key in stale:
+                del rows[key]
+                self.table.trigger()
+            self.rowcount = len(stale)
+        elif query.startswith("SELECT version FROM catalog_version"):
+            self._row = (self.table.version,)
+        elif query.startswith("UPDATE catalog_version"):
+            self.table.version += 1
+        elif query.startswith("SET @"):
+            for assignment in query[len("SET "):].split(", "):
+                name, value = assignment.split(" = ")
+                self.table.session[name.lstrip("@")] = None if value == "NULL" else int(value)
+        elif query == "SELECT @catalog_changed":
+            self._row = (self.table.session.get("catalog_changed"),)
+        else:
+            raise AssertionError(f"unexpected query: {query}")
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_schema_changes(monkeypatch):
+    monkeypatch.setattr(catalog_loader, "ensure_schema", lambda conn: None)
+
+
+def write_csv(path, rows):
+    path.write_text("name,version,description\n" + "".join(f"{n},{v},{d}\n" for n, v, d in rows), encoding="utf-8")
+    return str(path)
+
+
+def test_load_upserts_in_batches_and_deletes_what_the_source_dropped(tmp_path):
+    table = FakeSoftwareTable([("Zoom", "5.0"), ("Retired", "1.0"), ("Old", "0.9")])
+    rows = [("Zoom", "5.0", "Video calls")] + [(f"App {i}", "1.0", "") for i in range(9)]
+    path = write_csv(tmp_path / "catalog.csv", rows + [("", "1.0", "no name"), ("Nameless", "", "no version")])
+
+    stats = load_catalog(table, path, batch_size=4, max_delete_fraction=0.5)
+
+    assert stats["rows"] == 10 and stats["skipped"] == 2 and stats["batches"] == 3
+    assert stats["deleted"] == 2
+    assert set(table.rows) == {(name, version) for name, version, _ in rows}
+    assert table.rows[("Zoom", "5.0")]["description"] == "Video calls"
+
+
+def test_deletes_run_in_batches(tmp_path):
+    table = FakeSoftwareTable([(f"Stale {i}", "1.0") for i in range(7)])
+    path = write_csv(tmp_path / "catalog.csv", [(f"App {i}", "1.0", "") for i in range(10)])
+    commits_before = table.commits
+
+    stats = load_catalog(table, path, batch_size=3)
+
+    assert stats["deleted"] == 7
+    # 4 upsert batches, deletes of 3, 3 and 1 rows, then the version bump
+    assert table.commits - commits_before == 4 + 3 + 1
+
+
+def test_refuses_to_wipe_most_of_the_catalog(tmp_path):
+    table = FakeSoftwareTable([(f"App {i}", "1.0") for i in range(10)])
+    path = write_csv(tmp_path / "truncated.csv", [("App 0", "1.0", "")])
+
+    with pytest.raises(CatalogLoadError, match="refusing to delete"):
+        load_catalog(table, path)
+    assert len(table.rows) == 10
+
+    assert load_catalog(table, path, force=True)["deleted"] == 9
+    assert set(table.rows) == {("App 0", "1.0")}
+
+
+def test_no_delete_keeps_missing_rows(tmp_path):
+    table = FakeSoftwareTable([("Old", "1.0")])
+    path = write_csv(tmp_path / "catalog.csv", [("New", "1.0", "")])
+    assert load_catalog(table, path, delete_missing=False)["deleted"] == 0
+    assert set(table.rows) == {("Old", "1.0"), ("New", "1.0")}
+
+
+def test_failed_load_deletes_nothing(tmp_path):
+    table = FakeSoftwareTable([("Old", "1.0")])
+    path = tmp_path / "broken.jsonl"
+    path.write_text(json.dumps({"name": "New", "version": "1.0"}) + "\n{not json\n", encoding="utf-8")
+
+    with pytest.raises(CatalogLoadError, match="broken.jsonl:2"):
+        load_catalog(table, str(path), batch_size=1)
+    assert set(table.rows) == {("Old", "1.0"), ("New", "1.0")}
+
+
+class CountingConnection:
+    """Counts upserted rows without keeping them, to measure the loader's own memory"""
+
+    def __init__(self):
+        self.upserted = 0
+        self.rowcount = 0
+
+    def cursor(self):
+        return self
+
+    def executemany(self, query, rows):
+        self.upserted += len(rows)
+
+    def execute(self, query, params=None):
+        self._query = query
+
+    def fetchone(self):
+        return (0,) if "last_synced" in self._query else (self.upserted,)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("name", ["catalog.csv", "catalog.jsonl"])
+def test_memory_does_not_grow_with_the_input(tmp_path, name):
+    path = str(tmp_path / name)
+    catalog_loader.generate_sample(path, 100_000)
+    conn = CountingConnection()
+
+    tracemalloc.start()
+    try:
+        stats = load_catalog(conn, path, batch_size=1000)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert stats["rows"] == conn.upserted == 100_000
+    # One batch of rows plus the reader's buffers; the file itself is ~7 MB
+    assert peak < 2_000_000
+
+
+def test_a_load_bumps_the_catalog_version_once(tmp_path):
+    table = FakeSoftwareTable([("Zoom", "5.0"), ("Retired", "1.0")])
+    path = write_csv(tmp_path / "catalog.csv", [(f"App {i}", "1.0", "") for i in range(5)] + [("Zoom", "5.0", "")])
+
+    stats = load_catalog(table, path, batch_size=2, max_delete_fraction=1)
+
+    # Five inserts, a changed description and a delete, but one bump
+    assert stats["catalog_changed"] and stats["catalog_version"] == 2
+    assert table.session == {"catalog_bulk_load": None, "catalog_changed": None}
+
+
+def test_loading_an_unchanged_export_keeps_the_version(tmp_path):
+    table = FakeSoftwareTable()
+    path = write_csv(tmp_path / "catalog.csv", [("Zoom", "5.0", "Video calls")])
+    load_catalog(table, path)
+
+    stats = load_catalog(table, path)
+
+    assert not stats["catalog_changed"] and stats["catalog_version"] == 2
+
+
+def test_failed_load_still_publishes_the_committed_batches(tmp_path):
+    table = FakeSoftwareTable()
+    path = tmp_path / "broken.jsonl"
+    path.write_text(json.dumps({"name": "New", "version": "1.0"}) + "\n{not json\n", encoding="utf-8")
+
+    with pytest.raises(CatalogLoadError):
+        load_catalog(table, str(path), batch_size=1)
+    assert table.version == 2
+    assert table.session["catalog_bulk_load"] is None
@@ -0,0 +1,126 @@
+# test_catalog_version.py
+import pytest
+
+import db_connector
+from catalog_loader import CATALOG_TRIGGERS, ensure_catalog_version
+
+
+class NoSuchTable(Exception):
+    errno = 1146
+
+
+class FakeCatalogDatabase:
+    def __init__(self, version):
+        self.version = version
+        self.rows = [("Slack", "4.1"), ("Zoom", "5.0")]
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, query, params=None):
+        self.query = " ".join(query.split())
+        self.db.queries.append(self.query)
+        if self.query.startswith("SELECT version FROM catalog_version") and self.db.version is None:
+            raise NoSuchTable("Table 'catalog_version' doesn't exist")
+
+    def fetchone(self):
+        return (self.db.version,)
+
+    def fetchall(self):
+        if "FROM software_alias" in self.query:
+            return [("chat", "Slack")]
+        return list(self.db.rows)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db_connector.time, "time", lambda: now[0])
+    return now
+
+
+def database(monkeypatch, version):
+    db = FakeCatalogDatabase(version)
+    monkeypatch.setattr(db_connector, "get_connection", lambda: db)
+    monkeypatch.setattr(db_connector, "_catalog_cache", None)
+    return db
+
+
+def test_unchanged_version_costs_one_query_and_keeps_the_catalog(monkeypatch, clock):
+    db = database(monkeypatch, version=1)
+    catalog = db_connector.fetch_all_software()
+    assert db_connector.resolve_software_alias("chat") == "slack"
+
+    db.queries.clear()
+    assert db_connector.refresh_catalog() is catalog
+    assert db.queries == ["SELECT version FROM catalog_version WHERE id = 1"]
+
+    db.version = 2
+    db.rows.append(("Git", "2.4"))
+    reloaded = db_connector.refresh_catalog()
+    assert reloaded is not catalog and "git" in reloaded
+
+
+def test_without_catalog_version_the_ttl_applies(monkeypatch, clock):
+    db = database(monkeypatch, version=None)
+    catalog = db_connector.fetch_all_software()
+
+    # The background watcher polls every few seconds; none of that reaches the database
+    db.queries.clear()
+    clock[0] += db_connector.CATALOG_CACHE_TTL - 1
+    assert db_connector.refresh_catalog() is catalog
+    assert db.queries == []
+
+    clock[0] += 1
+    assert db_connector.refresh_catalog() is not catalog
+    assert any(query.startswith("SELECT name, version FROM software") for query in db.queries)
+
+
+class TriggerCursor:
+    def __init__(self, tables, triggers):
+        self.tables = tables
+        self.triggers = triggers
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.query = " ".join(query.split())
+        self.statements.append(self.query)
+
+    def fetchall(self):
+        if "information_schema.TABLES" in self.query:
+            return [(table,) for table in self.tables]
+        if "information_schema.TRIGGERS" in self.query:
+            return list(self.triggers.items())
+        return []
+
+
+def test_ensure_replaces_triggers_that_predate_the_bulk_load_flag():
+    current = CATALOG_TRIGGERS["software_version_ins"][2]
+    cursor = TriggerCursor(["software"], {
+        # MySQL may hand the body back with different whitespace
+        "software_version_ins": "\n    ".join(current.split(" ")),
+        "software_version_del": "UPDATE catalog_version SET version = version + 1 WHERE id = 1",
+    })
+
+    ensure_catalog_version(cursor)
+
+    changed = [s for s in cursor.statements if s.startswith(("CREATE TRIGGER", "DROP TRIGGER"))]
+    assert changed == [
+        "CREATE TRIGGER software_version_upd AFTER UPDATE ON software FOR EACH ROW "
+        + " ".join(CATALOG_TRIGGERS["software_version_upd"][2].split()),
+        "DROP TRIGGER software_version_del",
+        "CREATE TRIGGER software_version_del AFTER DELETE ON software FOR EACH ROW " + current,
+    ]
+    assert all("@catalog_bulk_load IS NULL" in body for _, _, body in CATALOG_TRIGGERS.values())
@@ -0,0 +1,17 @@
+# test_import_budget.py
+import pytest
+
+import import_budget
+
+
+@pytest.mark.parametrize("module", sorted(import_budget.BUDGETS_MS))
+def test_import_does_not_load_deferred_dependencies(module):
+    # One cold import per module; raises if the import itself fails
+    _, imported = import_budget.measure(module)
+    assert module in imported
+    assert import_budget.leaked_deferred(imported) == []
+
+
+@pytest.mark.slow
+def test_imports_stay_within_budget():
+    assert import_budget.check(import_budget.BUDGETS_MS) == []
@@ -0,0 +1,130 @@
+# test_incident_similarity.py
+import random
+import threading
+import time
+
+import pytest
+
+from incident_mirror import IncidentMirror
+from incident_similarity import IncidentSimilarityIndex
+
+RECORDS = 100_000
+APPS = ["zoom", "slack", "chrome", "firefox", "python", "docker", "git", "teams", "vpn", "outlook"]
+PROBLEMS = ["install fails", "crashes on start", "license expired", "cannot login", "update stuck",
+            "slow performance", "missing dependency", "permission denied", "network timeout"]
+# Incidents with wording nothing else in the data set shares
+PLANTED = {
+    f"INC9{i:06d}": f"kerberos ticket skew on sapgui{i} workstation{i}" for i in range(25)
+}
+
+
+def synthetic_records(count: int):
+    rng = random.Random(7)
+    for n in range(count):
+        app, problem = rng.choice(APPS), rng.choice(PROBLEMS)
+        yield {
+            "number": f"INC{n:07d}",
+            "short_description": f"{app} {problem}",
+            "description": f"{app} {problem} on laptop {rng.randint(1, 500)}",
+            "sys_updated_on": f"2026-01-01 00:{n // 6000 % 60:02d}:{n // 100 % 60:02d}",
+        }
+    for number, text in PLANTED.items():
+        yield {"number": number, "short_description": text, "description": "", "sys_updated_on": "2026-01-02 00:00:00"}
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = IncidentSimilarityIndex()
+    index.add_records(synthetic_records(RECORDS))
+    return index
+
+
+def test_indexes_every_record(index):
+    assert len(index) == RECORDS + len(PLANTED)
+
+
+def test_unique_incident_is_top_match(index):
+    for number, text in PLANTED.items():
+        best_number, label, score = index.query(text, top_k=3)[0]
+        assert best_number == number
+        assert label == text
+        assert score > 0.99
+
+
+def test_results_are_relevant_and_ordered(index):
+    matches = index.query("zoom crashes on start", top_k=10)
+    assert len(matches) == 10
+    assert all(label == "zoom crashes on start" for _, label, _ in matches)
+    scores = [score for _, _, score in matches]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_query_latency(index):
+    rng = random.Random(1)
+    queries = [f"{rng.choice(APPS)} {rng.choice(PROBLEMS)}" for _ in range(50)]
+    start = time.perf_counter()
+    for query in queries:
+        index.query(query, top_k=10)
+    per_query = (time.perf_counter() - start) / len(queries)
+    # About 12 ms on one core; the bound only catches a return to a per-row Python loop
+    assert per_query < 0.1
+
+
+def test_reindexing_replaces_the_vector():
+    index = IncidentSimilarityIndex(initial_capacity=2)
+    index.add_records(synthetic_records(10))
+    index.add("INC0000003", "printer out of toner", "printer out of toner")
+    assert len(index) == 10 + len(PLANTED)
+    assert index.query("printer toner", top_k=1)[0][0] == "INC0000003"
+
+
+def test_empty_and_degenerate_queries():
+    index = IncidentSimilarityIndex()
+    assert index.query("anything") == []
+    index.add_records([{"number": "INC1", "short_description": "vpn drops"}, {"number": "INC2"}, {"short_description": "x"}])
+    assert len(index) == 1
+    assert index.query("vpn", top_k=0) == []
+
+
+def test_mirror_round_trip(tmp_path):
+    mirror = IncidentMirror(str(tmp_path / "mirror.db"))
+    assert mirror.upsert(list(synthetic_records(RECORDS))) == RECORDS + len(PLANTED)
+
+    # More numbers than SQLite allows bound parameters in one statement
+    numbers = [f"INC{n:07d}" for n in range(0, RECORDS, 50)]
+    assert set(mirror.get_many(numbers)) == set(numbers)
+    assert sum(1 for _ in mirror.iter_records()) == RECORDS + len(PLANTED)
+
+    # The mirror seeds the similarity index without a ServiceNow round trip
+    index = IncidentSimilarityIndex()
+    index.add_records(mirror.iter_records())
+    number, text = next(iter(PLANTED.items()))
+    assert index.query(text, top_k=1)[0][0] == number
+    mirror.close()
+
+
+def test_mirror_partial_write_keeps_fields_and_watermark_only_advances(tmp_path):
+    mirror = IncidentMirror(str(tmp_path / "mirror.db"))
+    assert mirror.watermark() == "" and mirror.last_synced() == 0
+    mirror.upsert([{"number": "INC1", "short_description": "vpn drops", "state": "1"}])
+    mirror.upsert([{"number": "INC1", "state": "7"}])
+    assert mirror.get("INC1") == {"number": "INC1", "short_description": "vpn drops", "state": "7"}
+
+    mirror.finish_sync("2026-01-02 00:00:00")
+    mirror.finish_sync("2026-01-01 00:00:00")
+    assert mirror.watermark() == "2026-01-02 00:00:00"
+    assert mirror.is_fresh(60)
+    mirror.close()
+
+
+def test_concurrent_writers_lose_nothing():
+    index = IncidentSimilarityIndex(initial_capacity=1)
+    records = list(synthetic_records(4000))
+    writers = [threading.Thread(target=index.add_records, args=(records[i::4],)) for i in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert len(index) == len(records)
+    number, text = next(iter(PLANTED.items()))
+    assert index.query(text, top_k=1)[0][0] == number
@@ -0,0 +1,62 @@
+# test_intent_parser.py
+import pytest
+import intent_parser
+import llm_usage
+
+
+@pytest.fixture
+def model(monkeypatch, chat_model):
+    model = chat_model({
+        "please install zoom": '{"intent": "install", "apps": ["Zoom "]}',
+        "what is a stack?": '{"intent": "cs_it", "apps": []}\n\nA stack is last in, first out.',
+        "explain everything": '{"intent": "cs_it", "apps": []}\n\n' + "word " * 50,
+        "hello": "Hi! I am not following the format.",
+    })
+
+    def no_alias_scan(user_message):
+        raise AssertionError("the bot has already tried the fast path")
+
+    monkeypatch.setattr(intent_parser, "match_install_request", no_alias_scan)
+    return model
+
+
+def test_parse_intent_goes_straight_to_the_llm(model):
+    assert intent_parser.parse_intent("please install zoom") == {"intent": "install", "apps": ["zoom"]}
+    assert model.calls[0][:2] == (intent_parser.INTENT_PROMPT, "please install zoom")
+
+
+def test_combined_reply_is_split_into_intent_and_answer(model):
+    assert intent_parser.parse_intent_and_answer("what is a stack?") == {
+        "intent": "cs_it", "apps": [], "answer": "A stack is last in, first out."}
+    assert intent_parser.parse_intent_and_answer("please install zoom") == {
+        "intent": "install", "apps": ["zoom"], "answer": ""}
+    assert all(max_tokens == intent_parser.COMBINED_ANSWER_MAX_TOKENS for _, _, max_tokens in model.calls)
+
+
+def test_answer_cut_off_at_the_cap_is_dropped_and_counted(model, monkeypatch):
+    monkeypatch.setattr(intent_parser, "COMBINED_ANSWER_MAX_TOKENS", 20)
+    truncated = llm_usage.LLM_TRUNCATED._values.get(("intent_answer",), 0)
+    # The classification survives; the caller answers at the intent's own priority
+    assert intent_parser.parse_intent_and_answer("explain everything") == {
+        "intent": "cs_it", "apps": [], "answer": ""}
+    assert llm_usage.LLM_TRUNCATED._values[("intent_answer",)] == truncated + 1
+
+    intent_parser.parse_intent_and_answer("what is a stack?")
+    assert llm_usage.LLM_TRUNCATED._values[("intent_answer",)] == truncated + 1
+
+
+def test_unsplittable_reply_falls_back_to_keywords(model):
+    assert intent_parser.parse_intent_and_answer("hello") == {"intent": "other", "apps": [], "answer": ""}
+
+
+def test_keyword_fallback_never_loads_the_catalog(monkeypatch):
+    def no_database():
+        raise AssertionError("the fallback must not query the database")
+
+    monkeypatch.setattr(intent_parser, "get_cached_catalog", lambda: None)
+    monkeypatch.setattr(intent_parser, "find_software_mentions", lambda message: no_database())
+    assert intent_parser.fallback_intent_detection("please install zoom") == {"intent": "install", "apps": []}
+
+    monkeypatch.setattr(intent_parser, "get_cached_catalog", lambda: {"zoom": ["5.0"]})
+    monkeypatch.setattr(intent_parser, "find_software_mentions", lambda message: ["zoom"])
+    assert intent_parser.fallback_intent_detection("please install zoom") == {"intent": "install", "apps": ["zoom"]}
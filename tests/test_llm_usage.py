@@ -0,0 +1,131 @@
+# test_llm_usage.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import db_connector
+import llm
+import llm_usage
+from llm_usage import NO_TURN, TurnUsage
+
+
+class FakeChatModel:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.messages = []
+
+    def invoke(self, messages):
+        self.messages.append(messages)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return AIMessage("ok", usage_metadata={
+            "input_tokens": 120, "output_tokens": 12, "total_tokens": 132,
+            "input_token_details": {"cache_read": 100},
+        })
+
+
+@pytest.fixture(autouse=True)
+def pending(monkeypatch):
+    pending = {}
+    monkeypatch.setattr(llm_usage, "_pending", pending)
+    monkeypatch.setattr(llm_usage, "_table_ready", False)
+    return pending
+
+
+def totals():
+    """(intent, path) -> [calls, errors, prompt, completion, cached]; latency varies"""
+    return {(intent, path): values[:5] for (_, intent, path), values in llm_usage._pending.items()}
+
+
+def test_calls_are_charged_to_the_turns_intent(monkeypatch):
+    model = FakeChatModel()
+    monkeypatch.setattr(llm, "_llm", model)
+
+    async def turn():
+        usage = TurnUsage()
+        with usage:
+            # Worker threads inherit the turn through the copied context
+            await asyncio.to_thread(llm.complete, "intent", "classify", "what is a b-tree?")
+            await asyncio.to_thread(llm.complete, "cs_it", "answer", "what is a b-tree?")
+        assert totals() == {}
+        usage.charge("cs_it")
+
+    asyncio.run(turn())
+    llm.complete("general", "chat", "hi")
+
+    assert model.messages[0] == [("system", "classify"), ("user", "what is a b-tree?")]
+    assert totals() == {
+        ("cs_it", "intent"): [1, 0, 120, 12, 100],
+        ("cs_it", "cs_it"): [1, 0, 120, 12, 100],
+        (NO_TURN, "general"): [1, 0, 120, 12, 100],
+    }
+
+
+def test_failed_calls_count_as_errors_without_tokens(monkeypatch):
+    monkeypatch.setattr(llm, "_llm", FakeChatModel(fail=True))
+    with pytest.raises(RuntimeError):
+        llm.complete("intent", "classify", "hello")
+    assert totals() == {(NO_TURN, "intent"): [1, 1, 0, 0, 0]}
+
+
+def test_groq_sdk_usage_is_recorded():
+    usage = SimpleNamespace(prompt_tokens=300, completion_tokens=40,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=256))
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **options: SimpleNamespace(usage=usage))))
+    llm.groq_chat("incident_extraction", client, model="m", messages=[])
+    assert totals() == {(NO_TURN, "incident_extraction"): [1, 0, 300, 40, 256]}
+
+
+class RecordingConnection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.statements = []
+        self.rows = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.statements.append(" ".join(query.split()))
+
+    def executemany(self, query, rows):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.rows.extend(rows)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_flush_writes_one_row_per_day_intent_and_path(monkeypatch):
+    conn = RecordingConnection()
+    monkeypatch.setattr(db_connector, "get_connection", lambda: conn)
+    for _ in range(3):
+        llm_usage.record("general", 0.25, 100, 10)
+    llm_usage.record("intent", 0.1, 50, 5)
+
+    assert llm_usage.flush() == 2
+    assert sorted(row[1:] for row in conn.rows) == [
+        (NO_TURN, "general", 3, 0, 300, 30, 0, 750),
+        (NO_TURN, "intent", 1, 0, 50, 5, 0, 100),
+    ]
+    assert conn.statements[0].startswith("CREATE TABLE IF NOT EXISTS llm_usage_daily")
+    assert llm_usage.flush() == 0
+
+
+def test_failed_flush_keeps_the_totals_for_the_next_one(monkeypatch):
+    failing, working = RecordingConnection(fail=True), RecordingConnection()
+    monkeypatch.setattr(db_connector, "get_connection", lambda: failing)
+    llm_usage.record("general", 0.1, 100, 10)
+    assert llm_usage.flush() == 0
+
+    llm_usage.record("general", 0.1, 100, 10)
+    monkeypatch.setattr(db_connector, "get_connection", lambda: working)
+    assert llm_usage.flush() == 1
+    assert working.rows[0][1:] == (NO_TURN, "general", 2, 0, 200, 20, 0, 200)
@@ -0,0 +1,271 @@
+# test_mcp_server.py
+import asyncio
+import base64
+import json
+import time
+
+import httpx
+import pytest
+
+import mcp_server
+from incident_mirror import IncidentMirror
+from incident_similarity import IncidentSimilarityIndex
+
+INSTANCE = "https://sn.test"
+
+
+def tool(func):
+    """The coroutine behind an @mcp.tool()"""
+    return getattr(func, "fn", func)
+
+
+class ServiceNow:
+    """Routes the client's requests to a handler and keeps them for assertions"""
+
+    def __init__(self):
+        self.requests = []
+        self.handler = None
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.handler(request)
+
+
+@pytest.fixture
+def servicenow(monkeypatch):
+    servicenow = ServiceNow()
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(mcp_server, "SN_INSTANCE", INSTANCE)
+    monkeypatch.setattr(mcp_server.httpx, "AsyncClient",
+                        lambda *args, **kwargs: client_class(transport=httpx.MockTransport(servicenow)))
+    # Module-level locks bind to the first event loop that uses them
+    monkeypatch.setattr(mcp_server, "_mirror_sync_lock", asyncio.Lock())
+    monkeypatch.setattr(mcp_server, "_similarity_sync_lock", asyncio.Lock())
+    monkeypatch.setattr(mcp_server, "SIMILARITY", IncidentSimilarityIndex())
+    monkeypatch.setattr(mcp_server, "MIRROR", None)
+    return servicenow
+
+
+@pytest.fixture
+def mirror(monkeypatch, tmp_path):
+    mirror = IncidentMirror(str(tmp_path / "mirror.db"))
+    # Synced a moment ago, so reads don't start a backfill
+    mirror.finish_sync("2026-01-01 00:00:00")
+    monkeypatch.setattr(mcp_server, "MIRROR", mirror)
+    yield mirror
+    mirror.close()
+
+
+def incident(number, plain, **fields):
+    """A ServiceNow record; caller_id is a reference unless the request excluded reference links"""
+    caller = "u-1" if plain else {"link": f"{INSTANCE}/api/now/table/sys_user/u-1", "value": "u-1"}
+    return {"number": number, "sys_id": f"s-{number}", "caller_id": caller, "short_description": "vpn drops",
+            "sys_updated_on": "2026-01-01 00:00:00", **fields}
+
+
+def reference_aware(request):
+    plain = request.url.params.get("sysparm_exclude_reference_link") == "true"
+    query = request.url.params["sysparm_query"]
+    numbers = query[len("numberIN"):].split(",") if query.startswith("numberIN") else [query[len("number="):]]
+    return httpx.Response(200, json={"result": [incident(number, plain) for number in numbers]})
+
+
+def test_live_reads_store_plain_reference_values(servicenow, mirror):
+    servicenow.handler = reference_aware
+
+    single = asyncio.run(tool(mcp_server.get_incident_details)("INC0000001"))
+    many = asyncio.run(tool(mcp_server.get_incidents_details)(["INC0000002", "INC0000003"]))
+
+    assert single["incident"]["caller_id"] == "u-1"
+    assert many["incidents"]["INC0000002"]["incident"]["caller_id"] == "u-1"
+    assert all(mirror.get(n)["caller_id"] == "u-1" for n in ("INC0000001", "INC0000002", "INC0000003"))
+    # Served from the mirror now, in the same shape
+    again = asyncio.run(tool(mcp_server.get_incident_details)("INC0000001"))
+    assert again["source"] == "mirror" and again["incident"] == single["incident"]
+
+
+def test_similarity_index_is_seeded_once(servicenow, mirror, monkeypatch):
+    mirror.upsert([incident(f"INC{n:07d}", True) for n in range(20)])
+    seeds = []
+    add_records = mcp_server.SIMILARITY.add_records
+
+    def slow_seed(records):
+        seeds.append(1)
+        time.sleep(0.05)
+        return add_records(records)
+
+    monkeypatch.setattr(mcp_server.SIMILARITY, "add_records", slow_seed)
+
+    async def concurrent_searches():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(servicenow))
+        await asyncio.gather(*(mcp_server._ensure_similarity_fresh(client, 3600) for _ in range(3)))
+
+    asyncio.run(concurrent_searches())
+    assert seeds == [1]
+    assert len(mcp_server.SIMILARITY) == 20
+
+
+class BatchServiceNow:
+    """
+    Known incidents INC1-INC4. The Batch API services the first chunk (INC2
+    fails validation) and rejects the second; individual PATCHes succeed
+    except for INC4.
+    """
+
+    known = ("INC1", "INC2", "INC3", "INC4")
+
+    def __init__(self):
+        self.batches = []
+        self.patched = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "GET":
+            numbers = request.url.params["sysparm_query"][len("numberIN"):].split(",")
+            return httpx.Response(200, json={"result": [incident(n, True) for n in numbers if n in self.known]})
+        if path == "/api/now/v1/batch":
+            items = json.loads(request.content)["rest_requests"]
+            self.batches.append([item["id"] for item in items])
+            if len(self.batches) > 1:
+                return httpx.Response(500, json={"error": {"message": "Batch API unavailable"}})
+            served = []
+            for item in items:
+                status = 400 if item["id"] == "INC2" else 200
+                body = {"result": {"number": item["id"], **json.loads(base64.b64decode(item["body"]))}}
+                served.append({"id": item["id"], "status_code": status,
+                               "body": base64.b64encode(json.dumps(body).encode()).decode()})
+            return httpx.Response(200, json={"serviced_requests": served, "unserviced_requests": []})
+        number = path.rsplit("/", 1)[-1][len("s-"):]
+        self.patched.append(number)
+        if number == "INC4":
+            return httpx.Response(403, json={"error": {"message": "Operation against file 'incident' was aborted"}})
+        return httpx.Response(200, json={"result": {"number": number, **json.loads(request.content)}})
+
+
+@pytest.mark.parametrize("call, state", [
+    (lambda numbers: tool(mcp_server.bulk_update_incident_state)(numbers, "in progress"), "2"),
+    (lambda numbers: tool(mcp_server.bulk_close_incidents)(numbers, "Fixed by reboot"), "7"),
+], ids=["update_state", "close"])
+def test_bulk_patch_falls_back_for_a_rejected_batch_chunk(servicenow, monkeypatch, call, state):
+    monkeypatch.setattr(mcp_server, "SN_BATCH_SIZE", 2)
+    fake = BatchServiceNow()
+    servicenow.handler = fake
+
+    result = asyncio.run(call(["INC1", "INC2", " INC1", "INC9", "INC3", "INC4"]))
+
+    assert fake.batches == [["INC1", "INC2"], ["INC3", "INC4"]]
+    # Only the rejected chunk goes out again, one PATCH per incident
+    assert sorted(fake.patched) == ["INC3", "INC4"]
+    assert (result["total"], result["succeeded"], result["failed"]) == (5, 2, 3)
+    items = result["results"]
+    assert list(items) == ["INC1", "INC2", "INC9", "INC3", "INC4"]
+    assert items["INC1"]["success"] and items["INC1"]["data"]["result"]["state"] == state
+    assert items["INC3"]["success"] and items["INC3"]["data"]["result"]["state"] == state
+    assert items["INC2"]["error"] == "HTTP 400"
+    assert items["INC4"]["error"] == "HTTP 403"
+    assert items["INC9"] == {"error": "Incident INC9 not found."}
+
+
+def test_concurrent_patch_reports_transport_errors_per_incident(servicenow):
+    def handler(request):
+        if request.url.path.endswith("s-INC2"):
+            raise httpx.ConnectError("connection reset", request=request)
+        return httpx.Response(200, json={"result": {"state": "2"}})
+
+    servicenow.handler = handler
+
+    async def patch():
+        async with httpx.AsyncClient() as client:
+            return await mcp_server._concurrent_patch(
+                client, {"INC1": ("s-INC1", {"state": "2"}), "INC2": ("s-INC2", {"state": "2"})})
+
+    results = asyncio.run(patch())
+    assert results["INC1"] == {"success": True, "data": {"result": {"state": "2"}}}
+    assert results["INC2"]["error"].startswith("Error updating incident:")
+
+
+class KeysetServiceNow:
+    """Evaluates the encoded queries _keyset_query builds: ANDed =/> conditions, ^NQ, ORDERBY"""
+
+    def __init__(self, records):
+        self.records = sorted(records, key=lambda r: (r["sys_updated_on"], r["sys_id"]))
+        self.queries = []
+
+    @staticmethod
+    def matches(record, clause):
+        for condition in clause.split("^"):
+            if not condition or condition.startswith("ORDERBY"):
+                continue
+            op = ">" if ">" in condition else "="
+            field, value = condition.split(op, 1)
+            if not (record[field] > value if op == ">" else record[field] == value):
+                return False
+        return True
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        query = request.url.params["sysparm_query"]
+        self.queries.append(query)
+        clauses = query.split("^NQ")
+        hits = [r for r in self.records if any(self.matches(r, clause) for clause in clauses)]
+        return httpx.Response(200, json={"result": hits[:int(request.url.params["sysparm_limit"])]})
+
+
+def test_incident_pages_do_not_skip_or_repeat_equal_timestamps(servicenow):
+    # Five incidents share one timestamp and straddle the page boundaries
+    stamps = ["2026-01-01 00:00:00"] + ["2026-01-02 00:00:00"] * 5 + ["2026-01-03 00:00:00"]
+    records = [incident(f"INC{n:07d}", True, sys_id=f"s-{n:02d}", sys_updated_on=ts, active="true")
+               for n, ts in enumerate(stamps)]
+    records += [incident("INC0000099", True, sys_id="s-00", sys_updated_on=stamps[3], active="false")]
+    fake = KeysetServiceNow(records)
+    servicenow.handler = fake
+
+    async def walk():
+        pages = []
+        async with httpx.AsyncClient() as client:
+            async for page, cursor in mcp_server._iter_incident_pages(client, "active=true", "number", 3):
+                pages.append(([r["number"] for r in page], cursor))
+        return pages
+
+    pages = asyncio.run(walk())
+    numbers = [n for page, _ in pages for n in page]
+    assert numbers == [f"INC{n:07d}" for n in range(7)]
+    assert [len(page) for page, _ in pages] == [3, 3, 1]
+    assert all(cursor for _, cursor in pages[:-1]) and pages[-1][1] == ""
+    # The caller's filter holds on both sides of the ^NQ
+    assert all(q.split("^NQ")[1].startswith("active=true^") for q in fake.queries[1:])
+
+
+def test_number_chunks_respect_count_and_length_limits(monkeypatch):
+    monkeypatch.setattr(mcp_server, "SN_LOOKUP_CHUNK_SIZE", 3)
+    monkeypatch.setattr(mcp_server, "SN_MAX_QUERY_CHARS", 20)
+    numbers = ["INC1", "INC2", "INC3", "INC4", "INC0000005", "INC0000006", "INC7"]
+
+    chunks = list(mcp_server._number_chunks(numbers))
+
+    assert chunks == [["INC1", "INC2", "INC3"], ["INC4", "INC0000005"], ["INC0000006", "INC7"]]
+    assert all(len(",".join(chunk)) < 20 for chunk in chunks)
+
+
+def test_incidents_details_are_looked_up_in_chunks(servicenow, monkeypatch):
+    monkeypatch.setattr(mcp_server, "SN_LOOKUP_CHUNK_SIZE", 2)
+    known = {"INC1", "INC2", "INC3", "INC5"}
+
+    def handler(request):
+        numbers = request.url.params["sysparm_query"][len("numberIN"):].split(",")
+        return httpx.Response(200, json={"result": [incident(n, True) for n in numbers if n in known]})
+
+    servicenow.handler = handler
+
+    result = asyncio.run(tool(mcp_server.get_incidents_details)(
+        ["INC1", "INC2", " INC1 ", "INC3", "INC4", "INC2", "", "INC5"]))
+
+    queries = [request.url.params["sysparm_query"] for request in servicenow.requests]
+    assert sorted(queries) == ["numberININC1,INC2", "numberININC3,INC4", "numberININC5"]
+    assert all(request.url.params["sysparm_limit"] == str(len(q.split(",")))
+               for request, q in zip(servicenow.requests, queries))
+    incidents = result["incidents"]
+    assert list(incidents) == ["INC1", "INC2", "INC3", "INC4", "INC5"]
+    assert (result["found"], result["missing"]) == (4, 1)
+    assert incidents["INC4"] == {"found": False, "error": "Incident INC4 not found."}
+    assert all(incidents[n]["found"] and incidents[n]["incident"]["number"] == n
+               for n in ("INC1", "INC2", "INC3", "INC5"))
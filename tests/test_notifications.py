@@ -0,0 +1,34 @@
+# test_notifications.py
+import asyncio
+
+from botbuilder.schema import ChannelAccount, ConversationAccount, ConversationReference
+
+import notifications
+from notifications import NotificationDispatcher
+
+
+def serialized_reference(conversation_id: str) -> dict:
+    return ConversationReference(
+        channel_id="msteams",
+        conversation=ConversationAccount(id=conversation_id),
+        user=ChannelAccount(id="user"),
+        service_url="https://smba.example.com",
+    ).serialize()
+
+
+def test_reference_is_kept_when_the_message_is_dropped(monkeypatch):
+    references = {number: serialized_reference(number) for number in ("INC001", "INC002", "INC003")}
+    deleted = []
+    monkeypatch.setattr(notifications, "get_conversation_references",
+                        lambda numbers: {n: references[n] for n in numbers})
+    monkeypatch.setattr(notifications, "delete_conversation_references", deleted.extend)
+
+    async def scenario():
+        # Room for one message: the first is queued, the others are dropped
+        dispatcher = NotificationDispatcher(adapter=None, app_id="bot", queue_size=1)
+        await dispatcher.notify_status_changes({"INC001": "Resolved", "INC002": "Closed", "INC003": "In Progress"})
+        return dispatcher
+
+    dispatcher = asyncio.run(scenario())
+    assert dispatcher.dropped == 2
+    assert deleted == ["INC001"]
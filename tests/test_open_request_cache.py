@@ -0,0 +1,54 @@
+# test_open_request_cache.py
+import pytest
+
+import db_connector
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.opened = 0
+
+    def cursor(self):
+        self.opened += 1
+        return FakeCursor(self.rows)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    conn = FakeConnection([])
+    monkeypatch.setattr(db_connector, "get_connection", lambda: conn)
+    monkeypatch.setattr(db_connector, "_open_requests", {})
+    return conn
+
+
+def test_hits_expire_like_misses(db, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db_connector.time, "time", lambda: now[0])
+    db.rows += [("INC001",), None]
+
+    assert db_connector.find_open_request("Alice", "Zoom", "5.0") == "INC001"
+    assert db_connector.find_open_request("alice", "zoom", "5.0") == "INC001"
+    assert db.opened == 1
+
+    # Closed in ServiceNow directly: the hit must not outlive the TTL
+    now[0] += db_connector.OPEN_REQUEST_CACHE_TTL
+    assert db_connector.find_open_request("Alice", "Zoom", "5.0") is None
+    assert db.opened == 2
@@ -0,0 +1,89 @@
+# test_request_log_schema.py
+from datetime import datetime
+
+import pytest
+
+import request_log_schema
+
+
+class ScriptedCursor:
+    """Records every statement and answers the few queries migrate() reads from"""
+
+    def __init__(self, first, now, counts=None):
+        self.first = first
+        self.now = list(now)
+        # Row counts by table for the final comparison
+        self.counts = counts or {}
+        self.statements = []
+        self.rowcount = 0
+        self._row = None
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.statements.append((query, params))
+        if query == "SELECT NOW()":
+            self._row = (self.now.pop(0),)
+        elif query.startswith("SELECT MIN(timestamp)"):
+            self._row = (self.first,)
+        elif query.startswith("SELECT COUNT(*) FROM request_logging"):
+            self._row = (self.counts.get(query.split()[-1], 1),)
+        else:
+            self._row = (1,)
+
+    def fetchone(self):
+        return self._row
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+
+def test_migrate_splits_the_copy_at_the_time_taken_before_the_triggers(monkeypatch):
+    monkeypatch.setattr(request_log_schema.time, "sleep", lambda seconds: None)
+    first = datetime(2026, 1, 1, 0, 0, 0)
+    t0 = datetime(2026, 1, 2, 0, 0, 0)
+    cutoff = datetime(2026, 1, 2, 0, 0, 3)
+    cursor = ScriptedCursor(first, [t0, cutoff])
+
+    request_log_schema.migrate(Connection(cursor), batch_hours=6)
+
+    queries = [query for query, _ in cursor.statements]
+    first_now = queries.index("SELECT NOW()")
+    first_trigger = next(i for i, q in enumerate(queries) if q.startswith("CREATE TRIGGER"))
+    assert first_now < first_trigger
+
+    slices = [params for query, params in cursor.statements
+              if query.startswith("INSERT INTO request_logging_new") and "timestamp < %s" in query]
+    assert slices[0][0] == first
+    assert slices[-1][1] == t0
+    assert all(high <= t0 for _, high in slices)
+
+    # Rows logged while the triggers were created are copied only if they weren't mirrored
+    [catch_up] = [params for query, params in cursor.statements if "AND NOT EXISTS (" in query]
+    assert catch_up == [t0, cutoff]
+
+
+def test_migrate_keeps_the_old_table_when_rows_are_missing(monkeypatch):
+    monkeypatch.setattr(request_log_schema.time, "sleep", lambda seconds: None)
+    cursor = ScriptedCursor(datetime(2026, 1, 1), [datetime(2026, 1, 2), datetime(2026, 1, 2, 0, 0, 3)],
+                            counts={"request_logging": 1000, "request_logging_new": 998})
+
+    with pytest.raises(request_log_schema.MigrationError, match="missing 2 of 1000 rows"):
+        request_log_schema.migrate(Connection(cursor), batch_hours=6)
+
+    queries = [query for query, _ in cursor.statements]
+    assert not any(q.startswith(("RENAME", "DROP TRIGGER")) for q in queries)
+    assert sum(q.startswith("CREATE TRIGGER") for q in queries) == 3
@@ -0,0 +1,89 @@
+# test_serve.py
+import asyncio
+import json
+import socket
+
+from aiohttp import web
+
+import serve
+from metrics import merge_worker_metrics
+
+
+def test_budgets_are_split_between_workers(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "10")
+    monkeypatch.setenv("LLM_REQUESTS_PER_MINUTE", "30")
+    settings = serve.worker_settings(4)
+    assert settings["DB_POOL_SIZE"] == "2"
+    assert settings["LLM_REQUESTS_PER_MINUTE"] == "7.5"
+
+
+def test_small_budget_still_gives_each_worker_one(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    assert serve.worker_settings(4)["DB_POOL_SIZE"] == "1"
+
+
+def test_disabled_pool_stays_disabled(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "0")
+    assert serve.worker_settings(4)["DB_POOL_SIZE"] == "0"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_merged_metrics_keep_families_together():
+    worker = ("# HELP bot_turns_total Turns\n# TYPE bot_turns_total counter\n"
+              'bot_turns_total{intent="install",outcome="ok"} 3\n'
+              "# HELP bot_up Up\n# TYPE bot_up gauge\nbot_up 1\n")
+    merged = merge_worker_metrics({"0": worker, "1": worker.replace(" 3\n", " 5\n")}).splitlines()
+    assert merged == [
+        "# HELP bot_turns_total Turns",
+        "# TYPE bot_turns_total counter",
+        'bot_turns_total{worker="0",intent="install",outcome="ok"} 3',
+        'bot_turns_total{worker="1",intent="install",outcome="ok"} 5',
+        "# HELP bot_up Up",
+        "# TYPE bot_up gauge",
+        'bot_up{worker="0"} 1',
+        'bot_up{worker="1"} 1',
+    ]
+
+
+def test_workers_serve_admin_paths_on_their_own_port_and_the_pod_endpoint_gathers_them():
+    async def ready(request):
+        return web.json_response({"status": "ready"})
+
+    async def metrics(request):
+        return web.Response(text="# HELP bot_up Up\n# TYPE bot_up gauge\nbot_up 1\n")
+
+    async def messages(request):
+        return web.Response(text="bot")
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/readyz", ready)
+        app.router.add_get("/metrics", metrics)
+        app.router.add_post("/api/messages", messages)
+        admin_port, down_port = free_port(), free_port()
+        serve._serve_admin(app, admin_port)
+        runner = web.AppRunner(app)
+        await runner.setup()  # runs on_startup, which starts the admin site
+        await web.TCPSite(runner, "127.0.0.1", free_port()).start()
+        try:
+            one = await asyncio.to_thread(serve.pod_endpoint, "/readyz", {0: admin_port})
+            both = await asyncio.to_thread(serve.pod_endpoint, "/readyz", {0: admin_port, 1: down_port})
+            scraped = await asyncio.to_thread(serve.pod_endpoint, "/metrics", {0: admin_port, 1: down_port})
+            not_admin = await asyncio.to_thread(serve._fetch, admin_port, "/api/messages")
+        finally:
+            await runner.cleanup()
+        return one, both, scraped, not_admin
+
+    one, both, scraped, not_admin = asyncio.run(scenario())
+    assert one[0] == 200
+    assert both[0] == 503 and json.loads(both[2])["workers"]["1"] == {"status": "unreachable"}
+    lines = scraped[2].decode().splitlines()
+    assert 'bot_up{worker="0"} 1' in lines
+    assert 'bot_worker_up{worker="0"} 1' in lines and 'bot_worker_up{worker="1"} 0' in lines
+    # Only the admin paths are exposed on the worker's admin port
+    assert not_admin[0] == 404
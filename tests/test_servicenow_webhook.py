@@ -0,0 +1,55 @@
+# test_servicenow_webhook.py
+import asyncio
+import json
+
+import pytest
+
+import app
+
+
+class FakeRequest:
+    def __init__(self, payload):
+        self.body = json.dumps(payload).encode("utf-8")
+        self.headers = {"X-SN-Signature": "signed"}
+
+    async def read(self):
+        return self.body
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app, "verify_signature", lambda secret, body, signature: True)
+    monkeypatch.setattr(app.STATUS_UPDATES, "submit",
+                        lambda number, status: submitted.append((number, status)) or True)
+    return submitted
+
+
+def post(payload):
+    return asyncio.run(app.servicenow_webhook(FakeRequest(payload)))
+
+
+@pytest.mark.parametrize("payload", ["resolved", 42, None, {"events": "INC001"}])
+def test_malformed_top_level_is_rejected(submitted, payload):
+    assert post(payload).status == 400
+    assert submitted == []
+
+
+def test_non_dict_events_are_skipped(submitted):
+    event = {"number": "INC001", "state": "6"}
+    response = post({"events": ["INC002", None, 7, event]})
+    assert response.status == 202
+    assert json.loads(response.text) == {"accepted": 1}
+    assert [number for number, _ in submitted] == ["INC001"]
+
+
+def test_full_status_buffer_answers_503(monkeypatch):
+    monkeypatch.setattr(app, "verify_signature", lambda secret, body, signature: True)
+    monkeypatch.setattr(app, "STATUS_UPDATES", app.StatusUpdateBatcher(max_pending=1))
+
+    response = post({"events": [{"number": "INC001", "state": "6"}, {"number": "INC002", "state": "7"}]})
+
+    assert response.status == 503
+    assert response.headers["Retry-After"] == "30"
+    assert json.loads(response.text) == {"accepted": 1, "dropped": 1}
+    assert app.STATUS_UPDATES.dropped == 1
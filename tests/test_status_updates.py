@@ -0,0 +1,32 @@
+# test_status_updates.py
+import asyncio
+
+import status_updates
+from status_updates import StatusUpdateBatcher
+
+
+def test_pending_updates_are_capped(monkeypatch):
+    writes = []
+
+    def database_down(batch):
+        writes.append(dict(batch))
+        return -1
+
+    monkeypatch.setattr(status_updates, "update_request_statuses", database_down)
+
+    async def scenario():
+        batcher = StatusUpdateBatcher(max_batch=10, max_pending=2)
+        accepted = [batcher.submit("INC001", "In Progress"), batcher.submit("INC002", "In Progress"),
+                    batcher.submit("INC003", "In Progress"),
+                    # A newer status for a pending incident still fits
+                    batcher.submit("INC001", "Resolved")]
+        # The failed flush keeps its batch, and the cap still holds afterwards
+        await batcher.flush()
+        accepted.append(batcher.submit("INC004", "New"))
+        return batcher, accepted
+
+    batcher, accepted = asyncio.run(scenario())
+    assert accepted == [True, True, False, True, False]
+    assert batcher.dropped == 2
+    assert writes == [{"INC001": "Resolved", "INC002": "In Progress"}]
+    assert batcher._pending == {"INC001": "Resolved", "INC002": "In Progress"}
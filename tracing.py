@@ -0,0 +1,208 @@
+# tracing.py
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+CORRELATION_HEADER = "X-Correlation-ID"
+
+# Tail-based sampling: every trace slower than the threshold or with an error is
+# kept, the rest are kept at TRACE_SAMPLE_RATE.
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+TRACE_SLOW_THRESHOLD_MS = float(os.getenv("TRACE_SLOW_THRESHOLD_MS", 2000))
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.01))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 1000))
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "installer-bot")
+
+logger = logging.getLogger(__name__)
+
+_HEX32 = re.compile(r"^[0-9a-f]{32}$")
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: str):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, str] = {}
+        self.error = ""
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = str(value)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [{"key": k, "value": {"stringValue": v}} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """All spans of one turn, exported together once the root span ends"""
+
+    def __init__(self, correlation_id: str):
+        self.correlation_id = correlation_id
+        self.trace_id = correlation_id if _HEX32.match(correlation_id) else uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self.has_error = False
+
+    def add(self, span: Span) -> bool:
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            return False
+        self.spans.append(span)
+        return True
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class _Exporter:
+    """Writes kept traces as OTLP/JSON from a background thread, off the event loop"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=10000)
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, payload: dict):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            payload = self._queue.get()
+            try:
+                if TRACE_OTLP_ENDPOINT:
+                    request = urllib.request.Request(
+                        TRACE_OTLP_ENDPOINT,
+                        data=json.dumps(payload).encode(),
+                        headers={"Content-Type": "application/json"},
+                        method="POST",
+                    )
+                    urllib.request.urlopen(request, timeout=5).close()
+                if TRACE_EXPORT_PATH:
+                    with open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as out:
+                        out.write(json.dumps(payload) + "\n")
+            except Exception as e:
+                logger.warning("Trace export failed: %s", e)
+
+
+_EXPORTER = _Exporter()
+
+
+def _export(trace: Trace):
+    _EXPORTER.submit({
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [s.to_otlp() for s in trace.spans]}],
+        }]
+    })
+
+
+class span:
+    """
+    Context manager for a child span of the current span. Outside a trace it does
+    nothing, so instrumented code costs almost nothing when tracing is off.
+    """
+    __slots__ = ("name", "span", "token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.span: Optional[Span] = None
+        self.token = None
+
+    def __enter__(self) -> Optional[Span]:
+        parent = _current_span.get()
+        if parent is not None:
+            child = Span(parent.trace, self.name, parent.span_id)
+            if parent.trace.add(child):
+                self.span = child
+                self.token = _current_span.set(child)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is not None:
+            self.span.end_ns = time.time_ns()
+            if exc is not None:
+                self.span.error = f"{exc_type.__name__}: {exc}"
+                self.span.trace.has_error = True
+            _current_span.reset(self.token)
+        return False
+
+
+class start_trace:
+    """
+    Root span for one inbound request. Reuses the caller's correlation ID when
+    given. On exit the trace is kept if it was slow or failed, otherwise sampled
+    at TRACE_SAMPLE_RATE, and kept traces are exported in the background.
+    """
+    __slots__ = ("name", "correlation_id", "root", "token")
+
+    def __init__(self, name: str, correlation_id: Optional[str] = None):
+        self.name = name
+        self.correlation_id = (correlation_id or "").strip()[:128] or uuid.uuid4().hex
+        self.root: Optional[Span] = None
+        self.token = None
+
+    def __enter__(self) -> Optional[Span]:
+        if not TRACE_ENABLED:
+            return None
+        trace = Trace(self.correlation_id)
+        self.root = Span(trace, self.name, "")
+        self.root.set_attribute("correlation_id", self.correlation_id)
+        trace.add(self.root)
+        self.token = _current_span.set(self.root)
+        return self.root
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.root is None:
+            return False
+        _current_span.reset(self.token)
+        root = self.root
+        root.end_ns = time.time_ns()
+        if exc is not None:
+            root.error = f"{exc_type.__name__}: {exc}"
+            root.trace.has_error = True
+
+        duration_ms = (root.end_ns - root.start_ns) / 1e6
+        if root.trace.has_error or duration_ms >= TRACE_SLOW_THRESHOLD_MS or random.random() < TRACE_SAMPLE_RATE:
+            _export(root.trace)
+        return False
+
+
+def current_correlation_id() -> str:
+    current = _current_span.get()
+    return current.trace.correlation_id if current is not None else ""
+
+
+def correlation_headers() -> Dict[str, str]:
+    """Headers to add to outbound calls so they can be tied back to the turn"""
+    correlation_id = current_correlation_id()
+    return {CORRELATION_HEADER: correlation_id} if correlation_id else {}